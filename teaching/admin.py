@@ -4,6 +4,7 @@ from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
 from teaching.models import Lesson, Schedule, InternalNotification, Rating, LessonStatus
+from teaching.transitions import APPROVE, COMPLETE, transition_lessons
 
 
 @admin.register(Lesson)
@@ -40,14 +41,14 @@ class LessonAdmin(admin.ModelAdmin):
 
     @admin.action(description=_("Mark selected lessons as Done"))
     def mark_as_done(self, request, queryset):
-        updated_count = queryset.update(status=LessonStatus.DONE)
+        results = transition_lessons(COMPLETE, queryset)
+        updated_count = sum(result.applied for result in results.values())
         self.message_user(request, f"{updated_count} уроків позначено як Завершені.")
 
     @admin.action(description=_("Mark selected lessons as Approved"))
     def mark_as_approved(self, request, queryset):
-        updated_count = queryset.filter(status=LessonStatus.VOID).update(
-            status=LessonStatus.APPROVED
-        )
+        results = transition_lessons(APPROVE, queryset)
+        updated_count = sum(result.applied for result in results.values())
         self.message_user(request, f"{updated_count} уроків позначено як Підтверджені.")
 
     @admin.action(description=_("Try to create Google Meet links for selected lessons"))
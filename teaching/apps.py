@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TeachingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "teaching"
+
+    def ready(self):
+        from teaching import signals  # noqa: F401
@@ -0,0 +1,219 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from teaching.week_bitmap import QUARTER, quarter_of_day
+
+try:
+    from teaching.models import Schedule, Lesson, LessonStatus, SlotHold
+except ImportError:
+    raise ImportError("Could not import models from 'teaching' app.")
+
+WEEKDAY_NAMES = [value for value, _label in Schedule.WEEKDAYS]
+SLOT_LENGTH = timedelta(hours=1)
+SLOT_QUARTERS = SLOT_LENGTH // QUARTER
+ACTIVE_STATUSES = [LessonStatus.VOID, LessonStatus.APPROVED]
+
+
+class BusyIntervals:
+    """
+    Disjoint, sorted union of booked intervals. Queries must come in
+    non-decreasing start order, which lets overlap checks share a single
+    forward pointer instead of rescanning the bookings for every slot.
+    """
+
+    def __init__(self, intervals):
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.intervals = merged
+        self.position = 0
+
+    def overlaps(self, start, end):
+        while (
+            self.position < len(self.intervals)
+            and self.intervals[self.position][1] <= start
+        ):
+            self.position += 1
+        return (
+            self.position < len(self.intervals)
+            and self.intervals[self.position][0] < end
+        )
+
+
+def iter_free_slots(schedules, booked, date_from, date_to, now, tz=None, window=None):
+    """
+    Yield ``(date, slot_start, can_book_2_hours)`` for the weekly
+    ``schedules`` (weekday, start, end) minus ``booked`` (start, end)
+    intervals. Slots are hourly, in wall-clock time of ``tz``, within each
+    schedule block and, if given, within the daily ``window`` (start, end).
+    """
+    tz = tz or timezone.get_current_timezone()
+    if window is not None:
+        window_first = quarter_of_day(window[0], round_up=True)
+        window_last = quarter_of_day(window[1])
+
+    def in_window(wall_clock):
+        if window is None:
+            return True
+        first = quarter_of_day(wall_clock.time())
+        return window_first <= first and first + SLOT_QUARTERS <= window_last
+
+    blocks_by_weekday = defaultdict(list)
+    for weekday, start_time, end_time in schedules:
+        blocks_by_weekday[WEEKDAY_NAMES.index(weekday)].append((start_time, end_time))
+    for blocks in blocks_by_weekday.values():
+        blocks.sort()
+
+    busy = BusyIntervals(
+        (start, end if end else start + SLOT_LENGTH) for start, end in booked
+    )
+
+    current_date = date_from
+    while current_date <= date_to:
+        for start_time, end_time in blocks_by_weekday.get(current_date.weekday(), ()):
+            block_end = timezone.make_aware(
+                datetime.combine(current_date, end_time), tz
+            )
+            wall_clock = datetime.combine(current_date, start_time)
+            slot_start = timezone.make_aware(wall_clock, tz)
+            while slot_start < block_end:
+                slot_in_window = in_window(wall_clock)
+                wall_clock += SLOT_LENGTH
+                next_start = timezone.make_aware(wall_clock, tz)
+                if (
+                    slot_in_window
+                    and slot_start > now
+                    and not busy.overlaps(slot_start, slot_start + SLOT_LENGTH)
+                ):
+                    yield (
+                        current_date,
+                        slot_start,
+                        next_start < block_end
+                        and in_window(wall_clock)
+                        and not busy.overlaps(next_start, next_start + SLOT_LENGTH),
+                    )
+                slot_start = next_start
+        current_date += timedelta(days=1)
+
+
+def compute_free_slots(
+    schedules, booked, date_from, date_to, now, tz=None, window=None
+):
+    """
+    Return ``{date_iso: [{"start_time", "can_book_2_hours"}, ...]}``, see
+    ``iter_free_slots``.
+    """
+    availability = {}
+    for day, slot_start, can_book_2_hours in iter_free_slots(
+        schedules, booked, date_from, date_to, now, tz, window
+    ):
+        availability.setdefault(day.isoformat(), []).append(
+            {
+                "start_time": slot_start.isoformat(),
+                "can_book_2_hours": can_book_2_hours,
+            }
+        )
+    return availability
+
+
+def day_bounds(date_from, date_to, tz=None):
+    """Aware [start, end) datetimes spanning the local days from–to."""
+    tz = tz or timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(date_from, datetime.min.time()), tz),
+        timezone.make_aware(
+            datetime.combine(date_to + timedelta(days=1), datetime.min.time()), tz
+        ),
+    )
+
+
+def get_booked_intervals(
+    teacher_ids, range_start, range_end, include_holds=False, hold_token=None
+):
+    """
+    ``(teacher_id, start, end)`` of active lessons and, if asked, of live
+    slot holds other than ``hold_token``, in a single query.
+    """
+    # Lessons are at most two hours long, so a one-day lookback on the
+    # indexed start_time catches any booking that spills into the range.
+    lessons = Lesson.objects.filter(
+        teacher_id__in=teacher_ids,
+        status__in=ACTIVE_STATUSES,
+        start_time__lt=range_end,
+        start_time__gte=range_start - timedelta(days=1),
+    ).values_list("teacher_id", "start_time", "end_time")
+    if not include_holds:
+        return lessons
+    holds = SlotHold.active().filter(
+        teacher_id__in=teacher_ids,
+        start_time__lt=range_end,
+        end_time__gt=range_start,
+    )
+    if hold_token is not None:
+        holds = holds.exclude(token=hold_token)
+    return lessons.order_by().union(
+        holds.values_list("teacher_id", "start_time", "end_time"), all=True
+    )
+
+
+def load_teacher_calendars(teacher_ids, date_from, date_to, include_holds=False):
+    """
+    Schedule blocks and booked intervals per teacher, one query each.
+    Teachers without any schedule are left out of both mappings.
+    """
+    blocks = defaultdict(list)
+    for teacher_id, *block in Schedule.objects.filter(
+        teacher_id__in=teacher_ids
+    ).values_list("teacher_id", "weekday", "start_time", "end_time"):
+        blocks[teacher_id].append(block)
+    booked = defaultdict(list)
+    if not blocks:
+        return blocks, booked
+
+    range_start, range_end = day_bounds(date_from, date_to)
+    for teacher_id, start, end in get_booked_intervals(
+        list(blocks), range_start, range_end, include_holds
+    ):
+        booked[teacher_id].append((start, end))
+    return blocks, booked
+
+
+def get_availability_for_teachers(teacher_ids, date_from, date_to, window=None):
+    """
+    Free slots for several teachers at once: the weekly templates and the
+    booked intervals are each loaded with a single query, however many
+    teachers are requested. Held slots count as booked. Teachers without
+    any schedule are omitted.
+    """
+    blocks, booked = load_teacher_calendars(
+        teacher_ids, date_from, date_to, include_holds=True
+    )
+    tz = timezone.get_current_timezone()
+    now = timezone.now()
+    return {
+        teacher_id: compute_free_slots(
+            teacher_blocks,
+            booked[teacher_id],
+            date_from,
+            date_to,
+            now,
+            tz,
+            window=window,
+        )
+        for teacher_id, teacher_blocks in blocks.items()
+    }
+
+
+def get_teacher_availability(teacher_id, date_from, date_to):
+    """
+    Free slots for one teacher. Returns None if the teacher has no schedule
+    at all, so the caller can tell "no slots" from "no teacher".
+    """
+    return get_availability_for_teachers([teacher_id], date_from, date_to).get(
+        teacher_id
+    )
@@ -0,0 +1,83 @@
+from django.db.models import BooleanField, Exists, OuterRef, Subquery, Value
+
+try:
+    from teaching.models import (
+        Lesson,
+        SlotHold,
+        WeekTemplate,
+        ACTIVE_LESSON_STATUSES,
+    )
+    from teaching import week_bitmap
+    from user.models import Teacher
+except ImportError:
+    raise ImportError("Could not import models from 'teaching' or 'user' app.")
+
+
+def get_booking_eligibility(
+    teacher_id,
+    subject_id,
+    category_id,
+    start_time=None,
+    end_time=None,
+    hold_token=None,
+    holder_id=None,
+):
+    """
+    Fetch the teacher with every booking rule evaluated in the same query:
+    ``teaches_subject``, ``accepts_category``, ``has_overlap`` and
+    ``is_held`` (only when an interval is given) and ``schedule_bitmap`` of
+    the week template. Holds matching ``hold_token`` or placed by the
+    student ``holder_id`` do not count. Returns None if there is no such
+    teacher.
+    """
+    has_overlap = Value(False, output_field=BooleanField())
+    is_held = Value(False, output_field=BooleanField())
+    if start_time is not None and end_time is not None:
+        has_overlap = Exists(
+            Lesson.objects.filter(
+                teacher_id=OuterRef("pk"),
+                status__in=ACTIVE_LESSON_STATUSES,
+                start_time__lt=end_time,
+                end_time__gt=start_time,
+            )
+        )
+        holds = SlotHold.active().filter(
+            teacher_id=OuterRef("pk"),
+            start_time__lt=end_time,
+            end_time__gt=start_time,
+        )
+        if hold_token is not None:
+            holds = holds.exclude(token=hold_token)
+        if holder_id is not None:
+            holds = holds.exclude(student_id=holder_id)
+        is_held = Exists(holds)
+    return (
+        Teacher.objects.filter(pk=teacher_id)
+        .annotate(
+            teaches_subject=Exists(
+                Teacher.subjects.through.objects.filter(
+                    teacher_id=OuterRef("pk"), subject_id=subject_id
+                )
+            ),
+            accepts_category=Exists(
+                Teacher.categories.through.objects.filter(
+                    teacher_id=OuterRef("pk"), categoriesofstudents_id=category_id
+                )
+            ),
+            has_overlap=has_overlap,
+            is_held=is_held,
+            schedule_bitmap=Subquery(
+                WeekTemplate.objects.filter(teacher_id=OuterRef("pk")).values("bitmap")[
+                    :1
+                ]
+            ),
+        )
+        .first()
+    )
+
+
+def get_week_mask(teacher):
+    """Week template mask of a teacher from ``get_booking_eligibility``."""
+    if teacher.schedule_bitmap is None:
+        return WeekTemplate.mask_for(teacher.pk)
+    return week_bitmap.from_bytes(teacher.schedule_bitmap)
@@ -0,0 +1,58 @@
+"""
+Bulk completion of lessons whose end time has passed: set-based UPDATEs in
+bounded batches, driven by the partial index on active lessons' end time.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from teaching.models import (
+    ACTIVE_LESSON_STATUSES,
+    InternalNotification,
+    Lesson,
+    LessonStatus,
+)
+from teaching.signals import lessons_updated
+
+
+def complete_expired_lessons(batch_size=500, now=None):
+    """
+    Move pending and approved lessons that ended before ``now`` to DONE and
+    tell their students they can rate the lesson. Returns the number of
+    lessons completed.
+    """
+    now = now or timezone.now()
+    completed = 0
+    while True:
+        with transaction.atomic():
+            # skip_locked lets a concurrent cancel or a second sweeper keep
+            # its rows; they are picked up on the next run if still active.
+            batch = list(
+                Lesson.objects.select_for_update(skip_locked=True, of=("self",))
+                .filter(status__in=ACTIVE_LESSON_STATUSES, end_time__lt=now)
+                .order_by("end_time")
+                .only("teacher", "student", "start_time", "end_time")
+                .annotate(student_user_id=F("student__user_id"))[:batch_size]
+            )
+            if not batch:
+                break
+            Lesson.objects.filter(pk__in=[lesson.pk for lesson in batch]).update(
+                status=LessonStatus.DONE, updated_at=timezone.now()
+            )
+            lessons_updated(batch)
+            InternalNotification.objects.bulk_create(
+                InternalNotification(
+                    user_id=lesson.student_user_id,
+                    lesson_id=lesson.pk,
+                    message=_("Lesson {id} is complete. You can now rate it.").format(
+                        id=lesson.pk
+                    ),
+                )
+                for lesson in batch
+            )
+        completed += len(batch)
+        if len(batch) < batch_size:
+            break
+    return completed
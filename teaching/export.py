@@ -0,0 +1,152 @@
+"""
+Streaming exports of lesson history as CSV and iCalendar. Rows are read
+with ``values()`` through a server-side cursor and encoded one at a time,
+so memory use does not depend on how many lessons are exported.
+"""
+
+import csv
+from datetime import timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+from teaching.models import LessonStatus
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FIELDS = (
+    "id",
+    "start_time",
+    "end_time",
+    "status",
+    "is_paid",
+    "subject__name",
+    "category__name",
+    "teacher__first_name",
+    "teacher__last_name",
+    "teacher__lesson_price",
+    "student__first_name",
+    "student__last_name",
+)
+CSV_HEADER = (
+    "id",
+    "start_time",
+    "end_time",
+    "status",
+    "is_paid",
+    "subject",
+    "category",
+    "teacher",
+    "price",
+    "student",
+)
+# Leading characters that make spreadsheets read a cell as a formula.
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+ICS_STATUSES = {
+    LessonStatus.VOID: "TENTATIVE",
+    LessonStatus.APPROVED: "CONFIRMED",
+    LessonStatus.DONE: "CONFIRMED",
+    LessonStatus.CANCELLED_BY_TEACHER: "CANCELLED",
+    LessonStatus.CANCELLED_BY_STUDENT: "CANCELLED",
+}
+
+
+def export_rows(queryset):
+    return (
+        queryset.order_by("start_time", "id")
+        .values(*EXPORT_FIELDS)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def lesson_end(row):
+    return row["end_time"] or row["start_time"] + timedelta(hours=1)
+
+
+def full_name(row, prefix):
+    return " ".join(
+        part
+        for part in (row[f"{prefix}__first_name"], row[f"{prefix}__last_name"])
+        if part
+    )
+
+
+class Echo:
+    """File-like object whose write() hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def csv_text(value):
+    if value.startswith(CSV_FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for row in rows:
+        yield writer.writerow(
+            (
+                row["id"],
+                timezone.localtime(row["start_time"]).isoformat(),
+                timezone.localtime(lesson_end(row)).isoformat(),
+                row["status"],
+                row["is_paid"],
+                csv_text(row["subject__name"]),
+                csv_text(row["category__name"] or ""),
+                csv_text(full_name(row, "teacher")),
+                row["teacher__lesson_price"],
+                csv_text(full_name(row, "student")),
+            )
+        )
+
+
+def ics_text(value):
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def ics_time(value):
+    return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def ics_line(line):
+    # RFC 5545: lines longer than 75 octets continue after CRLF + space.
+    encoded = line.encode("utf-8")
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        while cut and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def iter_ics(rows, domain):
+    stamp = ics_time(timezone.now())
+    yield ics_line("BEGIN:VCALENDAR")
+    yield ics_line("VERSION:2.0")
+    yield ics_line(f"PRODID:-//{domain}//Lessons//EN")
+    for row in rows:
+        teacher = full_name(row, "teacher")
+        student = full_name(row, "student")
+        summary = f"{row['subject__name']}: {teacher} / {student}"
+        for line in (
+            "BEGIN:VEVENT",
+            f"UID:lesson-{row['id']}@{domain}",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{ics_time(row['start_time'])}",
+            f"DTEND:{ics_time(lesson_end(row))}",
+            f"SUMMARY:{ics_text(summary)}",
+            f"STATUS:{ICS_STATUSES.get(row['status'], 'CONFIRMED')}",
+            "END:VEVENT",
+        ):
+            yield ics_line(line)
+    yield ics_line("END:VCALENDAR")
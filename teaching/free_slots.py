@@ -0,0 +1,126 @@
+"""
+Maintenance of ``TeacherFreeSlot``: the free hours of every teacher over a
+rolling window of ``TEACHER_FREE_SLOT_DAYS`` days, stored so the catalog can
+filter by availability without running the availability engine per teacher.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from teaching.availability import (
+    SLOT_LENGTH,
+    day_bounds,
+    iter_free_slots,
+    load_teacher_calendars,
+)
+from teaching.models import Schedule, TeacherFreeSlot
+from user.caching import FREE_SLOTS_SCOPE, bump_versions
+from user.models import Teacher
+
+
+def get_window():
+    today = timezone.localdate()
+    days = getattr(settings, "TEACHER_FREE_SLOT_DAYS", 14)
+    return today, today + timedelta(days=days - 1)
+
+
+def refresh_free_slots(teacher_ids, date_from=None, date_to=None):
+    """
+    Recompute the stored slots of ``teacher_ids`` for the local days
+    ``date_from``–``date_to``, clipped to the window. Returns the number of
+    slots written.
+    """
+    window_start, window_end = get_window()
+    date_from = max(date_from or window_start, window_start)
+    date_to = min(date_to or window_end, window_end)
+    if date_from > date_to:
+        return 0
+
+    tz = timezone.get_current_timezone()
+    now = timezone.now()
+    range_start, range_end = day_bounds(date_from, date_to, tz)
+    with transaction.atomic():
+        # Serializes refreshes of a teacher, whose delete and insert would
+        # otherwise collide on (teacher, start_time), and skips teachers
+        # deleted meanwhile. The calendar is read under the lock so the last
+        # refresh to commit is the one that saw every committed change.
+        teacher_ids = list(
+            Teacher.objects.select_for_update()
+            .filter(pk__in=list(teacher_ids))
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        if not teacher_ids:
+            return 0
+        blocks, booked = load_teacher_calendars(teacher_ids, date_from, date_to)
+        slots = [
+            TeacherFreeSlot(
+                teacher_id=teacher_id,
+                start_time=slot_start,
+                end_time=slot_start + SLOT_LENGTH,
+            )
+            for teacher_id, teacher_blocks in blocks.items()
+            for _day, slot_start, _can_book_2_hours in iter_free_slots(
+                teacher_blocks, booked[teacher_id], date_from, date_to, now, tz
+            )
+        ]
+        TeacherFreeSlot.objects.filter(
+            teacher_id__in=teacher_ids,
+            start_time__gte=range_start,
+            start_time__lt=range_end,
+        ).delete()
+        TeacherFreeSlot.objects.bulk_create(slots, batch_size=1000)
+    bump_versions(FREE_SLOTS_SCOPE)
+    return len(slots)
+
+
+def schedule_free_slots_refresh(teacher_id, date_from=None, date_to=None):
+    # Run after commit so the refresh sees the committed schedule and
+    # bookings, and never writes slots for a teacher being deleted.
+    transaction.on_commit(lambda: refresh_free_slots([teacher_id], date_from, date_to))
+
+
+def _teachers_with_schedules():
+    return (
+        Schedule.objects.order_by("teacher_id")
+        .values_list("teacher_id", flat=True)
+        .distinct()
+    )
+
+
+def _refresh_in_chunks(date_from, date_to, chunk_size):
+    teacher_ids = list(_teachers_with_schedules())
+    written = 0
+    for index in range(0, len(teacher_ids), chunk_size):
+        written += refresh_free_slots(
+            teacher_ids[index : index + chunk_size], date_from, date_to
+        )
+    return written
+
+
+def roll_free_slots_window(days=1, chunk_size=200):
+    """
+    Drop slots that have started and fill the days the window moved forward
+    by since the previous run: at least the last ``days``, and back to the
+    last stored day when runs were missed.
+    """
+    expired, _ = TeacherFreeSlot.objects.filter(start_time__lte=timezone.now()).delete()
+    _window_start, window_end = get_window()
+    date_from = window_end - timedelta(days=days - 1)
+    last_start = TeacherFreeSlot.objects.aggregate(last=Max("start_time"))["last"]
+    if last_start is None:
+        date_from = None
+    else:
+        date_from = min(date_from, timezone.localdate(last_start))
+    written = _refresh_in_chunks(date_from, window_end, chunk_size)
+    return {"expired": expired, "written": written}
+
+
+def rebuild_free_slots(chunk_size=200):
+    TeacherFreeSlot.objects.filter(start_time__lte=timezone.now()).delete()
+    TeacherFreeSlot.objects.exclude(teacher_id__in=_teachers_with_schedules()).delete()
+    return _refresh_in_chunks(None, None, chunk_size)
@@ -0,0 +1,100 @@
+"""
+Safe retries for lesson writes: a request repeated with the same
+``Idempotency-Key`` header gets the first response back.
+"""
+
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class IdempotencyMixin:
+    """
+    Replays the stored response of an ``idempotent_actions`` request sent
+    again with the same ``Idempotency-Key`` header, without running the
+    handler. Keys are scoped per user and kept for ``IDEMPOTENCY_KEY_TTL``
+    seconds; 5xx responses are not stored so the client can retry them.
+    """
+
+    idempotent_actions = ()
+    # How long a key stays locked while its first request is in flight.
+    idempotency_lock_timeout = 60
+
+    def get_idempotency_cache_key(self, request, key):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return f"idempotency:{request.user.pk}:{digest}"
+
+    @staticmethod
+    def get_request_fingerprint(request):
+        payload = json.dumps(request.data, sort_keys=True, default=str)
+        return hashlib.sha256(
+            f"{request.method}:{request.path}:{payload}".encode("utf-8")
+        ).hexdigest()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        key = request.headers.get("Idempotency-Key")
+        if key and getattr(self, "action", None) in self.idempotent_actions:
+            method = request.method.lower()
+            handler = getattr(self, method)
+            setattr(
+                self, method, functools.partial(self.idempotent_response, handler, key)
+            )
+
+    def idempotent_response(self, handler, key, request, *args, **kwargs):
+        cache_key = self.get_idempotency_cache_key(request, key)
+        fingerprint = self.get_request_fingerprint(request)
+        # add() is atomic (SET NX on Redis), so only one request runs.
+        if not cache.add(
+            cache_key,
+            {"fingerprint": fingerprint, "status": None},
+            self.idempotency_lock_timeout,
+        ):
+            return self.replay_response(cache.get(cache_key), fingerprint)
+
+        try:
+            response = handler(request, *args, **kwargs)
+        except Exception as exc:
+            # Store API errors too, so a replay skips validation as well.
+            try:
+                response = self.handle_exception(exc)
+            except Exception:
+                cache.delete(cache_key)
+                raise
+
+        if response.status_code >= 500:
+            cache.delete(cache_key)
+        else:
+            cache.set(
+                cache_key,
+                {
+                    "fingerprint": fingerprint,
+                    "status": response.status_code,
+                    "data": response.data,
+                },
+                getattr(settings, "IDEMPOTENCY_KEY_TTL", 86400),
+            )
+        return response
+
+    @staticmethod
+    def replay_response(stored, fingerprint):
+        if stored is None or stored["status"] is None:
+            return Response(
+                {"error": "A request with this Idempotency-Key is in progress."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if stored["fingerprint"] != fingerprint:
+            return Response(
+                {"error": "This Idempotency-Key was used with another request."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        return Response(
+            stored["data"],
+            status=stored["status"],
+            headers={"Idempotent-Replayed": "true"},
+        )
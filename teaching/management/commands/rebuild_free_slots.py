@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from teaching.free_slots import get_window, rebuild_free_slots
+
+
+class Command(BaseCommand):
+    help = "Recompute stored free slots of all teachers for the whole window."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        written = rebuild_free_slots(chunk_size=options["chunk_size"])
+        window_start, window_end = get_window()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stored {written} free slots for {window_start}–{window_end}."
+            )
+        )
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import (
+    Avg,
+    Count,
+    DecimalField,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Sum,
+)
+from django.db.models.functions import Coalesce
+
+from teaching.models import Rating
+from user.caching import CATALOG_SCOPE, bump_versions, teacher_scope
+from user.models import Teacher
+
+
+class Command(BaseCommand):
+    help = "Rebuild denormalized rating count, sum and average for all teachers."
+
+    def handle(self, *args, **options):
+        ratings = (
+            Rating.objects.filter(teacher=OuterRef("pk")).order_by().values("teacher")
+        )
+        with transaction.atomic():
+            updated = Teacher.objects.update(
+                rating_count=Coalesce(
+                    Subquery(ratings.annotate(c=Count("id")).values("c")),
+                    0,
+                    output_field=IntegerField(),
+                ),
+                rating_sum=Coalesce(
+                    Subquery(ratings.annotate(s=Sum("rating")).values("s")),
+                    0,
+                    output_field=IntegerField(),
+                ),
+                rating_average=Coalesce(
+                    Subquery(ratings.annotate(a=Avg("rating")).values("a")),
+                    0,
+                    output_field=DecimalField(max_digits=3, decimal_places=2),
+                ),
+            )
+            teacher_ids = Teacher.objects.values_list("pk", flat=True)
+            bump_versions(CATALOG_SCOPE, *(teacher_scope(pk) for pk in teacher_ids))
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt rating aggregates for {updated} teachers.")
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from teaching.rollups import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily lesson and earnings rollup of all teachers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        written = rebuild_daily_stats(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Stored {written} daily stats rows."))
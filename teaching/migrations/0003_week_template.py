@@ -0,0 +1,66 @@
+# Generated by Django 5.1 on 2026-10-16 17:39
+
+import django.db.models.deletion
+import teaching.week_bitmap
+from django.db import migrations, models
+from teaching.week_bitmap import build_week_mask, to_bytes
+
+
+def backfill_week_templates(apps, schema_editor):
+    Schedule = apps.get_model("teaching", "Schedule")
+    WeekTemplate = apps.get_model("teaching", "WeekTemplate")
+    blocks = {}
+    for teacher_id, *block in Schedule.objects.values_list(
+        "teacher_id", "weekday", "start_time", "end_time"
+    ):
+        blocks.setdefault(teacher_id, []).append(block)
+    WeekTemplate.objects.bulk_create(
+        [
+            WeekTemplate(teacher_id=teacher_id, bitmap=to_bytes(build_week_mask(rows)))
+            for teacher_id, rows in blocks.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("teaching", "0002_initial"),
+        ("user", "0004_teacher_search_document"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WeekTemplate",
+            fields=[
+                (
+                    "teacher",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="week_template",
+                        serialize=False,
+                        to="user.teacher",
+                    ),
+                ),
+                (
+                    "bitmap",
+                    models.BinaryField(
+                        default=teaching.week_bitmap.empty_bitmap,
+                        max_length=84,
+                        verbose_name="Bitmap",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+            ],
+            options={
+                "verbose_name": "Week template",
+                "verbose_name_plural": "Week templates",
+            },
+        ),
+        migrations.RunPython(backfill_week_templates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.1 on 2026-10-16 17:43
+
+from collections import defaultdict
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+from teaching.availability import (
+    ACTIVE_STATUSES,
+    SLOT_LENGTH,
+    day_bounds,
+    iter_free_slots,
+)
+
+
+def backfill_free_slots(apps, schema_editor):
+    Schedule = apps.get_model("teaching", "Schedule")
+    Lesson = apps.get_model("teaching", "Lesson")
+    TeacherFreeSlot = apps.get_model("teaching", "TeacherFreeSlot")
+    blocks = defaultdict(list)
+    for teacher_id, *block in Schedule.objects.values_list(
+        "teacher_id", "weekday", "start_time", "end_time"
+    ):
+        blocks[teacher_id].append(block)
+    if not blocks:
+        return
+
+    tz = timezone.get_current_timezone()
+    now = timezone.now()
+    date_from = timezone.localdate()
+    date_to = date_from + timedelta(
+        days=getattr(settings, "TEACHER_FREE_SLOT_DAYS", 14) - 1
+    )
+    range_start, range_end = day_bounds(date_from, date_to, tz)
+    booked = defaultdict(list)
+    for teacher_id, start, end in Lesson.objects.filter(
+        status__in=ACTIVE_STATUSES,
+        start_time__lt=range_end,
+        start_time__gte=range_start - timedelta(days=1),
+    ).values_list("teacher_id", "start_time", "end_time"):
+        booked[teacher_id].append((start, end))
+    TeacherFreeSlot.objects.bulk_create(
+        (
+            TeacherFreeSlot(
+                teacher_id=teacher_id,
+                start_time=slot_start,
+                end_time=slot_start + SLOT_LENGTH,
+            )
+            for teacher_id, teacher_blocks in blocks.items()
+            for _day, slot_start, _can_book_2_hours in iter_free_slots(
+                teacher_blocks, booked[teacher_id], date_from, date_to, now, tz
+            )
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("teaching", "0003_week_template"),
+        ("user", "0004_teacher_search_document"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TeacherFreeSlot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("start_time", models.DateTimeField(verbose_name="Start time")),
+                ("end_time", models.DateTimeField(verbose_name="End time")),
+                (
+                    "teacher",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="free_slots",
+                        to="user.teacher",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Free slot",
+                "verbose_name_plural": "Free slots",
+                "indexes": [
+                    models.Index(
+                        fields=["start_time", "end_time", "teacher"],
+                        name="teaching_te_start_t_33269e_idx",
+                    )
+                ],
+                "unique_together": {("teacher", "start_time")},
+            },
+        ),
+        migrations.RunPython(backfill_free_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1 on 2026-10-16 17:44
+
+from datetime import timedelta
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+import teaching.models
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_missing_end_times(apps, schema_editor):
+    # Lessons without an end time last one hour everywhere else in the app.
+    Lesson = apps.get_model("teaching", "Lesson")
+    Lesson.objects.filter(end_time__isnull=True).update(
+        end_time=F("start_time") + timedelta(hours=1)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("teaching", "0004_teacher_free_slot"),
+        ("user", "0004_teacher_search_document"),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.RunPython(fill_missing_end_times, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="lesson",
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                condition=models.Q(
+                    ("end_time__isnull", False), ("status__in", ["void", "approved"])
+                ),
+                expressions=[
+                    ("teacher", "="),
+                    (
+                        teaching.models.TsTzRange(
+                            "start_time",
+                            "end_time",
+                            django.contrib.postgres.fields.ranges.RangeBoundary(),
+                        ),
+                        "&&",
+                    ),
+                ],
+                name="teaching_lesson_no_teacher_overlap",
+            ),
+        ),
+    ]
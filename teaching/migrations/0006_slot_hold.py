@@ -0,0 +1,80 @@
+# Generated by Django 5.1 on 2026-10-16 17:51
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+import django.db.models.deletion
+import teaching.models
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("teaching", "0005_lesson_no_teacher_overlap"),
+        ("user", "0004_teacher_search_document"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlotHold",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "token",
+                    models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+                ),
+                ("start_time", models.DateTimeField(verbose_name="Start time")),
+                ("end_time", models.DateTimeField(verbose_name="End time")),
+                ("expires_at", models.DateTimeField(verbose_name="Expires at")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created at"),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="slot_holds",
+                        to="user.student",
+                    ),
+                ),
+                (
+                    "teacher",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="slot_holds",
+                        to="user.teacher",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Slot hold",
+                "verbose_name_plural": "Slot holds",
+                "constraints": [
+                    django.contrib.postgres.constraints.ExclusionConstraint(
+                        expressions=[
+                            ("teacher", "="),
+                            (
+                                teaching.models.TsTzRange(
+                                    "start_time",
+                                    "end_time",
+                                    django.contrib.postgres.fields.ranges.RangeBoundary(),
+                                ),
+                                "&&",
+                            ),
+                        ],
+                        name="teaching_slothold_no_teacher_overlap",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1 on 2026-10-16 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("teaching", "0006_slot_hold"),
+        ("user", "0004_teacher_search_document"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(
+                condition=models.Q(("status__in", ["void", "approved"])),
+                fields=["end_time"],
+                name="lesson_active_end_time_idx",
+            ),
+        ),
+    ]
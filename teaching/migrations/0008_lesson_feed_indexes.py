@@ -0,0 +1,38 @@
+# Generated by Django 5.1 on 2026-10-16 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("teaching", "0007_lesson_active_end_time_idx"),
+        ("user", "0004_teacher_search_document"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(
+                fields=["teacher", "start_time", "id"],
+                include=("end_time", "status"),
+                name="lesson_teacher_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(
+                fields=["student", "start_time", "id"],
+                include=("end_time", "status"),
+                name="lesson_student_feed_idx",
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="lesson",
+            name="teaching_le_teacher_39cbd0_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="lesson",
+            name="teaching_le_student_4c12c5_idx",
+        ),
+    ]
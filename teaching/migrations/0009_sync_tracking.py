@@ -0,0 +1,98 @@
+# Generated by Django 5.1 on 2026-10-16 17:58
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Without history, the creation time is the best "last changed" guess.
+    for model_name in ("Lesson", "InternalNotification"):
+        model = apps.get_model("teaching", model_name)
+        model.objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("teaching", "0008_lesson_feed_indexes"),
+        ("user", "0004_teacher_search_document"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("lesson", "Lesson"),
+                            ("notification", "Notification"),
+                        ],
+                        max_length=20,
+                        verbose_name="Kind",
+                    ),
+                ),
+                ("object_id", models.BigIntegerField(verbose_name="Object id")),
+                ("user_id", models.BigIntegerField(verbose_name="User id")),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Deleted at"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Sync tombstone",
+                "verbose_name_plural": "Sync tombstones",
+            },
+        ),
+        migrations.AddField(
+            model_name="internalnotification",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+        ),
+        migrations.AddField(
+            model_name="lesson",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="internalnotification",
+            index=models.Index(
+                fields=["user", "updated_at", "id"], name="notification_user_sync_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(
+                fields=["teacher", "updated_at", "id"], name="lesson_teacher_sync_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(
+                fields=["student", "updated_at", "id"], name="lesson_student_sync_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="synctombstone",
+            index=models.Index(
+                fields=["user_id", "kind", "deleted_at", "id"],
+                name="tombstone_user_sync_idx",
+            ),
+        ),
+    ]
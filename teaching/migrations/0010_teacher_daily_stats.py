@@ -0,0 +1,66 @@
+# Generated by Django 5.1 on 2026-10-16 18:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("teaching", "0009_sync_tracking"),
+        ("user", "0004_teacher_search_document"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TeacherDailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Date")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("void", "Pending Confirmation"),
+                            ("approved", "Approved"),
+                            ("cancelled_by_teacher", "Cancelled by Teacher"),
+                            ("cancelled_by_student", "Cancelled by Student"),
+                            ("done", "Done"),
+                        ],
+                        max_length=30,
+                        verbose_name="Status",
+                    ),
+                ),
+                ("is_paid", models.BooleanField(verbose_name="Paid")),
+                (
+                    "lesson_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Lessons"),
+                ),
+                (
+                    "minutes",
+                    models.PositiveIntegerField(default=0, verbose_name="Minutes"),
+                ),
+                (
+                    "teacher",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="user.teacher",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Teacher daily stats",
+                "verbose_name_plural": "Teacher daily stats",
+                "unique_together": {("teacher", "date", "status", "is_paid")},
+            },
+        ),
+    ]
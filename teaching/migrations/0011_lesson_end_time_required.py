@@ -0,0 +1,55 @@
+# Generated by Django 5.1 on 2026-10-16 19:05
+
+from datetime import timedelta
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+import teaching.models
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_missing_end_times(apps, schema_editor):
+    # Rows written since 0005 (e.g. in the admin) may still lack an end time.
+    Lesson = apps.get_model("teaching", "Lesson")
+    Lesson.objects.filter(end_time__isnull=True).update(
+        end_time=F("start_time") + timedelta(hours=1)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("teaching", "0010_teacher_daily_stats"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_missing_end_times, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name="lesson",
+            name="teaching_lesson_no_teacher_overlap",
+        ),
+        migrations.AlterField(
+            model_name="lesson",
+            name="end_time",
+            field=models.DateTimeField(blank=True, verbose_name="End time"),
+        ),
+        migrations.AddConstraint(
+            model_name="lesson",
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                condition=models.Q(("status__in", ["void", "approved"])),
+                expressions=[
+                    ("teacher", "="),
+                    (
+                        teaching.models.TsTzRange(
+                            "start_time",
+                            "end_time",
+                            django.contrib.postgres.fields.ranges.RangeBoundary(),
+                        ),
+                        "&&",
+                    ),
+                ],
+                name="teaching_lesson_no_teacher_overlap",
+            ),
+        ),
+    ]
@@ -1,9 +1,18 @@
-from django.db import models
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import (
+    DateTimeRangeField,
+    RangeBoundary,
+    RangeOperators,
+)
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
+import uuid
 from datetime import timedelta
 
+from teaching import week_bitmap
+
 try:
     from user.models import Student, Teacher, Subject, BaseUser, CategoriesOfStudents
 except ImportError:
@@ -44,6 +53,88 @@ class Schedule(models.Model):
         )
 
 
+class WeekTemplate(models.Model):
+    """
+    Union of a teacher's schedule blocks as a quarter-hour bitmap (see
+    ``teaching.week_bitmap``), rebuilt whenever a schedule changes.
+    """
+
+    teacher = models.OneToOneField(
+        Teacher,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="week_template",
+    )
+    bitmap = models.BinaryField(
+        _("Bitmap"),
+        max_length=week_bitmap.BITMAP_BYTES,
+        default=week_bitmap.empty_bitmap,
+    )
+    updated_at = models.DateTimeField(_("Updated at"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Week template")
+        verbose_name_plural = _("Week templates")
+
+    def __str__(self):
+        return f"Week template of teacher {self.teacher_id}"
+
+    @property
+    def mask(self):
+        return week_bitmap.from_bytes(self.bitmap)
+
+    @classmethod
+    def rebuild(cls, teacher_id, create=True):
+        blocks = Schedule.objects.filter(teacher_id=teacher_id).values_list(
+            "weekday", "start_time", "end_time"
+        )
+        bitmap = week_bitmap.to_bytes(week_bitmap.build_week_mask(blocks))
+        if not create:
+            cls.objects.filter(teacher_id=teacher_id).update(
+                bitmap=bitmap, updated_at=timezone.now()
+            )
+            return None
+        template, _created = cls.objects.update_or_create(
+            teacher_id=teacher_id, defaults={"bitmap": bitmap}
+        )
+        return template
+
+    @classmethod
+    def mask_for(cls, teacher_id):
+        bitmap = (
+            cls.objects.filter(teacher_id=teacher_id)
+            .values_list("bitmap", flat=True)
+            .first()
+        )
+        if bitmap is None:
+            return cls.rebuild(teacher_id).mask
+        return week_bitmap.from_bytes(bitmap)
+
+
+class TeacherFreeSlot(models.Model):
+    """
+    A bookable hour of a teacher within the next ``TEACHER_FREE_SLOT_DAYS``
+    days, kept in sync by ``teaching.free_slots`` for availability search.
+    """
+
+    teacher = models.ForeignKey(
+        Teacher, on_delete=models.CASCADE, related_name="free_slots"
+    )
+    start_time = models.DateTimeField(_("Start time"))
+    end_time = models.DateTimeField(_("End time"))
+
+    class Meta:
+        verbose_name = _("Free slot")
+        verbose_name_plural = _("Free slots")
+        unique_together = ("teacher", "start_time")
+        indexes = [
+            models.Index(fields=["start_time", "end_time", "teacher"]),
+        ]
+
+    def __str__(self):
+        return f"Teacher {self.teacher_id} free at {self.start_time}"
+
+
 class LessonStatus(models.TextChoices):
     VOID = "void", _("Pending Confirmation")
     APPROVED = "approved", _("Approved")
@@ -52,6 +143,15 @@ class LessonStatus(models.TextChoices):
     DONE = "done", _("Done")
 
 
+ACTIVE_LESSON_STATUSES = [LessonStatus.VOID, LessonStatus.APPROVED]
+LESSON_OVERLAP_CONSTRAINT = "teaching_lesson_no_teacher_overlap"
+
+
+class TsTzRange(models.Func):
+    function = "TSTZRANGE"
+    output_field = DateTimeRangeField()
+
+
 class Lesson(models.Model):
     student = models.ForeignKey(
         Student, on_delete=models.CASCADE, related_name="lessons"
@@ -71,7 +171,8 @@ class Lesson(models.Model):
         verbose_name=_("Student Category"),
     )
     start_time = models.DateTimeField(_("Start time"))
-    end_time = models.DateTimeField(_("End time"), null=True, blank=True)
+    # Left blank (e.g. in the admin), a lesson lasts one hour; see save().
+    end_time = models.DateTimeField(_("End time"), blank=True)
     homework = models.TextField(_("Homework"), blank=True, null=True)
     status = models.CharField(
         _("Status"),
@@ -84,14 +185,53 @@ class Lesson(models.Model):
         _("Google Meet Link"), max_length=255, blank=True, null=True
     )
     created_at = models.DateTimeField(_("Created at"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("Updated at"), auto_now=True)
 
     class Meta:
         verbose_name = _("Lesson")
         verbose_name_plural = _("Lessons")
         ordering = ["start_time"]
         indexes = [
-            models.Index(fields=["teacher", "start_time", "end_time"]),
-            models.Index(fields=["student", "start_time", "end_time"]),
+            # Lesson feeds page over (start_time, id) per participant; the
+            # included columns serve the busy-interval and status lookups.
+            models.Index(
+                fields=["teacher", "start_time", "id"],
+                name="lesson_teacher_feed_idx",
+                include=["end_time", "status"],
+            ),
+            models.Index(
+                fields=["student", "start_time", "id"],
+                name="lesson_student_feed_idx",
+                include=["end_time", "status"],
+            ),
+            models.Index(
+                fields=["teacher", "updated_at", "id"],
+                name="lesson_teacher_sync_idx",
+            ),
+            models.Index(
+                fields=["student", "updated_at", "id"],
+                name="lesson_student_sync_idx",
+            ),
+            models.Index(
+                fields=["end_time"],
+                name="lesson_active_end_time_idx",
+                condition=models.Q(status__in=ACTIVE_LESSON_STATUSES),
+            ),
+        ]
+        constraints = [
+            # Two active lessons of a teacher can never overlap, however
+            # many bookings race for the same slot.
+            ExclusionConstraint(
+                name=LESSON_OVERLAP_CONSTRAINT,
+                expressions=[
+                    ("teacher", RangeOperators.EQUAL),
+                    (
+                        TsTzRange("start_time", "end_time", RangeBoundary()),
+                        RangeOperators.OVERLAPS,
+                    ),
+                ],
+                condition=models.Q(status__in=ACTIVE_LESSON_STATUSES),
+            ),
         ]
 
     def __str__(self):
@@ -111,6 +251,16 @@ class Lesson(models.Model):
         return timedelta(hours=1)
 
     def save(self, *args, **kwargs):
+        # Partial saves still have to move updated_at for incremental sync.
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = {*update_fields, "updated_at"}
+        if self.end_time is None and self.start_time is not None:
+            self.end_time = self.start_time + timedelta(hours=1)
+            if update_fields is not None:
+                update_fields.add("end_time")
+        if update_fields is not None:
+            kwargs["update_fields"] = update_fields
         super().save(*args, **kwargs)
 
     def is_reviewable(self):
@@ -120,17 +270,57 @@ class Lesson(models.Model):
         self.homework = homework_text
         self.save(update_fields=["homework"])
 
-    def update_status_if_expired(self):
-        now = timezone.now()
-        expired = False
-        if self.end_time and now > self.end_time:
-            expired = True
-        elif not self.end_time and now > (self.start_time + timedelta(hours=1)):
-            expired = True
 
-        if expired and self.status in [LessonStatus.VOID, LessonStatus.APPROVED]:
-            self.status = LessonStatus.DONE
-            self.save(update_fields=["status"])
+SLOT_HOLD_OVERLAP_CONSTRAINT = "teaching_slothold_no_teacher_overlap"
+
+
+class SlotHold(models.Model):
+    """
+    A short-lived claim on a teacher's slot while a student fills in the
+    booking form. Held slots are hidden from availability and can only be
+    booked with the hold's ``token`` until ``expires_at``.
+    """
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    teacher = models.ForeignKey(
+        Teacher, on_delete=models.CASCADE, related_name="slot_holds"
+    )
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, related_name="slot_holds"
+    )
+    start_time = models.DateTimeField(_("Start time"))
+    end_time = models.DateTimeField(_("End time"))
+    expires_at = models.DateTimeField(_("Expires at"))
+    created_at = models.DateTimeField(_("Created at"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Slot hold")
+        verbose_name_plural = _("Slot holds")
+        constraints = [
+            # Expired holds are deleted in the same transaction that places
+            # a new one, so the constraint only ever arbitrates live holds.
+            ExclusionConstraint(
+                name=SLOT_HOLD_OVERLAP_CONSTRAINT,
+                expressions=[
+                    ("teacher", RangeOperators.EQUAL),
+                    (
+                        TsTzRange("start_time", "end_time", RangeBoundary()),
+                        RangeOperators.OVERLAPS,
+                    ),
+                ],
+            ),
+        ]
+
+    def __str__(self):
+        return f"Teacher {self.teacher_id} held until {self.expires_at}"
+
+    @classmethod
+    def active(cls, now=None):
+        return cls.objects.filter(expires_at__gt=now or timezone.now())
+
+    @classmethod
+    def expired(cls, now=None):
+        return cls.objects.filter(expires_at__lte=now or timezone.now())
 
 
 class InternalNotification(models.Model):
@@ -147,16 +337,80 @@ class InternalNotification(models.Model):
     message = models.TextField(_("Message"))
     is_read = models.BooleanField(_("Read"), default=False)
     created_at = models.DateTimeField(_("Created at"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("Updated at"), auto_now=True)
 
     class Meta:
         verbose_name = _("Internal Notification")
         verbose_name_plural = _("Internal Notifications")
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "updated_at", "id"],
+                name="notification_user_sync_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Notification to {self.user.email}: {self.message[:50]}..."
 
 
+class TeacherDailyStats(models.Model):
+    """
+    Lessons and hours of a teacher per local day, status and payment flag,
+    kept current by ``teaching.rollups`` so dashboards never scan lessons.
+    """
+
+    teacher = models.ForeignKey(
+        Teacher, on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    date = models.DateField(_("Date"))
+    status = models.CharField(_("Status"), max_length=30, choices=LessonStatus.choices)
+    is_paid = models.BooleanField(_("Paid"))
+    lesson_count = models.PositiveIntegerField(_("Lessons"), default=0)
+    minutes = models.PositiveIntegerField(_("Minutes"), default=0)
+
+    class Meta:
+        verbose_name = _("Teacher daily stats")
+        verbose_name_plural = _("Teacher daily stats")
+        unique_together = ("teacher", "date", "status", "is_paid")
+
+    def __str__(self):
+        return f"Teacher {self.teacher_id} on {self.date}: {self.lesson_count}"
+
+
+class SyncTombstone(models.Model):
+    """
+    Marks a lesson or notification deleted for one of the users who could
+    see it, so incremental sync can report the deletion. ``user_id`` is a
+    plain column: the user may be the one being deleted.
+    """
+
+    KIND_LESSON = "lesson"
+    KIND_NOTIFICATION = "notification"
+    KINDS = [
+        (KIND_LESSON, _("Lesson")),
+        (KIND_NOTIFICATION, _("Notification")),
+    ]
+
+    kind = models.CharField(_("Kind"), max_length=20, choices=KINDS)
+    object_id = models.BigIntegerField(_("Object id"))
+    user_id = models.BigIntegerField(_("User id"))
+    deleted_at = models.DateTimeField(_("Deleted at"), default=timezone.now)
+
+    class Meta:
+        verbose_name = _("Sync tombstone")
+        verbose_name_plural = _("Sync tombstones")
+        indexes = [
+            models.Index(
+                fields=["user_id", "kind", "deleted_at", "id"],
+                name="tombstone_user_sync_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted at {self.deleted_at}"
+
+
 class Rating(models.Model):
     student = models.ForeignKey(
         Student, on_delete=models.CASCADE, related_name="given_ratings"
@@ -182,3 +436,12 @@ class Rating(models.Model):
     def __str__(self):
         lesson_info = f" for Lesson {self.lesson.id}" if self.lesson else ""
         return f"{self.student.first_name} rated {self.teacher.first_name}: {self.rating}/5{lesson_info}"
+
+    def save(self, *args, **kwargs):
+        # Teacher rating aggregates are updated by signals in the same transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
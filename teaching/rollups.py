@@ -0,0 +1,162 @@
+"""
+Maintenance of ``TeacherDailyStats``. Lesson writes recompute the rollup of
+the teacher-days they touch after commit; ``rebuild_teacher_stats``
+recomputes everything.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import Coalesce, Trunc, TruncDate
+from django.utils import timezone
+
+from teaching.availability import day_bounds
+from teaching.models import Lesson, LessonStatus, TeacherDailyStats
+from user.models import Teacher
+
+STATS_PERIODS = ("day", "week", "month")
+# Cancelled lessons are counted but never earn anything.
+EARNING_STATUSES = {LessonStatus.VOID, LessonStatus.APPROVED, LessonStatus.DONE}
+
+
+def compute_daily_stats(teacher_id, date_from=None, date_to=None):
+    """Unsaved rollup rows of one teacher, for the whole history by default."""
+    lessons = Lesson.objects.filter(teacher_id=teacher_id)
+    if date_from is not None:
+        range_start, range_end = day_bounds(date_from, date_to)
+        lessons = lessons.filter(start_time__gte=range_start, start_time__lt=range_end)
+    groups = (
+        lessons.annotate(day=TruncDate("start_time"))
+        .values("day", "status", "is_paid")
+        .annotate(
+            lesson_count=Count("id"),
+            duration=Sum(
+                Coalesce("end_time", F("start_time") + timedelta(hours=1))
+                - F("start_time")
+            ),
+        )
+        .order_by()
+    )
+    return [
+        TeacherDailyStats(
+            teacher_id=teacher_id,
+            date=group["day"],
+            status=group["status"],
+            is_paid=group["is_paid"],
+            lesson_count=group["lesson_count"],
+            minutes=group["duration"] // timedelta(minutes=1),
+        )
+        for group in groups
+    ]
+
+
+def refresh_daily_stats(teacher_id, date_from=None, date_to=None):
+    """
+    Replace the rollup rows of ``teacher_id`` for the local days
+    ``date_from``–``date_to`` (all days if not given). Returns the number of
+    rows written.
+    """
+    with transaction.atomic():
+        # Serialises refreshes of one teacher so delete + insert cannot race.
+        if not Teacher.objects.select_for_update().filter(pk=teacher_id).exists():
+            return 0
+        stats = compute_daily_stats(teacher_id, date_from, date_to)
+        existing = TeacherDailyStats.objects.filter(teacher_id=teacher_id)
+        if date_from is not None:
+            existing = existing.filter(date__range=(date_from, date_to))
+        existing.delete()
+        TeacherDailyStats.objects.bulk_create(stats)
+    return len(stats)
+
+
+def schedule_daily_stats_refresh(teacher_days):
+    """
+    Refresh the rollup for ``(teacher_id, start_time)`` pairs once the
+    current transaction commits, one range per teacher.
+    """
+    days = defaultdict(set)
+    for teacher_id, start_time in teacher_days:
+        days[teacher_id].add(timezone.localdate(start_time))
+
+    def refresh():
+        for teacher_id, dates in days.items():
+            refresh_daily_stats(teacher_id, min(dates), max(dates))
+
+    if days:
+        transaction.on_commit(refresh)
+
+
+def rebuild_daily_stats(chunk_size=200):
+    """Recompute the rollup of every teacher. Returns rows written."""
+    written = 0
+    for teacher_id in Teacher.objects.values_list("pk", flat=True).iterator(
+        chunk_size=chunk_size
+    ):
+        written += refresh_daily_stats(teacher_id)
+    return written
+
+
+def _empty_period():
+    return {
+        "lessons": 0,
+        "hours": Decimal(0),
+        "earnings": Decimal(0),
+        "paid_earnings": Decimal(0),
+        "unpaid_earnings": Decimal(0),
+        "statuses": {},
+    }
+
+
+def _add_group(period, group, price):
+    hours = Decimal(group["minutes"]) / 60
+    period["lessons"] += group["lessons"]
+    period["hours"] += hours
+    period["statuses"][group["status"]] = (
+        period["statuses"].get(group["status"], 0) + group["lessons"]
+    )
+    if group["status"] in EARNING_STATUSES:
+        earnings = hours * price
+        period["earnings"] += earnings
+        period["paid_earnings" if group["is_paid"] else "unpaid_earnings"] += earnings
+
+
+def _rounded(values):
+    cent = Decimal("0.01")
+    return {
+        key: value.quantize(cent) if isinstance(value, Decimal) else value
+        for key, value in values.items()
+    }
+
+
+def summarize_daily_stats(teacher, date_from, date_to, period="day"):
+    """
+    Lessons, hours and earnings of ``teacher`` per ``period`` between the
+    two dates, from the rollup alone. Earnings use the current lesson price
+    per hour.
+    """
+    groups = (
+        TeacherDailyStats.objects.filter(
+            teacher=teacher, date__range=(date_from, date_to)
+        )
+        .annotate(period=Trunc("date", period, output_field=DateField()))
+        .values("period", "status", "is_paid")
+        .annotate(lessons=Sum("lesson_count"), minutes=Sum("minutes"))
+        .order_by("period")
+    )
+    price = teacher.lesson_price or Decimal(0)
+    periods = {}
+    totals = _empty_period()
+    for group in groups:
+        _add_group(periods.setdefault(group["period"], _empty_period()), group, price)
+        _add_group(totals, group, price)
+    return {
+        "period": period,
+        "results": [
+            {"start": start.isoformat(), **_rounded(values)}
+            for start, values in periods.items()
+        ],
+        "totals": _rounded(totals),
+    }
@@ -1,5 +1,7 @@
-from datetime import timedelta, datetime
+from datetime import datetime, time, timedelta
 
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
@@ -23,8 +25,14 @@ try:
         Lesson,
         Rating,
         InternalNotification,
-        LessonStatus,
+        SlotHold,
+        LESSON_OVERLAP_CONSTRAINT,
+        SLOT_HOLD_OVERLAP_CONSTRAINT,
     )
+    from teaching import week_bitmap
+    from teaching.availability import SLOT_LENGTH, BusyIntervals, get_booked_intervals
+    from teaching.eligibility import get_booking_eligibility, get_week_mask
+    from teaching.signals import lessons_bulk_created
 except ImportError:
     raise ImportError("Could not import models from 'teaching' app.")
 
@@ -80,6 +88,11 @@ class ScheduleSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 _("Start time must be earlier than end time.")
             )
+        for value in (start_time, end_time):
+            if value and not week_bitmap.is_on_quarter(value):
+                raise serializers.ValidationError(
+                    _("Schedule times must fall on a quarter hour.")
+                )
         return data
 
 
@@ -138,6 +151,14 @@ class LessonDetailSerializer(serializers.ModelSerializer):
     google_meet_link = serializers.URLField(
         required=False, allow_blank=True, allow_null=True, max_length=255
     )
+    hold_token = serializers.UUIDField(write_only=True, required=False)
+
+    overlap_error_message = _(
+        "The selected time slot overlaps with another lesson for this teacher."
+    )
+    held_error_message = _(
+        "The selected time slot is temporarily held by another student."
+    )
 
     class Meta:
         model = Lesson
@@ -158,6 +179,7 @@ class LessonDetailSerializer(serializers.ModelSerializer):
             "is_paid",
             "homework",
             "google_meet_link",
+            "hold_token",
             "created_at",
         ]
         read_only_fields = [
@@ -198,18 +220,43 @@ class LessonDetailSerializer(serializers.ModelSerializer):
                 )
             return data
 
+        start_time = data.get("start_time")
+        duration_hours = data.get("duration_hours", 1)
+        subject = data.get("subject")
+        category = data.get("category")
+        teacher_id, student_obj = self.resolve_participants(data)
+
+        if not all([start_time, duration_hours, student_obj, subject, category]):
+            raise serializers.ValidationError(_("Missing required fields for booking."))
+
+        end_time = start_time + timedelta(hours=duration_hours)
+        data["end_time"] = end_time
+
+        teacher_obj = self.get_eligible_teacher(
+            teacher_id, subject, category, start_time, end_time, data.get("hold_token")
+        )
+
+        local_start = timezone.localtime(start_time)
+        local_end = local_start + timedelta(hours=duration_hours)
+        lesson_mask = week_bitmap.interval_mask(local_start, local_end)
+        if not week_bitmap.covers(get_week_mask(teacher_obj), lesson_mask):
+            raise serializers.ValidationError(
+                self.schedule_error_message(local_start, local_end, duration_hours)
+            )
+
+        data["teacher"] = teacher_obj
+        data["student"] = student_obj
+        return data
+
+    def resolve_participants(self, data):
+        """The booking's (teacher id, student), depending on who is booking."""
         request = self.context.get("request")
         user = request.user if request else None
         if not user or not user.is_authenticated:
             raise serializers.ValidationError(_("Authentication required."))
 
-        start_time = data.get("start_time")
-        duration_hours = data.get("duration_hours", 1)
-        subject = data.get("subject")
-        category = data.get("category")
         student_obj = data.get("student")
-
-        teacher_obj = None
+        teacher_id = None
         is_created_by_teacher = (
             hasattr(user, "teacher_profile") and user.role == BaseUser.ROLE_TEACHER
         )
@@ -223,14 +270,14 @@ class LessonDetailSerializer(serializers.ModelSerializer):
             )
 
         if is_created_by_teacher:
-            teacher_obj = user.teacher_profile
+            teacher_id = user.teacher_profile.pk
             if not student_obj:
                 raise serializers.ValidationError(
                     {"student_id": _("Student is required when booking by teacher.")}
                 )
         elif is_created_by_student:
             student_obj = user.student_profile
-            teacher_id = self.context.get("request").data.get("teacher_id")
+            teacher_id = request.data.get("teacher_id")
             if not teacher_id:
                 raise serializers.ValidationError(
                     {
@@ -240,125 +287,336 @@ class LessonDetailSerializer(serializers.ModelSerializer):
                     }
                 )
             try:
-                teacher_obj = Teacher.objects.get(id=teacher_id)
-                data["teacher"] = teacher_obj
-            except Teacher.DoesNotExist:
+                teacher_id = int(teacher_id)
+            except (TypeError, ValueError):
                 raise serializers.ValidationError(
                     {"teacher_id": _("Invalid teacher selected.")}
                 )
 
-        if not teacher_obj:
+        if not teacher_id:
             raise serializers.ValidationError(
                 _("Could not determine the teacher for the lesson.")
             )
+        return teacher_id, student_obj
+
+    def get_eligible_teacher(
+        self,
+        teacher_id,
+        subject,
+        category,
+        start_time=None,
+        end_time=None,
+        hold_token=None,
+    ):
+        """
+        Load the teacher and check every booking rule in one query; the
+        week template bitmap comes along for the schedule-fit check.
+        """
+        teacher_obj = get_booking_eligibility(
+            teacher_id, subject.pk, category.pk, start_time, end_time, hold_token
+        )
+        if teacher_obj is None:
+            raise serializers.ValidationError(
+                {"teacher_id": _("Invalid teacher selected.")}
+            )
+        if not teacher_obj.teaches_subject:
+            raise serializers.ValidationError(
+                _("This teacher does not teach the selected subject.")
+            )
+        if not teacher_obj.accepts_category:
+            raise serializers.ValidationError(
+                _("This teacher does not work with the selected student category.")
+            )
+        if teacher_obj.has_overlap:
+            raise serializers.ValidationError(self.overlap_error_message)
+        if teacher_obj.is_held:
+            raise serializers.ValidationError(self.held_error_message)
+        return teacher_obj
+
+    @staticmethod
+    def schedule_error_message(local_start, local_end, duration_hours):
+        if local_end.date() != local_start.date() and local_end.time() != time(0):
+            return _(
+                "The selected time slot (crossing midnight) does not fit "
+                "within the teacher's available schedule."
+            )
+        if duration_hours == 2:
+            return _(
+                "The selected 2-hour slot does not fit within "
+                "the teacher's available schedule."
+            )
+        return _(
+            "The selected time slot does not fit within "
+            "the teacher's available schedule."
+        )
+
+    def create(self, validated_data):
+        validated_data.pop("duration_hours", None)
+        hold_token = validated_data.pop("hold_token", None)
+        # The exists() check in validate() cannot see a concurrent booking;
+        # the exclusion constraint on the lesson range is the final word.
+        try:
+            with transaction.atomic():
+                lesson = super().create(validated_data)
+                if hold_token is not None:
+                    SlotHold.objects.filter(token=hold_token).delete()
+                return lesson
+        except IntegrityError as exc:
+            if LESSON_OVERLAP_CONSTRAINT in str(exc):
+                raise serializers.ValidationError(self.overlap_error_message)
+            raise
+
+
+class LessonSeriesSerializer(LessonDetailSerializer):
+    """
+    Books ``count`` lessons repeating every week (or every other week) from
+    ``start_time``. All occurrences are checked against the teacher's week
+    template and existing bookings with a fixed number of queries.
+    """
+
+    RECURRENCE_WEEKS = {"weekly": 1, "biweekly": 2}
+    MAX_COUNT = 26
+    busy_error_message = _(
+        "The selected time slot is already booked or held by another student."
+    )
+
+    recurrence = serializers.ChoiceField(
+        choices=list(RECURRENCE_WEEKS), default="weekly", write_only=True
+    )
+    count = serializers.IntegerField(min_value=2, max_value=MAX_COUNT, write_only=True)
+    skip_conflicts = serializers.BooleanField(default=False, write_only=True)
+
+    class Meta(LessonDetailSerializer.Meta):
+        fields = LessonDetailSerializer.Meta.fields + [
+            "recurrence",
+            "count",
+            "skip_conflicts",
+        ]
+
+    def get_occurrences(self, start_time, duration_hours, recurrence, count):
+        # Step in local wall-clock time so a series keeps its hour across DST.
+        local_start = timezone.localtime(start_time)
+        step = timedelta(weeks=self.RECURRENCE_WEEKS[recurrence])
+        occurrences = []
+        for index in range(count):
+            start = timezone.make_aware(
+                datetime.combine(local_start.date() + step * index, local_start.time())
+            )
+            occurrences.append((start, start + timedelta(hours=duration_hours)))
+        return occurrences
+
+    def validate(self, data):
+        start_time = data.get("start_time")
+        duration_hours = data.get("duration_hours", 1)
+        subject = data.get("subject")
+        category = data.get("category")
+        teacher_id, student_obj = self.resolve_participants(data)
 
         if not all([start_time, duration_hours, student_obj, subject, category]):
             raise serializers.ValidationError(_("Missing required fields for booking."))
 
-        end_time = start_time + timedelta(hours=duration_hours)
-        data["end_time"] = end_time
+        teacher_obj = self.get_eligible_teacher(teacher_id, subject, category)
+        occurrences = self.get_occurrences(
+            start_time, duration_hours, data["recurrence"], data["count"]
+        )
+        week_mask = get_week_mask(teacher_obj)
+        busy = BusyIntervals(
+            (start, end or start + SLOT_LENGTH)
+            for _teacher_id, start, end in get_booked_intervals(
+                [teacher_obj.pk],
+                occurrences[0][0],
+                occurrences[-1][1],
+                include_holds=True,
+                hold_token=data.get("hold_token"),
+            )
+        )
+
+        accepted = []
+        conflicts = []
+        for start, end in occurrences:
+            local_start = timezone.localtime(start)
+            local_end = timezone.localtime(end)
+            if not week_bitmap.covers(
+                week_mask, week_bitmap.interval_mask(local_start, local_end)
+            ):
+                error = self.schedule_error_message(
+                    local_start, local_end, duration_hours
+                )
+            elif busy.overlaps(start, end):
+                error = self.busy_error_message
+            else:
+                accepted.append((start, end))
+                continue
+            conflicts.append({"start_time": start.isoformat(), "error": error})
+
+        if not accepted or (conflicts and not data["skip_conflicts"]):
+            raise serializers.ValidationError({"conflicts": conflicts})
+
+        data["teacher"] = teacher_obj
+        data["student"] = student_obj
+        data["occurrences"] = accepted
+        data["conflicts"] = conflicts
+        return data
+
+    def create(self, validated_data):
+        occurrences = validated_data.pop("occurrences")
+        hold_token = validated_data.pop("hold_token", None)
+        for field in (
+            "conflicts",
+            "recurrence",
+            "count",
+            "skip_conflicts",
+            "duration_hours",
+            "start_time",
+            "end_time",
+        ):
+            validated_data.pop(field, None)
+        lessons = [
+            Lesson(start_time=start, end_time=end, **validated_data)
+            for start, end in occurrences
+        ]
+        try:
+            with transaction.atomic():
+                lessons = Lesson.objects.bulk_create(lessons)
+                if hold_token is not None:
+                    SlotHold.objects.filter(token=hold_token).delete()
+        except IntegrityError as exc:
+            if LESSON_OVERLAP_CONSTRAINT in str(exc):
+                raise serializers.ValidationError(self.overlap_error_message)
+            raise
+        lessons_bulk_created(validated_data["teacher"].pk, lessons)
+        return lessons
+
+
+class SlotHoldSerializer(serializers.ModelSerializer):
+    """
+    Holds a teacher's slot for ``SLOT_HOLD_SECONDS`` while the student fills
+    in the booking form; the returned ``token`` is then passed as
+    ``hold_token`` when booking. A student keeps one hold per teacher.
+    """
+
+    teacher_id = serializers.IntegerField()
+    duration_hours = serializers.ChoiceField(
+        choices=[1, 2],
+        write_only=True,
+        required=False,
+        label=_("Duration (hours)"),
+        default=1,
+    )
+
+    class Meta:
+        model = SlotHold
+        fields = [
+            "token",
+            "teacher_id",
+            "start_time",
+            "end_time",
+            "duration_hours",
+            "expires_at",
+        ]
+        read_only_fields = ["token", "end_time", "expires_at"]
+
+    @staticmethod
+    def validate_start_time(value):
+        return LessonDetailSerializer.validate_start_time(value)
 
-        if subject not in teacher_obj.subjects.all():
+    def validate(self, data):
+        request = self.context.get("request")
+        student_obj = getattr(request.user, "student_profile", None)
+        if student_obj is None:
+            raise serializers.ValidationError(_("Only students can hold slots."))
+
+        start_time = data["start_time"]
+        duration_hours = data.pop("duration_hours", 1)
+        end_time = start_time + timedelta(hours=duration_hours)
+        teacher_obj = get_booking_eligibility(
+            data["teacher_id"],
+            None,
+            None,
+            start_time,
+            end_time,
+            holder_id=student_obj.pk,
+        )
+        if teacher_obj is None:
             raise serializers.ValidationError(
-                _("This teacher does not teach the selected subject.")
+                {"teacher_id": _("Invalid teacher selected.")}
             )
-        if category not in teacher_obj.categories.all():
+        if teacher_obj.has_overlap:
             raise serializers.ValidationError(
-                _("This teacher does not work with the selected student category.")
+                LessonDetailSerializer.overlap_error_message
             )
-
-        overlapping_lessons = Lesson.objects.filter(
-            teacher=teacher_obj,
-            status__in=[LessonStatus.VOID, LessonStatus.APPROVED],
-            start_time__lt=end_time,
-            end_time__gt=start_time,
-        )
-        if overlapping_lessons.exists():
+        if teacher_obj.is_held:
+            raise serializers.ValidationError(LessonDetailSerializer.held_error_message)
+        local_start = timezone.localtime(start_time)
+        local_end = local_start + timedelta(hours=duration_hours)
+        if not week_bitmap.covers(
+            get_week_mask(teacher_obj),
+            week_bitmap.interval_mask(local_start, local_end),
+        ):
             raise serializers.ValidationError(
-                _(
-                    "The selected time slot overlaps with "
-                    "another lesson for this teacher."
+                LessonDetailSerializer.schedule_error_message(
+                    local_start, local_end, duration_hours
                 )
             )
 
-        lesson_day_name = start_time.strftime("%A").lower()
-        lesson_start_time = start_time.time()
-        lesson_end_time = end_time.time()
-
-        if lesson_end_time <= lesson_start_time:
-            schedule_part1 = Schedule.objects.filter(
-                teacher=teacher_obj,
-                weekday=lesson_day_name,
-                start_time__lte=lesson_start_time,
-                end_time=datetime.strptime("23:59:59", "%H:%M:%S").time(),
-            ).exists()
-            next_day_index = (start_time.weekday() + 1) % 7
-            days_of_week = [
-                "monday",
-                "tuesday",
-                "wednesday",
-                "thursday",
-                "friday",
-                "saturday",
-                "sunday",
-            ]
-            next_day_name = days_of_week[next_day_index]
-            schedule_part2 = Schedule.objects.filter(
-                teacher=teacher_obj,
-                weekday=next_day_name,
-                start_time=datetime.strptime("00:00:00", "%H:%M:%S").time(),
-                end_time__gte=lesson_end_time,
-            ).exists()
-            if not (schedule_part1 and schedule_part2):
+        data["student"] = student_obj
+        data["end_time"] = end_time
+        data["expires_at"] = timezone.now() + timedelta(
+            seconds=settings.SLOT_HOLD_SECONDS
+        )
+        return data
+
+    def create(self, validated_data):
+        teacher_id = validated_data["teacher_id"]
+        # Like SET NX on a cache key: expired holds on the slot are cleared
+        # and the insert either wins or trips the exclusion constraint.
+        try:
+            with transaction.atomic():
+                SlotHold.expired().filter(
+                    teacher_id=teacher_id,
+                    start_time__lt=validated_data["end_time"],
+                    end_time__gt=validated_data["start_time"],
+                ).delete()
+                SlotHold.objects.filter(
+                    teacher_id=teacher_id, student=validated_data["student"]
+                ).delete()
+                return super().create(validated_data)
+        except IntegrityError as exc:
+            if SLOT_HOLD_OVERLAP_CONSTRAINT in str(exc):
                 raise serializers.ValidationError(
-                    _(
-                        "The selected time slot (crossing midnight) does not fit "
-                        "within the teacher's available schedule."
-                    )
+                    LessonDetailSerializer.held_error_message
                 )
-        else:
-            schedule_exists = Schedule.objects.filter(
-                teacher=teacher_obj,
-                weekday=lesson_day_name,
-                start_time__lte=lesson_start_time,
-                end_time__gte=lesson_end_time,
-            ).exists()
-            if not schedule_exists:
-                if duration_hours == 2:
-                    first_hour_sch = Schedule.objects.filter(
-                        teacher=teacher_obj,
-                        weekday=lesson_day_name,
-                        start_time__lte=lesson_start_time,
-                        end_time__gte=(start_time + timedelta(hours=1)).time(),
-                    ).exists()
-                    second_hour_sch = Schedule.objects.filter(
-                        teacher=teacher_obj,
-                        weekday=lesson_day_name,
-                        start_time__lte=(start_time + timedelta(hours=1)).time(),
-                        end_time__gte=lesson_end_time,
-                    ).exists()
-                    if not (first_hour_sch and second_hour_sch):
-                        raise serializers.ValidationError(
-                            _(
-                                "The selected 2-hour slot does not fit within "
-                                "the teacher's available schedule."
-                            )
-                        )
-                else:
-                    raise serializers.ValidationError(
-                        _(
-                            "The selected time slot does not fit within "
-                            "the teacher's available schedule."
-                        )
-                    )
+            raise
 
-        if is_created_by_teacher:
-            data["teacher"] = teacher_obj
-            data["student"] = student_obj
-        elif is_created_by_student:
-            data["student"] = student_obj
-            data["teacher"] = teacher_obj
-        return data
+
+class LessonBulkActionSerializer(serializers.Serializer):
+    """
+    Lesson ids for one bulk action, plus the value the action sets:
+    ``is_paid`` for mark-paid and ``homework`` for homework.
+    """
+
+    MAX_IDS = 200
+    REQUIRED_FIELDS = {"mark-paid": "is_paid", "homework": "homework"}
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_IDS,
+    )
+    is_paid = serializers.BooleanField(required=False)
+    homework = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    def validate_ids(self, value):
+        # Repeated ids get a single outcome.
+        return list(dict.fromkeys(value))
+
+    def validate(self, attrs):
+        field_name = self.REQUIRED_FIELDS.get(self.context.get("operation"))
+        if field_name and field_name not in attrs:
+            raise serializers.ValidationError(
+                {field_name: _("This field is required for this action.")}
+            )
+        return attrs
 
 
 class RatingSerializer(serializers.ModelSerializer):
@@ -0,0 +1,274 @@
+from django.db.models import DecimalField, F, Q
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from teaching.free_slots import schedule_free_slots_refresh
+from teaching.models import (
+    InternalNotification,
+    Lesson,
+    Rating,
+    Schedule,
+    SlotHold,
+    SyncTombstone,
+    WeekTemplate,
+)
+from teaching.rollups import schedule_daily_stats_refresh
+from user.caching import (
+    CATALOG_SCOPE,
+    availability_scope,
+    bump_versions,
+    lesson_summary_scope,
+    teacher_scope,
+)
+from user.models import BaseUser, Teacher
+
+
+def apply_rating_delta(teacher_id, count_delta, sum_delta):
+    new_count = F("rating_count") + count_delta
+    new_sum = F("rating_sum") + sum_delta
+    Teacher.objects.filter(pk=teacher_id).update(
+        rating_count=new_count,
+        rating_sum=new_sum,
+        rating_average=Coalesce(
+            Cast(new_sum, DecimalField(max_digits=12, decimal_places=4))
+            / NullIf(new_count, 0),
+            0,
+            output_field=DecimalField(max_digits=3, decimal_places=2),
+        ),
+    )
+
+
+@receiver(pre_save, sender=Rating)
+def remember_previous_rating(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = (
+            Rating.objects.filter(pk=instance.pk)
+            .values_list("teacher_id", "rating")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Rating)
+def update_teacher_rating_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_rating", None)
+    if created or previous is None:
+        apply_rating_delta(instance.teacher_id, 1, instance.rating)
+        return
+
+    previous_teacher_id, previous_rating = previous
+    if previous_teacher_id != instance.teacher_id:
+        apply_rating_delta(previous_teacher_id, -1, -previous_rating)
+        apply_rating_delta(instance.teacher_id, 1, instance.rating)
+    elif previous_rating != instance.rating:
+        apply_rating_delta(instance.teacher_id, 0, instance.rating - previous_rating)
+
+
+@receiver(post_delete, sender=Rating)
+def update_teacher_rating_on_delete(sender, instance, **kwargs):
+    apply_rating_delta(instance.teacher_id, -1, -instance.rating)
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def bump_teacher_cache_on_rating_change(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_rating", None)
+    scopes = [CATALOG_SCOPE, teacher_scope(instance.teacher_id)]
+    if previous and previous[0] != instance.teacher_id:
+        scopes.append(teacher_scope(previous[0]))
+    bump_versions(*scopes)
+
+
+@receiver(pre_save, sender=Schedule)
+def remember_previous_schedule_teacher(sender, instance, **kwargs):
+    instance._previous_teacher_id = None
+    if instance.pk:
+        instance._previous_teacher_id = (
+            Schedule.objects.filter(pk=instance.pk)
+            .values_list("teacher_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Schedule)
+def rebuild_week_template_on_save(sender, instance, **kwargs):
+    WeekTemplate.rebuild(instance.teacher_id)
+    previous_teacher_id = getattr(instance, "_previous_teacher_id", None)
+    if previous_teacher_id and previous_teacher_id != instance.teacher_id:
+        WeekTemplate.rebuild(previous_teacher_id, create=False)
+
+
+@receiver(post_delete, sender=Schedule)
+def rebuild_week_template_on_delete(sender, instance, **kwargs):
+    # No upsert here: when a teacher is deleted the template may already be
+    # gone, and recreating it would point at the row being removed.
+    WeekTemplate.rebuild(instance.teacher_id, create=False)
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def refresh_free_slots_on_schedule_change(sender, instance, **kwargs):
+    schedule_free_slots_refresh(instance.teacher_id)
+    previous_teacher_id = getattr(instance, "_previous_teacher_id", None)
+    if previous_teacher_id and previous_teacher_id != instance.teacher_id:
+        schedule_free_slots_refresh(previous_teacher_id)
+
+
+def summary_scopes(lessons):
+    scopes = set()
+    for lesson in lessons:
+        scopes.add(lesson_summary_scope("teacher", lesson.teacher_id))
+        scopes.add(lesson_summary_scope("student", lesson.student_id))
+    return scopes
+
+
+def lessons_bulk_created(teacher_id, lessons):
+    """Side effects of Lesson post_save, once for a bulk_create batch."""
+    if not lessons:
+        return
+    bump_versions(availability_scope(teacher_id), *summary_scopes(lessons))
+    schedule_daily_stats_refresh((teacher_id, lesson.start_time) for lesson in lessons)
+    schedule_free_slots_refresh(
+        teacher_id,
+        min(timezone.localdate(lesson.start_time) for lesson in lessons),
+        max(timezone.localdate(lesson.end_time) for lesson in lessons),
+    )
+
+
+def lessons_updated(lessons):
+    """
+    Side effects of Lesson post_save for rows changed by a queryset UPDATE.
+    ``lessons`` need ``teacher_id``, ``student_id``, ``start_time`` and
+    ``end_time``.
+    """
+    by_teacher = {}
+    for lesson in lessons:
+        by_teacher.setdefault(lesson.teacher_id, []).append(lesson)
+    if not by_teacher:
+        return
+    bump_versions(
+        *(availability_scope(teacher_id) for teacher_id in by_teacher),
+        *summary_scopes(lessons),
+    )
+    schedule_daily_stats_refresh(
+        (lesson.teacher_id, lesson.start_time) for lesson in lessons
+    )
+    for teacher_id, teacher_lessons in by_teacher.items():
+        schedule_free_slots_refresh(
+            teacher_id,
+            min(timezone.localdate(lesson.start_time) for lesson in teacher_lessons),
+            max(
+                timezone.localdate(lesson.end_time or lesson.start_time)
+                for lesson in teacher_lessons
+            ),
+        )
+
+
+# Lesson fields that decide which of a teacher's slots are free.
+SLOT_FIELDS = ("teacher_id", "start_time", "end_time", "status")
+
+
+def schedule_lesson_slots_refresh(teacher_id, start_time, end_time):
+    schedule_free_slots_refresh(
+        teacher_id,
+        timezone.localdate(start_time),
+        timezone.localdate(end_time or start_time),
+    )
+
+
+@receiver(pre_save, sender=Lesson)
+def remember_previous_lesson_slot(sender, instance, update_fields=None, **kwargs):
+    instance._previous_slot = None
+    if not instance.pk:
+        return
+    if update_fields is not None and not {
+        "teacher",
+        "start_time",
+        "end_time",
+        "status",
+    } & set(update_fields):
+        # Nothing that affects free slots is written.
+        instance._previous_slot = tuple(getattr(instance, f) for f in SLOT_FIELDS)
+        return
+    instance._previous_slot = (
+        Lesson.objects.filter(pk=instance.pk).values_list(*SLOT_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=Lesson)
+def refresh_free_slots_on_lesson_save(sender, instance, created, **kwargs):
+    current = tuple(getattr(instance, f) for f in SLOT_FIELDS)
+    previous = getattr(instance, "_previous_slot", None)
+    if not created and previous == current:
+        return
+    schedule_lesson_slots_refresh(*current[:3])
+    if previous and previous[:3] != current[:3]:
+        schedule_lesson_slots_refresh(*previous[:3])
+
+
+@receiver(post_delete, sender=Lesson)
+def refresh_free_slots_on_lesson_delete(sender, instance, **kwargs):
+    schedule_lesson_slots_refresh(
+        instance.teacher_id, instance.start_time, instance.end_time
+    )
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def bump_teacher_cache_on_schedule_change(sender, instance, **kwargs):
+    scopes = [teacher_scope(instance.teacher_id)]
+    previous_teacher_id = getattr(instance, "_previous_teacher_id", None)
+    if previous_teacher_id and previous_teacher_id != instance.teacher_id:
+        scopes.append(teacher_scope(previous_teacher_id))
+    bump_versions(*scopes)
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def bump_caches_on_lesson_change(sender, instance, **kwargs):
+    bump_versions(availability_scope(instance.teacher_id), *summary_scopes([instance]))
+
+
+@receiver(post_save, sender=SlotHold)
+@receiver(post_delete, sender=SlotHold)
+def bump_availability_on_hold_change(sender, instance, **kwargs):
+    bump_versions(availability_scope(instance.teacher_id))
+
+
+@receiver(post_delete, sender=Lesson)
+def record_lesson_tombstones(sender, instance, **kwargs):
+    # Profiles outlive their lessons within a cascade, so both users resolve.
+    user_ids = BaseUser.objects.filter(
+        Q(teacher_profile=instance.teacher_id) | Q(student_profile=instance.student_id)
+    ).values_list("pk", flat=True)
+    SyncTombstone.objects.bulk_create(
+        SyncTombstone(
+            kind=SyncTombstone.KIND_LESSON, object_id=instance.pk, user_id=user_id
+        )
+        for user_id in user_ids
+    )
+
+
+@receiver(post_delete, sender=InternalNotification)
+def record_notification_tombstone(sender, instance, **kwargs):
+    SyncTombstone.objects.create(
+        kind=SyncTombstone.KIND_NOTIFICATION,
+        object_id=instance.pk,
+        user_id=instance.user_id,
+    )
+
+
+# Lesson fields that feed the daily rollup.
+ROLLUP_FIELDS = {"teacher", "start_time", "end_time", "status", "is_paid"}
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def refresh_daily_stats_on_lesson_change(
+    sender, instance, update_fields=None, **kwargs
+):
+    if update_fields is not None and not ROLLUP_FIELDS & set(update_fields):
+        return
+    schedule_daily_stats_refresh([(instance.teacher_id, instance.start_time)])
@@ -0,0 +1,77 @@
+"""
+Dashboard summary of one participant's lessons: counts per status, unpaid
+totals and upcoming lessons, from a single query grouped by status with
+conditional aggregates.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Extract
+from django.utils import timezone
+
+from teaching.models import ACTIVE_LESSON_STATUSES, LessonStatus
+from teaching.rollups import EARNING_STATUSES
+
+UPCOMING_DAYS = 7
+MAX_UPCOMING_DAYS = 90
+
+LESSON_HOURS = (
+    Cast(
+        Extract(
+            Coalesce("end_time", F("start_time") + timedelta(hours=1))
+            - F("start_time"),
+            "epoch",
+        ),
+        DecimalField(max_digits=12, decimal_places=4),
+    )
+    / 3600
+)
+
+
+def summarize_lessons(lessons, upcoming_days=UPCOMING_DAYS, now=None):
+    """
+    Summary of the ``lessons`` queryset. Unpaid totals cover lessons that
+    earn (see ``EARNING_STATUSES``) at their teacher's current price;
+    upcoming lessons are pending or approved ones starting within
+    ``upcoming_days`` from ``now``.
+    """
+    now = now or timezone.now()
+    unpaid = Q(is_paid=False, status__in=EARNING_STATUSES)
+    upcoming = Q(
+        status__in=ACTIVE_LESSON_STATUSES,
+        start_time__gte=now,
+        start_time__lt=now + timedelta(days=upcoming_days),
+    )
+    price = Coalesce("teacher__lesson_price", Value(Decimal(0)))
+    groups = (
+        lessons.values("status")
+        .annotate(
+            lessons=Count("id"),
+            unpaid_lessons=Count("id", filter=unpaid),
+            unpaid_hours=Sum(LESSON_HOURS, filter=unpaid),
+            unpaid_amount=Sum(LESSON_HOURS * price, filter=unpaid),
+            upcoming=Count("id", filter=upcoming),
+        )
+        .order_by()
+    )
+
+    summary = {
+        "total": 0,
+        "statuses": dict.fromkeys(LessonStatus.values, 0),
+        "unpaid": {"lessons": 0, "hours": Decimal(0), "amount": Decimal(0)},
+        "upcoming": {"days": upcoming_days, "lessons": 0},
+    }
+    for group in groups:
+        summary["total"] += group["lessons"]
+        summary["statuses"][group["status"]] = group["lessons"]
+        summary["unpaid"]["lessons"] += group["unpaid_lessons"]
+        summary["unpaid"]["hours"] += group["unpaid_hours"] or 0
+        summary["unpaid"]["amount"] += group["unpaid_amount"] or 0
+        summary["upcoming"]["lessons"] += group["upcoming"]
+
+    cent = Decimal("0.01")
+    for key in ("hours", "amount"):
+        summary["unpaid"][key] = summary["unpaid"][key].quantize(cent)
+    return summary
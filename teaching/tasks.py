@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from teaching import expiry
+from teaching.free_slots import roll_free_slots_window
+from teaching.models import SlotHold, SyncTombstone
+
+
+@shared_task
+def roll_teacher_free_slots(days=1):
+    return roll_free_slots_window(days=days)
+
+
+@shared_task
+def purge_expired_slot_holds():
+    # Deleting through the ORM fires post_delete, which bumps the
+    # availability version so released slots show up again.
+    deleted, _per_model = SlotHold.expired().delete()
+    return deleted
+
+
+@shared_task
+def complete_expired_lessons(batch_size=500):
+    return expiry.complete_expired_lessons(batch_size=batch_size)
+
+
+@shared_task
+def purge_sync_tombstones():
+    # Clients with an older token get 410 and resync, so these are unused.
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+    deleted, _per_model = SyncTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
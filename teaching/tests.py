@@ -0,0 +1,1258 @@
+import csv
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from teaching import week_bitmap
+from teaching.availability import compute_free_slots
+from teaching.expiry import complete_expired_lessons
+from teaching.free_slots import refresh_free_slots
+from teaching.tasks import roll_teacher_free_slots
+from teaching.transitions import COMPLETE, transition_lessons
+from teaching.models import (
+    LESSON_OVERLAP_CONSTRAINT,
+    InternalNotification,
+    Lesson,
+    LessonStatus,
+    Rating,
+    Schedule,
+    SlotHold,
+    TeacherDailyStats,
+    TeacherFreeSlot,
+)
+from user.caching import CATALOG_SCOPE, get_versions, teacher_scope
+from user.models import BaseUser, CategoriesOfStudents, Student, Subject, Teacher
+
+KYIV = ZoneInfo("Europe/Kyiv")
+
+
+def legacy_free_slots(schedules, booked, date_from, date_to, now, tz):
+    """Per-day slot walk the availability view used before the engine."""
+    booked_slots = set()
+    for start, end in booked:
+        current = start
+        while current < (end or start + timedelta(hours=1)):
+            booked_slots.add(current)
+            current += timedelta(hours=1)
+
+    availability = {}
+    current_date = date_from
+    while current_date <= date_to:
+        weekday_name = current_date.strftime("%A").lower()
+        daily_slots = []
+        day_schedules = sorted(
+            (start, end) for weekday, start, end in schedules if weekday == weekday_name
+        )
+        for start_time, end_time in day_schedules:
+            slot_end_dt = timezone.make_aware(
+                datetime.combine(current_date, end_time), tz
+            )
+            current_slot_dt = timezone.make_aware(
+                datetime.combine(current_date, start_time), tz
+            )
+            while current_slot_dt < slot_end_dt:
+                if current_slot_dt > now and current_slot_dt not in booked_slots:
+                    next_slot_dt = current_slot_dt + timedelta(hours=1)
+                    daily_slots.append(
+                        {
+                            "start_time": current_slot_dt.isoformat(),
+                            "can_book_2_hours": next_slot_dt < slot_end_dt
+                            and next_slot_dt not in booked_slots,
+                        }
+                    )
+                current_slot_dt += timedelta(hours=1)
+        if daily_slots:
+            availability[current_date.isoformat()] = daily_slots
+        current_date += timedelta(days=1)
+    return availability
+
+
+class ComputeFreeSlotsTests(SimpleTestCase):
+    schedules = [
+        ("monday", time(9), time(12)),
+        ("monday", time(14), time(16)),
+        ("wednesday", time(18), time(23, 59, 59)),
+        ("friday", time(8), time(9)),
+    ]
+
+    def at(self, day, hour):
+        return timezone.make_aware(datetime.combine(day, time(hour)), KYIV)
+
+    def assert_matches_legacy(self, booked, date_from, date_to, now):
+        args = (self.schedules, booked, date_from, date_to, now, KYIV)
+        self.assertEqual(compute_free_slots(*args), legacy_free_slots(*args))
+
+    def test_empty_week_matches_legacy(self):
+        monday = date(2025, 3, 3)
+        self.assert_matches_legacy(
+            [], monday, monday + timedelta(days=13), self.at(monday, 0)
+        )
+
+    def test_bookings_and_past_slots_match_legacy(self):
+        monday = date(2025, 3, 3)
+        wednesday = monday + timedelta(days=2)
+        booked = [
+            (self.at(monday, 10), self.at(monday, 11)),
+            (self.at(monday, 14), self.at(monday, 16)),
+            (self.at(wednesday, 20), self.at(wednesday, 22)),
+            (self.at(wednesday, 19), None),
+            (self.at(monday, 3), self.at(monday, 4)),
+        ]
+        self.assert_matches_legacy(
+            booked, monday, monday + timedelta(days=13), self.at(monday, 9)
+        )
+
+    def test_dst_week_matches_legacy(self):
+        monday = date(2025, 3, 31)
+        self.assert_matches_legacy(
+            [],
+            monday - timedelta(days=7),
+            monday + timedelta(days=7),
+            self.at(monday, 0),
+        )
+
+    def test_two_hour_flag_respects_block_end_and_next_booking(self):
+        monday = date(2025, 3, 3)
+        booked = [(self.at(monday, 11), self.at(monday, 12))]
+        slots = compute_free_slots(
+            self.schedules, booked, monday, monday, self.at(monday, 0), KYIV
+        )
+        self.assertEqual(
+            [
+                (slot["start_time"][11:16], slot["can_book_2_hours"])
+                for slot in slots["2025-03-03"]
+            ],
+            [("09:00", True), ("10:00", False), ("14:00", True), ("15:00", False)],
+        )
+
+    def test_bookings_in_utc_block_the_local_slot(self):
+        monday = date(2025, 3, 3)
+        start = self.at(monday, 9).astimezone(ZoneInfo("UTC"))
+        slots = compute_free_slots(
+            self.schedules,
+            [(start, start + timedelta(hours=1))],
+            monday,
+            monday,
+            self.at(monday, 0),
+            KYIV,
+        )
+        self.assertNotIn(
+            self.at(monday, 9).isoformat(),
+            [slot["start_time"] for slot in slots["2025-03-03"]],
+        )
+
+    def test_window_limits_slots_and_two_hour_flag(self):
+        monday = date(2025, 3, 3)
+        slots = compute_free_slots(
+            self.schedules,
+            [],
+            monday,
+            monday,
+            self.at(monday, 0),
+            KYIV,
+            window=(time(10), time(12)),
+        )
+        self.assertEqual(
+            [
+                (slot["start_time"][11:16], slot["can_book_2_hours"])
+                for slot in slots["2025-03-03"]
+            ],
+            [("10:00", True), ("11:00", False)],
+        )
+
+
+class WeekBitmapTests(SimpleTestCase):
+    def lesson(self, day, hour, hours=1):
+        start = datetime.combine(day, time(hour), tzinfo=KYIV)
+        return week_bitmap.interval_mask(start, start + timedelta(hours=hours))
+
+    def test_lesson_fits_single_block(self):
+        week = week_bitmap.build_week_mask([("monday", time(9), time(12))])
+        monday = date(2025, 3, 3)
+        self.assertTrue(week_bitmap.covers(week, self.lesson(monday, 10, hours=2)))
+        self.assertFalse(week_bitmap.covers(week, self.lesson(monday, 11, hours=2)))
+        self.assertFalse(week_bitmap.covers(week, self.lesson(monday, 8)))
+
+    def test_two_hour_lesson_spans_adjacent_blocks(self):
+        week = week_bitmap.build_week_mask(
+            [("monday", time(9), time(10)), ("monday", time(10), time(11))]
+        )
+        self.assertTrue(
+            week_bitmap.covers(week, self.lesson(date(2025, 3, 3), 9, hours=2))
+        )
+
+    def test_lesson_crossing_midnight_and_week_end(self):
+        week = week_bitmap.build_week_mask(
+            [
+                ("sunday", time(22), time(23, 59, 59)),
+                ("monday", time(0), time(1)),
+            ]
+        )
+        sunday = date(2025, 3, 9)
+        self.assertTrue(week_bitmap.covers(week, self.lesson(sunday, 23, hours=2)))
+        self.assertFalse(
+            week_bitmap.covers(week, self.lesson(sunday - timedelta(days=7), 0))
+        )
+
+    def test_partial_quarters_are_not_covered(self):
+        mask = week_bitmap.block_mask("tuesday", time(9, 10), time(9, 50))
+        self.assertEqual(
+            mask, week_bitmap.block_mask("tuesday", time(9, 15), time(9, 45))
+        )
+        self.assertTrue(week_bitmap.is_on_quarter(time(23, 59, 59)))
+        self.assertFalse(week_bitmap.is_on_quarter(time(9, 10)))
+
+    def test_overlap_and_bytes_round_trip(self):
+        week = week_bitmap.build_week_mask([("friday", time(8), time(12))])
+        self.assertTrue(
+            week_bitmap.overlaps(
+                week, week_bitmap.block_mask("friday", time(11), time(13))
+            )
+        )
+        self.assertFalse(
+            week_bitmap.overlaps(
+                week, week_bitmap.block_mask("friday", time(12), time(13))
+            )
+        )
+        self.assertEqual(week_bitmap.from_bytes(week_bitmap.to_bytes(week)), week)
+
+
+class BookingFixturesMixin:
+    """A teacher working Mondays 9:00–12:00 and ``student_count`` students."""
+
+    student_count = 1
+
+    def create_booking_fixtures(self):
+        teacher_user = BaseUser.objects.create_user(
+            "teacher@example.com", "password", role=BaseUser.ROLE_TEACHER
+        )
+        self.teacher = Teacher.objects.create(
+            user=teacher_user, first_name="Olena", last_name="Koval", age=35
+        )
+        self.subject = Subject.objects.create(name="Mathematics")
+        self.category = CategoriesOfStudents.objects.create(name="Adults")
+        self.teacher.subjects.add(self.subject)
+        self.teacher.categories.add(self.category)
+        Schedule.objects.create(
+            teacher=self.teacher,
+            weekday="monday",
+            start_time=time(9),
+            end_time=time(12),
+        )
+        self.students = []
+        for index in range(self.student_count):
+            user = BaseUser.objects.create_user(
+                f"student{index}@example.com", "password", role=BaseUser.ROLE_STUDENT
+            )
+            student = Student.objects.create(user=user, first_name=f"Student {index}")
+            self.students.append(student)
+
+    def next_monday_at(self, hour, weeks=0):
+        today = timezone.localdate()
+        monday = today + timedelta(days=7 - today.weekday(), weeks=weeks)
+        return timezone.make_aware(datetime.combine(monday, time(hour)))
+
+    def booking_payload(self, student, start, **extra):
+        return {
+            "teacher_id": self.teacher.pk,
+            "student_id": student.pk,
+            "subject_id": self.subject.pk,
+            "category_id": self.category.pk,
+            "start_time": start.isoformat(),
+            **extra,
+        }
+
+
+class RatingAggregateTests(BookingFixturesMixin, TestCase):
+    student_count = 3
+
+    def setUp(self):
+        self.create_booking_fixtures()
+        user = BaseUser.objects.create_user(
+            "other@example.com", "password", role=BaseUser.ROLE_TEACHER
+        )
+        self.other = Teacher.objects.create(
+            user=user, first_name="Iryna", last_name="Bondar", age=40
+        )
+
+    def aggregates(self, teacher):
+        teacher.refresh_from_db()
+        return teacher.rating_count, teacher.rating_sum, teacher.rating_average
+
+    def test_signals_keep_aggregates_and_rebuild_agrees(self):
+        ratings = [
+            Rating.objects.create(student=student, teacher=self.teacher, rating=value)
+            for student, value in zip(self.students, (5, 4, 2))
+        ]
+        self.assertEqual(self.aggregates(self.teacher), (3, 11, Decimal("3.67")))
+
+        ratings[2].rating = 5
+        ratings[2].save()
+        self.assertEqual(self.aggregates(self.teacher), (3, 14, Decimal("4.67")))
+
+        ratings[0].teacher = self.other
+        ratings[0].save()
+        self.assertEqual(self.aggregates(self.teacher), (2, 9, Decimal("4.50")))
+        self.assertEqual(self.aggregates(self.other), (1, 5, Decimal("5.00")))
+
+        ratings[1].delete()
+        self.assertEqual(self.aggregates(self.teacher), (1, 5, Decimal("5.00")))
+        ratings[0].delete()
+        self.assertEqual(self.aggregates(self.other), (0, 0, Decimal("0.00")))
+
+        Rating.objects.create(student=self.students[0], teacher=self.other, rating=3)
+        maintained = {
+            teacher.pk: self.aggregates(teacher)
+            for teacher in (self.teacher, self.other)
+        }
+        Teacher.objects.update(rating_count=0, rating_sum=0, rating_average=0)
+        scopes = [CATALOG_SCOPE, teacher_scope(self.other.pk)]
+        versions = get_versions(scopes)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("rebuild_rating_aggregates", stdout=StringIO())
+        self.assertTrue(
+            all(new > old for new, old in zip(get_versions(scopes), versions))
+        )
+        self.assertEqual(
+            {
+                teacher.pk: self.aggregates(teacher)
+                for teacher in (self.teacher, self.other)
+            },
+            maintained,
+        )
+
+
+class ConcurrentBookingTests(BookingFixturesMixin, TransactionTestCase):
+    student_count = 6
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Lesson._meta.db_table
+            )
+        if LESSON_OVERLAP_CONSTRAINT not in constraints:
+            self.skipTest("The lesson exclusion constraint needs btree_gist.")
+        self.create_booking_fixtures()
+
+    def test_parallel_bookings_of_one_slot_admit_exactly_one(self):
+        start = self.next_monday_at(10)
+        barrier = threading.Barrier(self.student_count)
+        responses = []
+
+        def book(student):
+            try:
+                client = APIClient()
+                client.force_authenticate(student.user)
+                payload = self.booking_payload(student, start, duration_hours=1)
+                barrier.wait()
+                responses.append(
+                    client.post("/api/teaching/lessons/", payload, format="json")
+                )
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=book, args=(student,)) for student in self.students
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        statuses = sorted(response.status_code for response in responses)
+        self.assertEqual(statuses, [201] + [400] * (self.student_count - 1), statuses)
+        self.assertEqual(Lesson.objects.filter(teacher=self.teacher).count(), 1)
+
+
+class LessonSeriesTests(BookingFixturesMixin, TestCase):
+    def setUp(self):
+        self.create_booking_fixtures()
+        self.student = self.students[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+        Lesson.objects.create(
+            teacher=self.teacher,
+            student=self.student,
+            subject=self.subject,
+            category=self.category,
+            start_time=self.next_monday_at(10, weeks=2),
+            end_time=self.next_monday_at(11, weeks=2),
+        )
+
+    def book_series(self, **extra):
+        payload = self.booking_payload(
+            self.student, self.next_monday_at(10), **{"count": 4, **extra}
+        )
+        return self.client.post("/api/teaching/lessons/series/", payload, format="json")
+
+    def test_conflicting_occurrence_rejects_whole_series(self):
+        response = self.book_series()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [conflict["start_time"] for conflict in response.data["conflicts"]],
+            [self.next_monday_at(10, weeks=2).isoformat()],
+        )
+        self.assertEqual(Lesson.objects.count(), 1)
+
+    def test_skip_conflicts_books_the_rest(self):
+        response = self.book_series(skip_conflicts=True)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["created"]), 3)
+        self.assertEqual(len(response.data["conflicts"]), 1)
+        self.assertEqual(Lesson.objects.count(), 4)
+
+    def test_student_cannot_book_paid_lessons(self):
+        response = self.book_series(skip_conflicts=True, is_paid=True)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [lesson["is_paid"] for lesson in response.data["created"]],
+            [False, False, False],
+        )
+        self.assertFalse(Lesson.objects.filter(is_paid=True).exists())
+
+    def test_query_count_does_not_grow_with_series_length(self):
+        self.book_series()  # Warm the per-user caches on the shared user object.
+        with CaptureQueriesContext(connection) as short:
+            self.book_series(skip_conflicts=True)
+        Lesson.objects.exclude(start_time=self.next_monday_at(10, weeks=2)).delete()
+        with CaptureQueriesContext(connection) as long:
+            self.book_series(skip_conflicts=True, count=12)
+        self.assertEqual(len(short), len(long))
+
+
+class LessonBookingTests(BookingFixturesMixin, TestCase):
+    def setUp(self):
+        self.create_booking_fixtures()
+        self.student = self.students[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+
+    def book(self, **extra):
+        payload = self.booking_payload(
+            self.student, self.next_monday_at(10), **{"duration_hours": 1, **extra}
+        )
+        return self.client.post("/api/teaching/lessons/", payload, format="json")
+
+    def test_each_failed_rule_is_reported(self):
+        other_subject = Subject.objects.create(name="Physics")
+        cases = [
+            ({"subject_id": other_subject.pk}, "does not teach the selected subject"),
+            ({"teacher_id": self.teacher.pk + 1000}, "Invalid teacher selected"),
+            (
+                {"start_time": self.next_monday_at(8).isoformat()},
+                "does not fit within the teacher's available schedule",
+            ),
+        ]
+        for extra, message in cases:
+            with self.subTest(extra=extra):
+                response = self.book(**extra)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(message, str(response.data))
+
+    def test_overlap_is_rejected_after_first_booking(self):
+        self.assertEqual(self.book().status_code, 201)
+        response = self.book()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("overlaps with another lesson", str(response.data))
+
+
+class TeacherFreeSlotTests(BookingFixturesMixin, TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_booking_fixtures()
+        self.client = APIClient()
+
+    def slot_hours(self, weeks=0):
+        day = self.next_monday_at(0, weeks=weeks).date()
+        return [
+            timezone.localtime(start).hour
+            for start in TeacherFreeSlot.objects.filter(
+                teacher=self.teacher, start_time__date=day
+            )
+            .order_by("start_time")
+            .values_list("start_time", flat=True)
+        ]
+
+    def book(self, hour):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Lesson.objects.create(
+                teacher=self.teacher,
+                student=self.students[0],
+                subject=self.subject,
+                category=self.category,
+                start_time=self.next_monday_at(hour),
+                end_time=self.next_monday_at(hour + 1),
+            )
+
+    def test_slots_follow_lesson_and_schedule_writes(self):
+        self.assertEqual(self.slot_hours(), [9, 10, 11])
+        lesson = self.book(10)
+        self.assertEqual(self.slot_hours(), [9, 11])
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.delete()
+        self.assertEqual(self.slot_hours(), [9, 10, 11])
+
+        schedule = Schedule.objects.get(teacher=self.teacher)
+        schedule.end_time = time(11)
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.save()
+        self.assertEqual(self.slot_hours(), [9, 10])
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.delete()
+        self.assertEqual(self.slot_hours(), [])
+
+    def test_lesson_save_refreshes_slots_only_when_its_slot_changes(self):
+        lesson = self.book(10)
+        with mock.patch("teaching.signals.schedule_free_slots_refresh") as refresh:
+            lesson.add_homework("Exercises 1-5")
+            lesson.is_paid = True
+            lesson.save()
+            refresh.assert_not_called()
+
+            lesson.status = LessonStatus.CANCELLED_BY_STUDENT
+            lesson.save()
+            refresh.assert_called_once()
+
+    def test_lesson_moved_frees_its_old_slot(self):
+        lesson = self.book(10)
+        lesson.start_time = self.next_monday_at(11)
+        lesson.end_time = self.next_monday_at(12)
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.save()
+        self.assertEqual(self.slot_hours(), [9, 10])
+
+    @override_settings(TEACHER_FREE_SLOT_DAYS=28)
+    def test_roll_fills_every_day_missed_since_the_last_run(self):
+        refresh_free_slots([self.teacher.pk])
+        # The last runs were missed: nothing is stored after next Monday.
+        TeacherFreeSlot.objects.filter(
+            start_time__gte=self.next_monday_at(0, weeks=1)
+        ).delete()
+        TeacherFreeSlot.objects.create(
+            teacher=self.teacher,
+            start_time=timezone.now() - timedelta(hours=2),
+            end_time=timezone.now() - timedelta(hours=1),
+        )
+
+        result = roll_teacher_free_slots()
+        self.assertEqual(result["expired"], 1)
+        for weeks in range(3):
+            self.assertEqual(self.slot_hours(weeks=weeks), [9, 10, 11])
+
+    def test_catalog_filters_by_available_from(self):
+        params = {
+            "available_from": self.next_monday_at(10).isoformat(),
+            "available_to": self.next_monday_at(12).isoformat(),
+        }
+
+        def catalog_ids():
+            response = self.client.get("/api/user/teachers/", params)
+            self.assertEqual(response.status_code, 200)
+            return [teacher["id"] for teacher in response.data]
+
+        self.assertEqual(catalog_ids(), [self.teacher.pk])
+        self.book(10)
+        self.assertEqual(catalog_ids(), [self.teacher.pk])
+        # The 9:00 slot is still free, but it starts before available_from.
+        self.book(11)
+        self.assertEqual(catalog_ids(), [])
+        self.assertEqual(self.slot_hours(), [9])
+
+    def test_cached_catalog_drops_slots_that_have_started(self):
+        cache.clear()
+        params = {
+            "available_from": self.next_monday_at(9).isoformat(),
+            "available_to": self.next_monday_at(12).isoformat(),
+        }
+        response = self.client.get("/api/user/teachers/", params)
+        self.assertEqual(len(response.data), 1)
+
+        later = self.next_monday_at(11) + timedelta(minutes=1)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            response = self.client.get("/api/user/teachers/", params)
+        self.assertEqual(response.data, [])
+
+
+class BatchAvailabilityTests(BookingFixturesMixin, TestCase):
+    def setUp(self):
+        self.create_booking_fixtures()
+        self.teacher_ids = [self.teacher.pk]
+        for index in range(4):
+            user = BaseUser.objects.create_user(
+                f"teacher{index}@example.com", "password", role=BaseUser.ROLE_TEACHER
+            )
+            teacher = Teacher.objects.create(
+                user=user, first_name=f"Teacher {index}", last_name="Koval", age=30
+            )
+            Schedule.objects.create(
+                teacher=teacher, weekday="monday", start_time=time(9), end_time=time(12)
+            )
+            Lesson.objects.create(
+                teacher=teacher,
+                student=self.students[0],
+                subject=self.subject,
+                category=self.category,
+                start_time=self.next_monday_at(10),
+                end_time=self.next_monday_at(11),
+            )
+            self.teacher_ids.append(teacher.pk)
+        self.client = APIClient()
+
+    def availability(self, teacher_ids, **params):
+        return self.client.get(
+            "/api/teaching/teachers/availability/",
+            {"teacher_ids": ",".join(map(str, teacher_ids)), **params},
+        )
+
+    def test_query_count_does_not_grow_with_teacher_ids(self):
+        counts = []
+        for teacher_ids in (self.teacher_ids[:1], self.teacher_ids):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.availability(teacher_ids)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), len(teacher_ids))
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        day = self.next_monday_at(9).date().isoformat()
+        self.assertEqual(len(response.data[str(self.teacher_ids[-1])][day]), 2)
+
+    def test_date_range_is_bounded(self):
+        today = timezone.localdate()
+        for date_from, date_to in (
+            (today, today - timedelta(days=1)),
+            (today, today + timedelta(days=62)),
+        ):
+            response = self.availability(
+                self.teacher_ids,
+                date_from=date_from.isoformat(),
+                date_to=date_to.isoformat(),
+            )
+            self.assertEqual(response.status_code, 400, response.data)
+        # One teacher's calendar may still span long ranges.
+        response = self.client.get(
+            f"/api/teaching/teachers/{self.teacher.pk}/availability/",
+            {"date_to": (today + timedelta(days=365)).isoformat()},
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.availability(
+            self.teacher_ids, date_to=(today + timedelta(days=61)).isoformat()
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class AvailabilityConditionalGetTests(BookingFixturesMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_booking_fixtures()
+        self.client = APIClient()
+        self.url = f"/api/teaching/teachers/{self.teacher.pk}/availability/"
+
+    def test_etag_rolls_over_on_the_hour(self):
+        now = timezone.now().replace(minute=59, second=0)
+        with mock.patch("django.utils.timezone.now", return_value=now):
+            etag = self.client.get(self.url)["ETag"]
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Slots starting this hour have passed, so the cached copy is stale.
+        later = now + timedelta(minutes=2)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class SlotHoldTests(BookingFixturesMixin, TestCase):
+    student_count = 2
+
+    def setUp(self):
+        self.create_booking_fixtures()
+        self.holder, self.other = self.students
+        self.start = self.next_monday_at(10)
+
+    def client_for(self, student):
+        client = APIClient()
+        client.force_authenticate(student.user)
+        return client
+
+    def hold(self, student):
+        return self.client_for(student).post(
+            "/api/teaching/holds/",
+            {"teacher_id": self.teacher.pk, "start_time": self.start},
+            format="json",
+        )
+
+    def book(self, student, **extra):
+        return self.client_for(student).post(
+            "/api/teaching/lessons/",
+            self.booking_payload(student, self.start, duration_hours=1, **extra),
+            format="json",
+        )
+
+    def available_starts(self):
+        day = self.start.date().isoformat()
+        response = self.client_for(self.other).get(
+            f"/api/teaching/teachers/{self.teacher.pk}/availability/",
+            {"date_from": day, "date_to": day},
+        )
+        return [slot["start_time"] for slot in response.data.get(day, [])]
+
+    def test_held_slot_is_hidden_and_only_bookable_with_token(self):
+        self.assertIn(self.start.isoformat(), self.available_starts())
+        response = self.hold(self.holder)
+        self.assertEqual(response.status_code, 201)
+        token = response.data["token"]
+        self.assertNotIn(self.start.isoformat(), self.available_starts())
+
+        self.assertEqual(self.hold(self.other).status_code, 400)
+        response = self.book(self.other)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("temporarily held", str(response.data))
+
+        self.assertEqual(self.book(self.holder, hold_token=token).status_code, 201)
+        self.assertFalse(SlotHold.objects.exists())
+
+    def test_expired_or_released_hold_frees_the_slot(self):
+        token = self.hold(self.holder).data["token"]
+        SlotHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertIn(self.start.isoformat(), self.available_starts())
+        other_token = self.hold(self.other).data["token"]
+
+        response = self.client_for(self.holder).delete(
+            f"/api/teaching/holds/{other_token}/"
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client_for(self.other).delete(
+            f"/api/teaching/holds/{other_token}/"
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(SlotHold.objects.filter(token=token).exists())
+        self.assertEqual(self.book(self.holder).status_code, 201)
+
+
+class IdempotentLessonTests(BookingFixturesMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_booking_fixtures()
+        self.student = self.students[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+
+    def book(self, key, hour=10):
+        payload = self.booking_payload(
+            self.student, self.next_monday_at(hour), duration_hours=1
+        )
+        return self.client.post(
+            "/api/teaching/lessons/",
+            payload,
+            format="json",
+            headers={"Idempotency-Key": key},
+        )
+
+    def test_retried_booking_replays_the_first_response(self):
+        first = self.book("booking-1")
+        self.assertEqual(first.status_code, 201)
+
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.book("booking-1")
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertFalse(
+            any(Lesson._meta.db_table in query["sql"] for query in queries)
+        )
+        self.assertEqual(Lesson.objects.count(), 1)
+
+    def test_key_reused_with_another_payload_is_rejected(self):
+        self.assertEqual(self.book("booking-1").status_code, 201)
+        self.assertEqual(self.book("booking-1", hour=11).status_code, 422)
+        self.assertEqual(self.book("booking-2", hour=11).status_code, 201)
+
+
+class ExpiredLessonSweepTests(BookingFixturesMixin, TestCase):
+    def setUp(self):
+        self.create_booking_fixtures()
+        self.student = self.students[0]
+
+    def make_lesson(self, start, status=LessonStatus.VOID):
+        return Lesson.objects.create(
+            teacher=self.teacher,
+            student=self.student,
+            subject=self.subject,
+            category=self.category,
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            status=status,
+        )
+
+    def test_expired_active_lessons_are_completed_in_batches(self):
+        now = timezone.now()
+        expired = [self.make_lesson(now - timedelta(days=days)) for days in (1, 2, 3)]
+        cancelled = self.make_lesson(
+            now - timedelta(days=4), LessonStatus.CANCELLED_BY_STUDENT
+        )
+        upcoming = self.make_lesson(now + timedelta(days=1), LessonStatus.APPROVED)
+
+        self.assertEqual(complete_expired_lessons(batch_size=2), 3)
+
+        statuses = dict(Lesson.objects.values_list("pk", "status"))
+        for lesson in expired:
+            self.assertEqual(statuses[lesson.pk], LessonStatus.DONE)
+        self.assertEqual(statuses[cancelled.pk], LessonStatus.CANCELLED_BY_STUDENT)
+        self.assertEqual(statuses[upcoming.pk], LessonStatus.APPROVED)
+        self.assertEqual(
+            set(
+                InternalNotification.objects.filter(user=self.student.user).values_list(
+                    "lesson_id", flat=True
+                )
+            ),
+            {lesson.pk for lesson in expired},
+        )
+        self.assertEqual(complete_expired_lessons(), 0)
+
+    def test_lesson_without_end_time_lasts_an_hour(self):
+        start = timezone.now() - timedelta(minutes=90)
+        lesson = Lesson.objects.create(
+            teacher=self.teacher,
+            student=self.student,
+            subject=self.subject,
+            category=self.category,
+            start_time=start,
+        )
+        self.assertEqual(lesson.end_time, start + timedelta(hours=1))
+        self.assertEqual(complete_expired_lessons(), 1)
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.status, LessonStatus.DONE)
+
+
+class LessonFeedPaginationTests(BookingFixturesMixin, TestCase):
+    def setUp(self):
+        self.create_booking_fixtures()
+        self.student = self.students[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+        self.lessons = [
+            Lesson.objects.create(
+                teacher=self.teacher,
+                student=self.student,
+                subject=self.subject,
+                category=self.category,
+                start_time=self.next_monday_at(9, weeks=week),
+                end_time=self.next_monday_at(10, weeks=week),
+            )
+            for week in (2, 0, 1, 4, 3)
+        ]
+
+    def test_cursor_pages_follow_start_time_without_count(self):
+        url = "/api/teaching/lessons/?cursor=&page_size=2"
+        seen = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            self.assertFalse(any("COUNT(" in q["sql"] for q in queries))
+            seen.extend(lesson["id"] for lesson in response.data["results"])
+            url = response.data["next"]
+
+        expected = sorted(self.lessons, key=lambda lesson: lesson.start_time)
+        self.assertEqual(seen, [lesson.pk for lesson in expected])
+
+    def test_page_numbers_remain_the_default(self):
+        response = self.client.get("/api/teaching/lessons/", {"page_size": 2})
+        self.assertEqual(response.data["count"], 5)
+        self.assertEqual(len(response.data["results"]), 2)
+
+
+@mock.patch("teaching.sync.SYNC_LAG", timedelta(0))
+class IncrementalSyncTests(BookingFixturesMixin, TestCase):
+    def setUp(self):
+        self.create_booking_fixtures()
+        self.student = self.students[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+        self.lessons = [
+            Lesson.objects.create(
+                teacher=self.teacher,
+                student=self.student,
+                subject=self.subject,
+                category=self.category,
+                start_time=self.next_monday_at(9, weeks=week),
+                end_time=self.next_monday_at(10, weeks=week),
+            )
+            for week in range(3)
+        ]
+        self.notifications = [
+            InternalNotification.objects.create(
+                user=self.student.user, lesson=lesson, message="Booked"
+            )
+            for lesson in self.lessons
+        ]
+
+    def sync(self, url, token=""):
+        response = self.client.get(url, {"changed_since": token})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_lessons_sync_returns_only_changes_and_deletions(self):
+        url = "/api/teaching/lessons/"
+        first = self.sync(url)
+        self.assertEqual(len(first["changed"]), 3)
+        self.assertEqual(self.sync(url, first["token"])["changed"], [])
+
+        cancelled, deleted = self.lessons[0], self.lessons[1]
+        cancelled.status = LessonStatus.CANCELLED_BY_STUDENT
+        cancelled.save(update_fields=["status"])
+        deleted_pk = deleted.pk
+        deleted.delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            changes = self.sync(url, first["token"])
+        self.assertEqual([row["id"] for row in changes["changed"]], [cancelled.pk])
+        self.assertEqual(changes["deleted"], [deleted_pk])
+        self.assertLessEqual(len(queries), 2)
+
+    def test_notifications_sync_and_invalid_token(self):
+        url = "/api/teaching/notifications/"
+        token = self.sync(url)["token"]
+        for notification in self.notifications[:2]:
+            self.client.patch(
+                f"{url}{notification.pk}/", {"is_read": True}, format="json"
+            )
+        removed_pk = self.notifications[2].pk
+        self.notifications[2].delete()
+
+        changes = self.sync(url, token)
+        self.assertEqual(
+            sorted(row["id"] for row in changes["changed"]),
+            [notification.pk for notification in self.notifications[:2]],
+        )
+        self.assertEqual(changes["deleted"], [removed_pk])
+
+        response = self.client.get(url, {"changed_since": "not-a-token"})
+        self.assertEqual(response.status_code, 400)
+
+
+class LessonExportTests(BookingFixturesMixin, TestCase):
+    def setUp(self):
+        self.create_booking_fixtures()
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher.user)
+        student = self.students[0]
+        self.lessons = [
+            Lesson.objects.create(
+                teacher=self.teacher,
+                student=student,
+                subject=self.subject,
+                category=self.category,
+                start_time=self.next_monday_at(9, weeks=week),
+                end_time=self.next_monday_at(10, weeks=week),
+                status=LessonStatus.APPROVED,
+            )
+            for week in range(3)
+        ]
+
+    def export(self, file_format):
+        response = self.client.get(f"/api/teaching/lessons/export/{file_format}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_csv_has_one_row_per_lesson(self):
+        lines = self.export("csv").splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "start_time", "end_time"])
+        self.assertEqual(
+            [int(line.split(",")[0]) for line in lines[1:]],
+            [lesson.pk for lesson in self.lessons],
+        )
+        self.assertIn("Mathematics", lines[1])
+
+    def test_csv_escapes_formulas(self):
+        self.teacher.first_name = "=1+1"
+        self.teacher.save(update_fields=["first_name"])
+        self.students[0].first_name = "@SUM(A1:A2)"
+        self.students[0].save(update_fields=["first_name"])
+        row = next(csv.reader(self.export("csv").splitlines()[1:]))
+        self.assertEqual(row[7], "'=1+1 Koval")
+        self.assertEqual(row[9], "'@SUM(A1:A2)")
+        self.assertEqual(row[5], "Mathematics")
+
+    def test_ics_has_one_event_per_lesson(self):
+        calendar = self.export("ics")
+        self.assertTrue(calendar.startswith("BEGIN:VCALENDAR\r\n"))
+        self.assertEqual(calendar.count("BEGIN:VEVENT"), 3)
+        self.assertIn("STATUS:CONFIRMED", calendar)
+        start = self.lessons[0].start_time.astimezone(ZoneInfo("UTC"))
+        self.assertIn(f"DTSTART:{start:%Y%m%dT%H%M%SZ}", calendar)
+
+
+class TeacherStatsTests(BookingFixturesMixin, TestCase):
+    def setUp(self):
+        self.create_booking_fixtures()
+        self.teacher.lesson_price = Decimal("400.00")
+        self.teacher.save(update_fields=["lesson_price"])
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher.user)
+
+    def make_lesson(self, hour, hours=1, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Lesson.objects.create(
+                teacher=self.teacher,
+                student=self.students[0],
+                subject=self.subject,
+                category=self.category,
+                start_time=self.next_monday_at(hour),
+                end_time=self.next_monday_at(hour + hours),
+                **fields,
+            )
+
+    def stats(self, **params):
+        day = self.next_monday_at(9).date().isoformat()
+        response = self.client.get(
+            "/api/teaching/stats/", {"date_from": day, "date_to": day, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_rollup_follows_lesson_changes(self):
+        self.make_lesson(9, hours=2, status=LessonStatus.APPROVED)
+        unpaid = self.make_lesson(11, status=LessonStatus.VOID)
+        self.make_lesson(12, status=LessonStatus.CANCELLED_BY_STUDENT)
+
+        totals = self.stats()["totals"]
+        self.assertEqual(totals["lessons"], 3)
+        self.assertEqual(totals["hours"], Decimal("4.00"))
+        self.assertEqual(totals["earnings"], Decimal("1200.00"))
+        self.assertEqual(totals["paid_earnings"], Decimal("0.00"))
+
+        unpaid.is_paid = True
+        with self.captureOnCommitCallbacks(execute=True):
+            unpaid.save(update_fields=["is_paid"])
+        totals = self.stats(period="month")["totals"]
+        self.assertEqual(totals["paid_earnings"], Decimal("400.00"))
+        self.assertEqual(totals["statuses"][LessonStatus.CANCELLED_BY_STUDENT], 1)
+
+        TeacherDailyStats.objects.all().delete()
+        call_command("rebuild_teacher_stats", stdout=StringIO())
+        self.assertEqual(self.stats()["totals"], totals)
+
+    def test_inverted_range_and_missing_profile_are_rejected(self):
+        day = self.next_monday_at(9).date()
+        response = self.client.get(
+            "/api/teaching/stats/",
+            {"date_from": day.isoformat(), "date_to": str(day - timedelta(days=1))},
+        )
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_authenticate(
+            BaseUser.objects.create_user(
+                "new@example.com", "password", role=BaseUser.ROLE_TEACHER
+            )
+        )
+        self.assertEqual(self.client.get("/api/teaching/stats/").status_code, 403)
+
+
+class LessonTransitionTests(BookingFixturesMixin, TestCase):
+    def setUp(self):
+        self.create_booking_fixtures()
+        self.client = APIClient()
+
+    def make_lesson(self, start_time, status=LessonStatus.VOID):
+        return Lesson.objects.create(
+            teacher=self.teacher,
+            student=self.students[0],
+            subject=self.subject,
+            category=self.category,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            status=status,
+        )
+
+    def test_approve_is_single_statement_compare_and_set(self):
+        lesson = self.make_lesson(self.next_monday_at(9))
+        self.client.force_authenticate(self.teacher.user)
+        url = f"/api/teaching/lessons/{lesson.pk}/approve/"
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], LessonStatus.APPROVED)
+        notification = InternalNotification.objects.get()
+        self.assertEqual(notification.user, self.students[0].user)
+
+        self.assertEqual(self.client.post(url).status_code, 400)
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.status, LessonStatus.APPROVED)
+
+        with self.assertNumQueries(1):
+            results = transition_lessons(
+                COMPLETE, Lesson.objects.filter(teacher=self.teacher)
+            )
+        self.assertEqual(list(results), [lesson.pk])
+        self.assertTrue(results[lesson.pk].applied)
+
+    def test_teacher_without_profile_cannot_approve(self):
+        lesson = self.make_lesson(self.next_monday_at(9))
+        self.client.force_authenticate(
+            BaseUser.objects.create_user(
+                "new@example.com", "password", role=BaseUser.ROLE_TEACHER
+            )
+        )
+        response = self.client.post(f"/api/teaching/lessons/{lesson.pk}/approve/")
+        self.assertEqual(response.status_code, 403)
+
+    def test_cancel_reports_each_refusal(self):
+        self.client.force_authenticate(self.students[0].user)
+        soon = self.make_lesson(timezone.now() + timedelta(hours=1))
+        done = self.make_lesson(self.next_monday_at(9), status=LessonStatus.DONE)
+        lesson = self.make_lesson(self.next_monday_at(10))
+
+        def cancel(target):
+            return self.client.post(f"/api/teaching/lessons/{target.pk}/cancel/")
+
+        self.assertEqual(cancel(soon).status_code, 400)
+        self.assertEqual(cancel(done).status_code, 400)
+        response = cancel(lesson)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], LessonStatus.CANCELLED_BY_STUDENT)
+        self.assertEqual(InternalNotification.objects.get().user, self.teacher.user)
+        self.assertEqual(cancel(lesson).status_code, 400)
+
+        other = BaseUser.objects.create_user(
+            "other@example.com", "password", role=BaseUser.ROLE_STUDENT
+        )
+        self.client.force_authenticate(other)
+        Student.objects.create(user=other, first_name="Other")
+        self.assertEqual(cancel(soon).status_code, 404)
+
+    def test_bulk_actions_report_per_id_outcomes(self):
+        lessons = [self.make_lesson(self.next_monday_at(hour)) for hour in (9, 10)]
+        cancelled = self.make_lesson(
+            self.next_monday_at(11), status=LessonStatus.CANCELLED_BY_STUDENT
+        )
+        missing = cancelled.pk + 100
+        ids = [lessons[0].pk, cancelled.pk, missing, lessons[1].pk, lessons[0].pk]
+        self.client.force_authenticate(self.teacher.user)
+
+        response = self.client.post(
+            "/api/teaching/lessons/bulk/approve/", {"ids": ids}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row["id"], row["outcome"]) for row in response.data["results"]],
+            [
+                (lessons[0].pk, "applied"),
+                (cancelled.pk, "not_allowed"),
+                (missing, "not_found"),
+                (lessons[1].pk, "applied"),
+            ],
+        )
+        self.assertEqual(InternalNotification.objects.count(), 2)
+
+        response = self.client.post(
+            "/api/teaching/lessons/bulk/mark-paid/",
+            {"ids": [lesson.pk for lesson in lessons]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            "/api/teaching/lessons/bulk/mark-paid/",
+            {"ids": [lesson.pk for lesson in lessons], "is_paid": True},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Lesson.objects.filter(is_paid=True).count(), 2)
+
+        self.client.force_authenticate(self.students[0].user)
+        response = self.client.post(
+            "/api/teaching/lessons/bulk/approve/", {"ids": ids}, format="json"
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(
+            "/api/teaching/lessons/bulk/cancel/",
+            {"ids": [lessons[0].pk]},
+            format="json",
+        )
+        self.assertEqual(response.data["results"][0]["outcome"], "applied")
+        self.assertEqual(
+            response.data["results"][0]["status"], LessonStatus.CANCELLED_BY_STUDENT
+        )
+
+
+class LessonSummaryTests(BookingFixturesMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_booking_fixtures()
+        self.teacher.lesson_price = Decimal("400.00")
+        self.teacher.save(update_fields=["lesson_price"])
+        self.client = APIClient()
+
+    def make_lesson(self, start_time, hours=1, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Lesson.objects.create(
+                teacher=self.teacher,
+                student=self.students[0],
+                subject=self.subject,
+                category=self.category,
+                start_time=start_time,
+                end_time=start_time + timedelta(hours=hours),
+                **fields,
+            )
+
+    def summary(self, user, **params):
+        self.client.force_authenticate(user)
+        response = self.client.get("/api/teaching/lessons/summary/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_summary_counts_and_invalidation(self):
+        soon = self.make_lesson(timezone.now() + timedelta(days=1), hours=2)
+        self.make_lesson(self.next_monday_at(9, weeks=3), status=LessonStatus.APPROVED)
+        self.make_lesson(
+            timezone.now() - timedelta(days=3), status=LessonStatus.DONE, is_paid=True
+        )
+        self.make_lesson(
+            timezone.now() - timedelta(days=2), status=LessonStatus.CANCELLED_BY_STUDENT
+        )
+
+        summary = self.summary(self.teacher.user)
+        self.assertEqual(summary["total"], 4)
+        self.assertEqual(summary["statuses"][LessonStatus.VOID], 1)
+        self.assertEqual(summary["statuses"][LessonStatus.DONE], 1)
+        self.assertEqual(summary["unpaid"]["lessons"], 2)
+        self.assertEqual(summary["unpaid"]["hours"], Decimal("3.00"))
+        self.assertEqual(summary["unpaid"]["amount"], Decimal("1200.00"))
+        self.assertEqual(summary["upcoming"]["lessons"], 1)
+        self.assertEqual(
+            self.summary(self.teacher.user, days=30)["upcoming"]["lessons"], 2
+        )
+        self.assertEqual(self.summary(self.students[0].user), summary)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.summary(self.teacher.user), summary)
+
+        soon.is_paid = True
+        with self.captureOnCommitCallbacks(execute=True):
+            soon.save(update_fields=["is_paid"])
+        summary = self.summary(self.students[0].user)
+        self.assertEqual(summary["unpaid"]["amount"], Decimal("400.00"))
+
+        self.client.force_authenticate(self.teacher.user)
+        response = self.client.get("/api/teaching/lessons/summary/", {"days": 0})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,209 @@
+"""
+Lesson status transitions as single compare-and-set statements. Each call
+is one ``UPDATE ... WHERE status IN (...) RETURNING`` (joined with the
+pre-update row for reporting), so there is no SELECT before the write and
+no lost update when two requests race on the same lesson.
+"""
+
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from django.db import connection
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from teaching.models import ACTIVE_LESSON_STATUSES, Lesson, LessonStatus
+from teaching.signals import lessons_updated
+from user.models import Student, Teacher
+
+APPLIED = "applied"
+NOT_FOUND = "not_found"
+NOT_ALLOWED = "not_allowed"
+ALREADY_TRANSITIONED = "already_transitioned"
+TOO_LATE = "too_late"
+
+
+class Transition(NamedTuple):
+    name: str
+    sources: tuple
+    target: str
+
+
+APPROVE = Transition("approve", (LessonStatus.VOID,), LessonStatus.APPROVED)
+CANCEL_BY_TEACHER = Transition(
+    "cancel", tuple(ACTIVE_LESSON_STATUSES), LessonStatus.CANCELLED_BY_TEACHER
+)
+CANCEL_BY_STUDENT = Transition(
+    "cancel", tuple(ACTIVE_LESSON_STATUSES), LessonStatus.CANCELLED_BY_STUDENT
+)
+COMPLETE = Transition("complete", tuple(ACTIVE_LESSON_STATUSES), LessonStatus.DONE)
+
+
+class TransitionResult(NamedTuple):
+    lesson_id: int
+    outcome: str
+    # Status after the statement: the new one when applied.
+    status: Optional[str] = None
+    teacher_id: Optional[int] = None
+    student_id: Optional[int] = None
+    teacher_user_id: Optional[int] = None
+    student_user_id: Optional[int] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+
+    @property
+    def applied(self):
+        return self.outcome == APPLIED
+
+
+TRANSITION_SQL = """
+WITH target AS (
+    SELECT lesson.id, lesson.status, lesson.teacher_id, lesson.student_id,
+           teacher.user_id AS teacher_user_id,
+           student.user_id AS student_user_id, lesson.start_time, lesson.end_time
+    FROM {lesson} lesson
+    JOIN {teacher} teacher ON teacher.id = lesson.teacher_id
+    JOIN {student} student ON student.id = lesson.student_id
+    WHERE lesson.id {lessons}{scope}
+), changed AS (
+    UPDATE {lesson} lesson SET status = %s, updated_at = %s
+    FROM target
+    WHERE lesson.id = target.id AND lesson.status = ANY(%s){deadline}
+    RETURNING lesson.id
+)
+SELECT target.*, changed.id IS NOT NULL
+FROM target LEFT JOIN changed ON changed.id = target.id
+ORDER BY target.id
+"""
+
+UPDATE_SQL = """
+UPDATE {lesson} lesson SET {assignments}, updated_at = %s
+WHERE lesson.id {lessons}{scope}
+RETURNING lesson.id, lesson.status, lesson.teacher_id, lesson.student_id,
+          lesson.start_time, lesson.end_time
+"""
+
+
+def lesson_filter(lessons):
+    if isinstance(lessons, QuerySet):
+        sql, params = lessons.order_by().values("pk").query.sql_with_params()
+        return f"IN ({sql})", list(params)
+    return "= ANY(%s)", [[int(pk) for pk in lessons]]
+
+
+def scope_filter(teacher_id, student_id):
+    sql, params = "", []
+    if teacher_id is not None:
+        sql += " AND lesson.teacher_id = %s"
+        params.append(teacher_id)
+    if student_id is not None:
+        sql += " AND lesson.student_id = %s"
+        params.append(student_id)
+    return sql, params
+
+
+def failure_outcome(transition, status, start_time, starts_after):
+    if status == transition.target:
+        return ALREADY_TRANSITIONED
+    if status not in transition.sources:
+        return NOT_ALLOWED
+    if starts_after is not None and start_time < starts_after:
+        return TOO_LATE
+    # The row matched when read but a concurrent transition won the update.
+    return ALREADY_TRANSITIONED
+
+
+def transition_lessons(
+    transition, lessons, teacher_id=None, student_id=None, starts_after=None
+):
+    """
+    Move ``lessons`` (ids or a Lesson queryset) to ``transition.target``
+    where their status is one of ``transition.sources``. ``teacher_id`` and
+    ``student_id`` restrict the lessons the caller may touch; others are
+    reported as not found. ``starts_after`` additionally requires the lesson
+    to start at or after that moment. Returns ``{lesson_id: result}``.
+    """
+    lessons_sql, params = lesson_filter(lessons)
+    scope, scope_params = scope_filter(teacher_id, student_id)
+    params += scope_params
+    params += [
+        str(transition.target),
+        timezone.now(),
+        [str(status) for status in transition.sources],
+    ]
+    deadline = ""
+    if starts_after is not None:
+        deadline = " AND lesson.start_time >= %s"
+        params.append(starts_after)
+
+    quote = connection.ops.quote_name
+    sql = TRANSITION_SQL.format(
+        lesson=quote(Lesson._meta.db_table),
+        teacher=quote(Teacher._meta.db_table),
+        student=quote(Student._meta.db_table),
+        lessons=lessons_sql,
+        scope=scope,
+        deadline=deadline,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    results = {}
+    for row in rows:
+        lesson_id, status, *details, applied = row
+        start_time = details[4]
+        if applied:
+            outcome, status = APPLIED, transition.target
+        else:
+            outcome = failure_outcome(transition, status, start_time, starts_after)
+        results[lesson_id] = TransitionResult(lesson_id, outcome, status, *details)
+    lessons_updated([result for result in results.values() if result.applied])
+    return results
+
+
+def transition_lesson(transition, lesson_id, **kwargs):
+    """``transition_lessons`` for one lesson; missing lessons are NOT_FOUND."""
+    try:
+        lesson_id = int(lesson_id)
+    except (TypeError, ValueError):
+        return TransitionResult(lesson_id, NOT_FOUND)
+    results = transition_lessons(transition, [lesson_id], **kwargs)
+    return results.get(lesson_id, TransitionResult(lesson_id, NOT_FOUND))
+
+
+def update_lessons(lessons, values, teacher_id=None, student_id=None):
+    """
+    Set the non-status fields in ``values`` on ``lessons`` (ids or a Lesson
+    queryset) within the caller's scope, as one UPDATE. Returns
+    ``{lesson_id: result}`` for the lessons changed.
+    """
+    quote = connection.ops.quote_name
+    assignments, params = [], []
+    for name, value in values.items():
+        field = Lesson._meta.get_field(name)
+        assignments.append(f"{quote(field.column)} = %s")
+        params.append(field.get_db_prep_save(value, connection))
+    params.append(timezone.now())
+    lessons_sql, lessons_params = lesson_filter(lessons)
+    scope, scope_params = scope_filter(teacher_id, student_id)
+    params += lessons_params + scope_params
+
+    sql = UPDATE_SQL.format(
+        lesson=quote(Lesson._meta.db_table),
+        assignments=", ".join(assignments),
+        lessons=lessons_sql,
+        scope=scope,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    results = {
+        row[0]: TransitionResult(
+            row[0], APPLIED, *row[1:4], start_time=row[4], end_time=row[5]
+        )
+        for row in rows
+    }
+    lessons_updated(results.values())
+    return results
@@ -8,6 +8,7 @@ router = DefaultRouter()
 
 router.register(r"schedules", views.ScheduleViewSet, basename="schedule")
 router.register(r"lessons", views.LessonViewSet, basename="lesson")
+router.register(r"holds", views.SlotHoldViewSet, basename="slot-hold")
 router.register(r"ratings", views.RatingViewSet, basename="rating")
 router.register(
     r"notifications", views.InternalNotificationViewSet, basename="notification"
@@ -15,11 +16,17 @@ router.register(
 
 extra_urlpatterns = [
     path("my-students/", views.MyStudentsView.as_view(), name="my-students"),
+    path("stats/", views.TeacherStatsView.as_view(), name="teacher-stats"),
     path(
         "teachers/<int:teacher_id>/subjects/",
         views.TeacherSubjectListView.as_view(),
         name="teacher-subjects",
     ),
+    path(
+        "teachers/availability/",
+        views.TeacherBatchAvailabilityView.as_view(),
+        name="teacher-batch-availability",
+    ),
     path(
         "teachers/<int:teacher_id>/availability/",
         views.TeacherAvailabilityView.as_view(),
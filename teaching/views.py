@@ -1,20 +1,31 @@
 import logging
-from datetime import timedelta, datetime
+from datetime import time, timedelta, datetime
 
 from django.conf import settings
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from rest_framework import generics, status, viewsets, filters
+from rest_framework import generics, mixins, status, viewsets, filters
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError, PermissionDenied
+from rest_framework.exceptions import NotFound, ValidationError, PermissionDenied
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 try:
+    from user.caching import (
+        ConditionalGetMixin,
+        VersionedCacheMixin,
+        availability_scope,
+        get_versions,
+        lesson_summary_scope,
+        teacher_scope,
+    )
     from user.models import Teacher, Student, BaseUser
+    from user.pagination import KeysetPagination
     from user.permissions import IsTeacher, IsStudent, IsProfileOwner, DenyAll
 except ImportError:
     raise ImportError("Could not import models/permissions from 'user' app.")
@@ -26,11 +37,40 @@ try:
         Rating,
         InternalNotification,
         LessonStatus,
+        SlotHold,
+        SyncTombstone,
+        WeekTemplate,
+    )
+    from teaching import week_bitmap
+    from teaching.export import export_rows, iter_csv, iter_ics
+    from teaching.idempotency import IdempotencyMixin
+    from teaching.rollups import STATS_PERIODS, summarize_daily_stats
+    from teaching.summary import MAX_UPCOMING_DAYS, UPCOMING_DAYS, summarize_lessons
+    from teaching.sync import ChangedSinceMixin
+    from teaching.transitions import (
+        ALREADY_TRANSITIONED,
+        APPROVE,
+        CANCEL_BY_STUDENT,
+        CANCEL_BY_TEACHER,
+        NOT_ALLOWED,
+        NOT_FOUND,
+        TOO_LATE,
+        TransitionResult,
+        transition_lesson,
+        transition_lessons,
+        update_lessons,
+    )
+    from teaching.availability import (
+        get_availability_for_teachers,
+        get_teacher_availability,
     )
     from .serializers import (
         ScheduleSerializer,
         LessonListSerializer,
         LessonDetailSerializer,
+        LessonSeriesSerializer,
+        LessonBulkActionSerializer,
+        SlotHoldSerializer,
         RatingSerializer,
         InternalNotificationSerializer,
         MyStudentSerializer,
@@ -44,6 +84,8 @@ except ImportError as e:
 
 logger = logging.getLogger(__name__)
 
+APPROVAL_MESSAGE = _("Teacher {name} approved your lesson {id} for {time}.")
+
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 8
@@ -51,6 +93,30 @@ class StandardResultsSetPagination(PageNumberPagination):
     max_page_size = 50
 
 
+class LessonFeedPagination(KeysetPagination):
+    """
+    Keyset pages over (start_time, id) once the client sends ``cursor``
+    (empty for the first page); page-number pages otherwise, as before.
+    """
+
+    page_size = StandardResultsSetPagination.page_size
+    max_page_size = StandardResultsSetPagination.max_page_size
+    ordering_fields = ("start_time",)
+    default_ordering = "start_time"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.fallback = None
+        if self.cursor_query_param not in request.query_params:
+            self.fallback = StandardResultsSetPagination()
+            return self.fallback.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
 class ScheduleViewSet(viewsets.ModelViewSet):
     serializer_class = ScheduleSerializer
     permission_classes = [IsAuthenticated, IsTeacher]
@@ -69,18 +135,17 @@ class ScheduleViewSet(viewsets.ModelViewSet):
         start_time = serializer.validated_data["start_time"]
         end_time = serializer.validated_data["end_time"]
         weekday = serializer.validated_data["weekday"]
-        overlapping_schedules = Schedule.objects.filter(
-            teacher=teacher_profile,
-            weekday=weekday,
-            start_time__lt=end_time,
-            end_time__gt=start_time,
-        )
         action_name = getattr(self, "action", None)
         if action_name == "update" or action_name == "partial_update":
-            overlapping_schedules = overlapping_schedules.exclude(
-                pk=self.get_object().pk
+            week_mask = week_bitmap.build_week_mask(
+                Schedule.objects.filter(teacher=teacher_profile)
+                .exclude(pk=serializer.instance.pk)
+                .values_list("weekday", "start_time", "end_time")
             )
-        if overlapping_schedules.exists():
+        else:
+            week_mask = WeekTemplate.mask_for(teacher_profile.pk)
+        new_mask = week_bitmap.block_mask(weekday, start_time, end_time)
+        if week_bitmap.overlaps(week_mask, new_mask):
             raise ValidationError(
                 _("The new time slot overlaps with an existing one in your schedule.")
             )
@@ -90,13 +155,27 @@ class ScheduleViewSet(viewsets.ModelViewSet):
         self.perform_create(serializer)
 
 
-class LessonViewSet(viewsets.ModelViewSet):
-    pagination_class = StandardResultsSetPagination
+class LessonViewSet(IdempotencyMixin, ChangedSinceMixin, viewsets.ModelViewSet):
+    pagination_class = LessonFeedPagination
+    sync_kind = SyncTombstone.KIND_LESSON
+    idempotent_actions = (
+        "create",
+        "book_series",
+        "cancel_lesson",
+        "approve_lesson",
+        "mark_paid",
+        "add_homework",
+        "bulk_action",
+    )
 
     def get_serializer_class(self):
         action_name = getattr(self, "action", None)
         if action_name == "list":
             return LessonListSerializer
+        if action_name == "book_series":
+            return LessonSeriesSerializer
+        if action_name == "bulk_action":
+            return LessonBulkActionSerializer
         return LessonDetailSerializer
 
     def get_queryset(self):
@@ -120,26 +199,34 @@ class LessonViewSet(viewsets.ModelViewSet):
         date_to = self.request.query_params.get("date_to")
         status_param = self.request.query_params.get("status")
 
+        # Plain range and equality predicates on the indexed columns, with
+        # aware bounds so Postgres compares timestamptz values directly.
         if date_from:
             try:
-                dt_from = datetime.fromisoformat(date_from)
+                dt_from = self.aware(datetime.fromisoformat(date_from))
                 queryset = queryset.filter(start_time__gte=dt_from)
             except ValueError:
                 pass
         if date_to:
             try:
-                dt_to = datetime.fromisoformat(date_to) + timedelta(days=1)
+                dt_to = self.aware(datetime.fromisoformat(date_to)) + timedelta(days=1)
                 queryset = queryset.filter(start_time__lt=dt_to)
             except ValueError:
                 pass
         if status_param and status_param in LessonStatus.values:
             queryset = queryset.filter(status=status_param)
 
-        return queryset.order_by("start_time")
+        return queryset.order_by("start_time", "id")
+
+    @staticmethod
+    def aware(value):
+        if timezone.is_naive(value):
+            return timezone.make_aware(value)
+        return value
 
     def get_permissions(self):
         action_name = getattr(self, "action", None)
-        if action_name == "create":
+        if action_name in ["create", "book_series", "bulk_action"]:
             self.permission_classes = [IsAuthenticated, (IsStudent | IsTeacher)]
         elif action_name in ["update", "partial_update", "mark_paid", "add_homework"]:
             self.permission_classes = [IsAuthenticated, IsTeacher]
@@ -191,18 +278,6 @@ class LessonViewSet(viewsets.ModelViewSet):
                 "User must be a student or a teacher to create lessons."
             )
 
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        action_name = getattr(self, "action", None)
-        if action_name == "create" and hasattr(self.request.user, "student_profile"):
-            teacher_id = self.request.data.get("teacher_id")
-            if teacher_id:
-                try:
-                    context["teacher"] = Teacher.objects.get(id=teacher_id)
-                except Teacher.DoesNotExist:
-                    pass
-        return context
-
     def perform_update(self, serializer):
         user = self.request.user
         lesson = self.get_object()
@@ -229,19 +304,165 @@ class LessonViewSet(viewsets.ModelViewSet):
         serializer.save()
         logger.info(f"Lesson {lesson.id} updated by teacher {user.email}.")
 
-    @action(detail=True, methods=["post"], url_path="cancel")
-    def cancel_lesson(self, request, pk=None):
-        lesson = self.get_object()
+    @action(detail=False, methods=["post"], url_path="series")
+    def book_series(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        conflicts = serializer.validated_data["conflicts"]
+        if hasattr(request.user, "teacher_profile"):
+            lessons = serializer.save()
+        else:
+            # As in perform_create: only the teacher can book paid lessons.
+            lessons = serializer.save(is_paid=False)
+        logger.info(
+            f"Series of {len(lessons)} lessons booked by {request.user.email} "
+            f"for teacher {lessons[0].teacher_id}."
+        )
+        return Response(
+            {
+                "created": LessonDetailSerializer(
+                    lessons, many=True, context=self.get_serializer_context()
+                ).data,
+                "conflicts": conflicts,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=False, methods=["get"], url_path=r"export/(?P<file_format>csv|ics)")
+    def export_lessons(self, request, file_format=None):
+        """Stream the whole (filtered) lesson history as CSV or iCalendar."""
+        rows = export_rows(self.get_queryset())
+        if file_format == "ics":
+            content = iter_ics(rows, request.get_host().split(":")[0])
+            content_type = "text/calendar; charset=utf-8"
+        else:
+            content = iter_csv(rows)
+            content_type = "text/csv; charset=utf-8"
+        response = StreamingHttpResponse(content, content_type=content_type)
+        filename = f"lessons-{timezone.localdate():%Y%m%d}.{file_format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    def transition_error(self, result, not_allowed_message):
+        """Response for a transition that did not apply, or None."""
+        if result.outcome == NOT_FOUND:
+            raise NotFound()
+        if result.outcome in (NOT_ALLOWED, ALREADY_TRANSITIONED):
+            return Response(
+                {"error": not_allowed_message}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return None
+
+    def cancel_transition(self, user):
+        """
+        The cancel transition and lesson scope for ``user``'s role, with the
+        recipient field, text and sender name of the notification to send.
+        """
+        if user.role == BaseUser.ROLE_STUDENT and hasattr(user, "student_profile"):
+            return (
+                CANCEL_BY_STUDENT,
+                {"student_id": user.student_profile.pk},
+                "teacher_user_id",
+                _("Student {name} cancelled lesson {id}."),
+                user.student_profile.first_name,
+            )
+        if user.role == BaseUser.ROLE_TEACHER and hasattr(user, "teacher_profile"):
+            return (
+                CANCEL_BY_TEACHER,
+                {"teacher_id": user.teacher_profile.pk},
+                "student_user_id",
+                _("Teacher {name} cancelled lesson {id}."),
+                user.teacher_profile.first_name,
+            )
+        raise PermissionDenied(_("You do not have permission to cancel this lesson."))
+
+    @staticmethod
+    def cancel_deadline_hours():
+        return getattr(settings, "LESSON_CANCEL_DEADLINE_HOURS", 3)
+
+    def notify_applied(self, results, recipient_field, message, name):
+        """
+        One notification per applied result, inserted with a single query.
+        ``message`` may use ``{name}``, ``{id}`` and ``{time}``.
+        """
+        notifications = [
+            InternalNotification(
+                user_id=getattr(result, recipient_field),
+                lesson_id=result.lesson_id,
+                message=message.format(
+                    name=name,
+                    id=result.lesson_id,
+                    time=result.start_time.strftime("%Y-%m-%d %H:%M"),
+                ),
+            )
+            for result in results
+            if result.applied
+        ]
+        try:
+            InternalNotification.objects.bulk_create(notifications)
+        except Exception as e:
+            logger.error(
+                f"Failed to create notifications for lessons "
+                f"{[notification.lesson_id for notification in notifications]}: {e}"
+            )
+
+    @action(detail=False, methods=["get"], url_path="summary")
+    def summary(self, request):
+        """
+        Lesson counts per status, unpaid totals and upcoming lessons of the
+        current teacher or student. Cached until their next lesson write.
+        """
         user = request.user
+        if hasattr(user, "teacher_profile"):
+            scope = lesson_summary_scope("teacher", user.teacher_profile.pk)
+            lessons = Lesson.objects.filter(teacher=user.teacher_profile)
+        elif hasattr(user, "student_profile"):
+            scope = lesson_summary_scope("student", user.student_profile.pk)
+            lessons = Lesson.objects.filter(student=user.student_profile)
+        else:
+            raise PermissionDenied(_("Only teachers and students have lessons."))
 
-        if lesson.status not in [LessonStatus.VOID, LessonStatus.APPROVED]:
+        try:
+            days = int(request.query_params.get("days", UPCOMING_DAYS))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= MAX_UPCOMING_DAYS:
             return Response(
-                {"error": _("Only pending or approved lessons can be cancelled.")},
+                {
+                    "error": _("days must be between 1 and {max}.").format(
+                        max=MAX_UPCOMING_DAYS
+                    )
+                },
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        cancel_deadline = getattr(settings, "LESSON_CANCEL_DEADLINE_HOURS", 3)
-        if lesson.start_time - timezone.now() < timedelta(hours=cancel_deadline):
+        # The upcoming window moves with time, so entries also roll over hourly.
+        hour = int(timezone.now().timestamp()) // 3600
+        (version,) = get_versions([scope])
+        cache_key = f"response:lesson_summary:{scope}:{version}:{days}:{hour}"
+        data = cache.get(cache_key)
+        if data is None:
+            data = summarize_lessons(lessons, days)
+            cache.set(cache_key, data, getattr(settings, "PUBLIC_CACHE_TIMEOUT", 900))
+        return Response(data)
+
+    @action(detail=True, methods=["post"], url_path="cancel")
+    def cancel_lesson(self, request, pk=None):
+        user = request.user
+        transition, scope, recipient, message, name = self.cancel_transition(user)
+        cancel_deadline = self.cancel_deadline_hours()
+        result = transition_lesson(
+            transition,
+            pk,
+            starts_after=timezone.now() + timedelta(hours=cancel_deadline),
+            **scope,
+        )
+        error = self.transition_error(
+            result, _("Only pending or approved lessons can be cancelled.")
+        )
+        if error is not None:
+            return error
+        if result.outcome == TOO_LATE:
             return Response(
                 {
                     "error": _(
@@ -251,56 +472,10 @@ class LessonViewSet(viewsets.ModelViewSet):
                 },
                 status=status.HTTP_400_BAD_REQUEST,
             )
-
-        new_status_val = None
-        notification_recipient = None
-        notification_message = ""
-
-        if (
-            user.role == BaseUser.ROLE_STUDENT
-            and hasattr(user, "student_profile")
-            and lesson.student == user.student_profile
-        ):
-            new_status_val = LessonStatus.CANCELLED_BY_STUDENT
-            notification_recipient = lesson.teacher.user
-            notification_message = _("Student {name} cancelled lesson {id}.").format(
-                name=user.student_profile.first_name, id=lesson.id
-            )
-            logger.info(f"Lesson {lesson.id} cancelled by student {user.email}.")
-        elif (
-            user.role == BaseUser.ROLE_TEACHER
-            and hasattr(user, "teacher_profile")
-            and lesson.teacher == user.teacher_profile
-        ):
-            new_status_val = LessonStatus.CANCELLED_BY_TEACHER
-            notification_recipient = lesson.student.user
-            notification_message = _("Teacher {name} cancelled lesson {id}.").format(
-                name=user.teacher_profile.first_name, id=lesson.id
-            )
-            logger.info(f"Lesson {lesson.id} cancelled by teacher {user.email}.")
-        else:
-            raise PermissionDenied(
-                _("You do not have permission to cancel this lesson.")
-            )
-
-        lesson.status = new_status_val
-        lesson.save(update_fields=["status"])
-
-        if notification_recipient:
-            try:
-                InternalNotification.objects.create(
-                    user=notification_recipient,
-                    lesson=lesson,
-                    message=notification_message,
-                )
-            except Exception as e:
-                logger.error(
-                    f"Failed to create cancellation notification "
-                    f"for lesson {lesson.id}: {e}"
-                )
-
+        logger.info(f"Lesson {result.lesson_id} cancelled by {user.email}.")
+        self.notify_applied([result], recipient, message, name)
         return Response(
-            {"status": lesson.status, "message": _("Lesson cancelled successfully.")}
+            {"status": result.status, "message": _("Lesson cancelled successfully.")}
         )
 
     @action(
@@ -310,47 +485,92 @@ class LessonViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated, IsTeacher],
     )
     def approve_lesson(self, request, pk=None):
-        lesson = self.get_object()
         user = request.user
-
-        if (
-            not hasattr(user, "teacher_profile")
-            or lesson.teacher != user.teacher_profile
-        ):
+        if not hasattr(user, "teacher_profile"):
             raise PermissionDenied(_("Only the teacher of this lesson can approve it."))
+        result = transition_lesson(APPROVE, pk, teacher_id=user.teacher_profile.pk)
+        error = self.transition_error(
+            result,
+            _("Lesson already has status '{status}'.").format(
+                status=result.status and LessonStatus(result.status).label
+            ),
+        )
+        if error is not None:
+            return error
+        logger.info(f"Lesson {result.lesson_id} approved by teacher {user.email}.")
+        self.notify_applied(
+            [result],
+            "student_user_id",
+            APPROVAL_MESSAGE,
+            user.teacher_profile.first_name,
+        )
+        serializer = self.get_serializer(self.get_queryset().get(pk=result.lesson_id))
+        return Response(serializer.data)
 
-        if lesson.status == LessonStatus.VOID:
-            lesson.status = LessonStatus.APPROVED
-            lesson.save(update_fields=["status"])
-            logger.info(f"Lesson {lesson.id} approved by teacher {user.email}.")
-            try:
-                time_str = lesson.start_time.strftime("%Y-%m-%d %H:%M")
-                message = _(
-                    "Teacher {name} approved your lesson {id} for {time}."
-                ).format(
-                    name=user.teacher_profile.first_name, id=lesson.id, time=time_str
-                )
-                InternalNotification.objects.create(
-                    user=lesson.student.user, lesson=lesson, message=message
-                )
-            except Exception as e:
-                logger.error(
-                    f"Failed to create approval notification for "
-                    f"lesson {lesson.id}: {e}"
-                )
-
-            serializer = self.get_serializer(lesson)
-            return Response(serializer.data)
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path=r"bulk/(?P<operation>approve|cancel|mark-paid|homework)",
+    )
+    def bulk_action(self, request, operation=None):
+        """
+        Approve, cancel, mark paid or set homework on a list of lessons with
+        one UPDATE, reporting an outcome per id. Ids outside the caller's
+        lessons are reported as ``not_found``.
+        """
+        user = request.user
+        serializer = self.get_serializer(
+            data=request.data,
+            context={**self.get_serializer_context(), "operation": operation},
+        )
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+        if operation != "cancel" and not hasattr(user, "teacher_profile"):
+            raise PermissionDenied(_("Only teachers can perform this action."))
+
+        if operation == "cancel":
+            transition, scope, recipient, message, name = self.cancel_transition(user)
+            deadline = timedelta(hours=self.cancel_deadline_hours())
+            results = transition_lessons(
+                transition, ids, starts_after=timezone.now() + deadline, **scope
+            )
+            self.notify_applied(results.values(), recipient, message, name)
+        elif operation == "approve":
+            results = transition_lessons(
+                APPROVE, ids, teacher_id=user.teacher_profile.pk
+            )
+            self.notify_applied(
+                results.values(),
+                "student_user_id",
+                APPROVAL_MESSAGE,
+                user.teacher_profile.first_name,
+            )
         else:
-            return Response(
-                {
-                    "error": _("Lesson already has status '{status}'.").format(
-                        status=lesson.get_status_display()
-                    )
-                },
-                status=status.HTTP_400_BAD_REQUEST,
+            field_name = LessonBulkActionSerializer.REQUIRED_FIELDS[operation]
+            results = update_lessons(
+                ids,
+                {field_name: serializer.validated_data[field_name]},
+                teacher_id=user.teacher_profile.pk,
             )
 
+        outcomes = [results.get(pk, TransitionResult(pk, NOT_FOUND)) for pk in ids]
+        logger.info(
+            f"Bulk {operation} on {len(ids)} lessons by {user.email}: "
+            f"{sum(result.applied for result in outcomes)} applied."
+        )
+        return Response(
+            {
+                "results": [
+                    {
+                        "id": result.lesson_id,
+                        "outcome": result.outcome,
+                        "status": result.status,
+                    }
+                    for result in outcomes
+                ]
+            }
+        )
+
     @action(
         detail=True,
         methods=["post", "patch"],
@@ -420,6 +640,22 @@ class LessonViewSet(viewsets.ModelViewSet):
         return Response({"homework": serializer.data.get("homework")})
 
 
+class SlotHoldViewSet(
+    mixins.CreateModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet
+):
+    """
+    Place (POST) or release (DELETE by token) a temporary hold on a slot
+    before booking it.
+    """
+
+    serializer_class = SlotHoldSerializer
+    permission_classes = [IsAuthenticated, IsStudent]
+    lookup_field = "token"
+
+    def get_queryset(self):
+        return SlotHold.objects.filter(student__user=self.request.user)
+
+
 class RatingViewSet(viewsets.ModelViewSet):
     serializer_class = RatingSerializer
     permission_classes = [IsAuthenticated]
@@ -477,10 +713,11 @@ class RatingViewSet(viewsets.ModelViewSet):
         )
 
 
-class InternalNotificationViewSet(viewsets.ModelViewSet):
+class InternalNotificationViewSet(ChangedSinceMixin, viewsets.ModelViewSet):
     serializer_class = InternalNotificationSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
+    sync_kind = SyncTombstone.KIND_NOTIFICATION
 
     def get_queryset(self):
         return InternalNotification.objects.filter(
@@ -500,7 +737,7 @@ class InternalNotificationViewSet(viewsets.ModelViewSet):
     def mark_all_as_read(self, request):
         count = InternalNotification.objects.filter(
             user=request.user, is_read=False
-        ).update(is_read=True)
+        ).update(is_read=True, updated_at=timezone.now())
         logger.info(
             f"{count} notifications marked as read for user {request.user.email}."
         )
@@ -533,10 +770,15 @@ class MyStudentsView(generics.ListAPIView):
         )
 
 
-class TeacherSubjectListView(generics.ListAPIView):
+class TeacherSubjectListView(
+    ConditionalGetMixin, VersionedCacheMixin, generics.ListAPIView
+):
     serializer_class = SubjectSerializer
     permission_classes = [AllowAny]
 
+    def get_cache_scopes(self):
+        return (teacher_scope(self.kwargs.get("teacher_id")), "subject")
+
     def get_queryset(self):
         teacher_id = self.kwargs.get("teacher_id")
         teacher = get_object_or_404(
@@ -545,94 +787,205 @@ class TeacherSubjectListView(generics.ListAPIView):
         return teacher.subjects.all()
 
 
-class TeacherAvailabilityView(APIView):
+class TeacherAvailabilityView(ConditionalGetMixin, APIView):
     permission_classes = [AllowAny]
+    max_range_days = None
+
+    def get_cache_scopes(self):
+        teacher_id = self.kwargs.get("teacher_id")
+        return (teacher_scope(teacher_id), availability_scope(teacher_id))
 
     @staticmethod
-    def get(request, teacher_id):
-        teacher = get_object_or_404(Teacher, pk=teacher_id)
+    def _current_hour():
+        # Past slots drop out of the response on the hour.
+        return int(timezone.now().timestamp()) // 3600 * 3600
+
+    def get_etag(self, request):
+        etag = super().get_etag(request).strip('"')
+        return f'"{etag}-{self._current_hour()}"'
+
+    def get_last_modified(self):
+        return max(super().get_last_modified(), self._current_hour())
+
+    def get(self, request, teacher_id):
+        return self.conditional_response(
+            self.get_availability, request, teacher_id=teacher_id
+        )
+
+    @staticmethod
+    def get_date_range(request):
         now_date = timezone.now().date()
         date_from_str = request.query_params.get("date_from", now_date.isoformat())
         date_to_str = request.query_params.get(
             "date_to", (now_date + timedelta(days=30)).isoformat()
         )
+        date_from = datetime.fromisoformat(date_from_str).date()
+        date_to = datetime.fromisoformat(date_to_str).date()
+        return date_from, date_to
+
+    @classmethod
+    def date_range_error(cls, date_from, date_to):
+        if date_to < date_from:
+            return "date_to must not be earlier than date_from."
+        if cls.max_range_days and (date_to - date_from).days >= cls.max_range_days:
+            return f"The date range can span at most {cls.max_range_days} days."
+        return None
+
+    @classmethod
+    def get_availability(cls, request, teacher_id):
+        try:
+            date_from, date_to = cls.get_date_range(request)
+        except ValueError:
+            return Response(
+                {"error": "Invalid date format. Use YYYY-MM-DD."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        error = cls.date_range_error(date_from, date_to)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        availability = get_teacher_availability(teacher_id, date_from, date_to)
+        if availability is None:
+            get_object_or_404(Teacher, pk=teacher_id)
+            availability = {}
+        return Response(availability)
+
+
+class TeacherBatchAvailabilityView(TeacherAvailabilityView):
+    """
+    Free slots of several teachers side by side, optionally narrowed to a
+    daily ``time_from``/``time_to`` window. Runs a fixed number of queries
+    regardless of how many ``teacher_ids`` are passed.
+    """
+
+    max_teachers = 20
+    # Bounds the work of one public request across all compared teachers.
+    max_range_days = 62
+
+    def get_teacher_ids(self):
+        raw_ids = ",".join(self.request.query_params.getlist("teacher_ids"))
+        return list(
+            dict.fromkeys(int(value) for value in raw_ids.split(",") if value.strip())
+        )
 
+    def get_cache_scopes(self):
+        try:
+            teacher_ids = self.get_teacher_ids()
+        except ValueError:
+            return ()
+        if len(teacher_ids) > self.max_teachers:
+            return ()
+        return [
+            scope
+            for teacher_id in teacher_ids
+            for scope in (teacher_scope(teacher_id), availability_scope(teacher_id))
+        ]
+
+    def get(self, request):
+        return self.conditional_response(self.get_batch_availability, request)
+
+    def get_batch_availability(self, request):
         try:
-            date_from = datetime.fromisoformat(date_from_str).date()
-            date_to = datetime.fromisoformat(date_to_str).date()
+            teacher_ids = self.get_teacher_ids()
+        except ValueError:
+            return Response(
+                {"error": "teacher_ids must be a comma-separated list of ids."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not teacher_ids:
+            return Response(
+                {"error": "teacher_ids is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(teacher_ids) > self.max_teachers:
+            return Response(
+                {"error": f"At most {self.max_teachers} teachers can be compared."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            date_from, date_to = self.get_date_range(request)
         except ValueError:
             return Response(
                 {"error": "Invalid date format. Use YYYY-MM-DD."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        error = self.date_range_error(date_from, date_to)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        window = None
+        time_from = request.query_params.get("time_from")
+        time_to = request.query_params.get("time_to")
+        if time_from or time_to:
+            try:
+                window = (
+                    time.fromisoformat(time_from or "00:00"),
+                    time.fromisoformat(time_to or "23:59:59"),
+                )
+            except ValueError:
+                return Response(
+                    {"error": "Invalid time format. Use HH:MM."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if window[0] >= window[1]:
+                return Response(
+                    {"error": "time_from must be earlier than time_to."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
-        schedules = Schedule.objects.filter(teacher=teacher).order_by(
-            "weekday", "start_time"
+        existing_ids = set(
+            Teacher.objects.filter(pk__in=teacher_ids).values_list("pk", flat=True)
+        )
+        availability = get_availability_for_teachers(
+            existing_ids, date_from, date_to, window=window
+        )
+        return Response(
+            {
+                str(teacher_id): availability.get(teacher_id, {})
+                for teacher_id in teacher_ids
+                if teacher_id in existing_ids
+            }
         )
-        booked_lessons = Lesson.objects.filter(
-            teacher=teacher,
-            status__in=[LessonStatus.VOID, LessonStatus.APPROVED],
-            start_time__date__gte=date_from,
-            start_time__date__lte=date_to,
-        ).values_list("start_time", "end_time")
-
-        booked_slots = set()
-        for start, end in booked_lessons:
-            if start and end:
-                current = start
-                while current < end:
-                    booked_slots.add(current.replace(tzinfo=None))
-                    current += timedelta(hours=1)
-            elif start:
-                booked_slots.add(start.replace(tzinfo=None))
-
-        availability = {}
-        current_date = date_from
-        while current_date <= date_to:
-            weekday_name = current_date.strftime("%A").lower()
-            daily_slots = []
-            day_schedules = schedules.filter(weekday=weekday_name)
-            for schedule_slot in day_schedules:
-                try:
-                    s_start_time = schedule_slot.start_time
-                    s_end_time = schedule_slot.end_time
-                    slot_start_dt = timezone.make_aware(
-                        datetime.combine(current_date, s_start_time)
-                    )
-                    slot_end_dt = timezone.make_aware(
-                        datetime.combine(current_date, s_end_time)
-                    )
-                except ValueError:
-                    logger.warning(
-                        f"Invalid time combine for teacher {teacher.id} on "
-                        f"{current_date} for slot {s_start_time}-{s_end_time}"
-                    )
-                    continue
-
-                current_slot_dt = slot_start_dt
-                while current_slot_dt < slot_end_dt:
-                    is_past_slot = current_slot_dt <= timezone.now()
-                    is_booked = current_slot_dt.replace(tzinfo=None) in booked_slots
-
-                    if not is_booked and not is_past_slot:
-                        next_slot_dt = current_slot_dt + timedelta(hours=1)
-                        can_book_2_hours = False
-                        if (
-                            next_slot_dt < slot_end_dt
-                            and next_slot_dt.replace(tzinfo=None) not in booked_slots
-                        ):
-                            can_book_2_hours = True
-
-                        daily_slots.append(
-                            {
-                                "start_time": current_slot_dt.isoformat(),
-                                "can_book_2_hours": can_book_2_hours,
-                            }
-                        )
-                    current_slot_dt += timedelta(hours=1)
 
-            if daily_slots:
-                availability[current_date.isoformat()] = daily_slots
-            current_date += timedelta(days=1)
 
-        return Response(availability)
+class TeacherStatsView(APIView):
+    """
+    Lesson counts, hours and earnings of the current teacher per day, week
+    or month, read from the daily rollup rather than the lesson history.
+    """
+
+    permission_classes = [IsAuthenticated, IsTeacher]
+
+    def get(self, request):
+        if not hasattr(request.user, "teacher_profile"):
+            raise PermissionDenied(_("Complete your teacher profile first."))
+        today = timezone.localdate()
+        try:
+            date_from = datetime.fromisoformat(
+                request.query_params.get("date_from", str(today - timedelta(days=29)))
+            ).date()
+            date_to = datetime.fromisoformat(
+                request.query_params.get("date_to", str(today))
+            ).date()
+        except ValueError:
+            return Response(
+                {"error": "Invalid date format. Use YYYY-MM-DD."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if date_to < date_from:
+            return Response(
+                {"error": "date_to must not be earlier than date_from."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        period = request.query_params.get("period", "day")
+        if period not in STATS_PERIODS:
+            return Response(
+                {"error": f"period must be one of: {', '.join(STATS_PERIODS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            summarize_daily_stats(
+                request.user.teacher_profile, date_from, date_to, period
+            )
+        )
@@ -0,0 +1,92 @@
+"""
+Weekly schedules as 672-bit masks: one bit per quarter hour, Monday 00:00
+first. Bit ``day * 96 + quarter`` is set when the teacher works that quarter.
+"""
+
+from datetime import time, timedelta
+
+WEEKDAY_NAMES = (
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+)
+QUARTER = timedelta(minutes=15)
+QUARTERS_PER_DAY = 96
+QUARTERS_PER_WEEK = 7 * QUARTERS_PER_DAY
+BITMAP_BYTES = QUARTERS_PER_WEEK // 8
+WEEK_MASK = (1 << QUARTERS_PER_WEEK) - 1
+# Schedules use 23:59:59 to mean "until midnight".
+END_OF_DAY = time(23, 59, 59)
+
+
+def quarter_of_day(value, round_up=False):
+    if value >= END_OF_DAY:
+        return QUARTERS_PER_DAY
+    seconds = value.hour * 3600 + value.minute * 60 + value.second
+    quarter, remainder = divmod(seconds, 900)
+    if round_up and (remainder or value.microsecond):
+        quarter += 1
+    return quarter
+
+
+def is_on_quarter(value):
+    return value >= END_OF_DAY or (
+        value.minute % 15 == 0 and value.second == 0 and value.microsecond == 0
+    )
+
+
+def _run(start, length):
+    if length <= 0:
+        return 0
+    mask = ((1 << length) - 1) << start
+    # Wrap Sunday night into Monday morning.
+    return (mask & WEEK_MASK) | (mask >> QUARTERS_PER_WEEK)
+
+
+def block_mask(weekday, start_time, end_time):
+    """Quarters fully covered by one schedule block."""
+    offset = WEEKDAY_NAMES.index(weekday) * QUARTERS_PER_DAY
+    first = quarter_of_day(start_time, round_up=True)
+    last = quarter_of_day(end_time)
+    return _run(offset + first, last - first)
+
+
+def build_week_mask(blocks):
+    mask = 0
+    for weekday, start_time, end_time in blocks:
+        mask |= block_mask(weekday, start_time, end_time)
+    return mask
+
+
+def interval_mask(start, end):
+    """Quarters touched by a local-time ``start``–``end`` interval."""
+    midnight = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    first = (start - midnight) // QUARTER
+    last, remainder = divmod(end - midnight, QUARTER)
+    if remainder:
+        last += 1
+    return _run(start.weekday() * QUARTERS_PER_DAY + first, last - first)
+
+
+def covers(week_mask, mask):
+    return week_mask & mask == mask
+
+
+def overlaps(week_mask, mask):
+    return week_mask & mask != 0
+
+
+def to_bytes(mask):
+    return mask.to_bytes(BITMAP_BYTES, "little")
+
+
+def empty_bitmap():
+    return to_bytes(0)
+
+
+def from_bytes(value):
+    return int.from_bytes(value, "little")
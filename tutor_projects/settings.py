@@ -36,6 +36,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "teaching",
     "user",
     "rest_framework",
@@ -95,6 +96,26 @@ DATABASES = {
     }
 }
 
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+if CACHE_REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+PUBLIC_CACHE_TIMEOUT = int(os.getenv("PUBLIC_CACHE_TIMEOUT", 900))
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", 86400))
+SYNC_TOMBSTONE_DAYS = int(os.getenv("SYNC_TOMBSTONE_DAYS", 30))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -203,6 +224,30 @@ CELERY_BEAT_SCHEDULE = {
         "task": "user.tasks.delete_inactive_unactivated_users",
         "schedule": crontab(minute=0, hour="*/1"),
     },
+    "roll-teacher-free-slots": {
+        "task": "teaching.tasks.roll_teacher_free_slots",
+        "schedule": crontab(minute=5, hour=0),
+    },
+    "purge-expired-slot-holds": {
+        "task": "teaching.tasks.purge_expired_slot_holds",
+        "schedule": crontab(minute="*"),
+    },
+    "complete-expired-lessons": {
+        "task": "teaching.tasks.complete_expired_lessons",
+        "schedule": crontab(minute="*/10"),
+    },
+    "purge-sync-tombstones": {
+        "task": "teaching.tasks.purge_sync_tombstones",
+        "schedule": crontab(minute=30, hour=3),
+    },
+    "send-queued-emails": {
+        "task": "user.tasks.send_queued_emails",
+        "schedule": crontab(minute="*"),
+    },
+    "purge-finished-emails": {
+        "task": "user.tasks.purge_finished_emails",
+        "schedule": crontab(minute=45, hour=3),
+    },
 }
 
 
@@ -214,11 +259,20 @@ EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = os.getenv(
     "DEFAULT_FROM_EMAIL",
 )
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", 10))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 6))
+EMAIL_OUTBOX_RETRY_SECONDS = int(os.getenv("EMAIL_OUTBOX_RETRY_SECONDS", 60))
+# Sent and failed emails, whose bodies may hold live links, are then deleted.
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS", 7))
 
 # URL фронту для листів активації/скидання пароля
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://34.140.55.162:3000")
 
 ACTIVATION_TOKEN_LIFETIME_HOURS = int(os.getenv("ACTIVATION_TOKEN_LIFETIME_HOURS", 24))
+# Unactivated accounts can still ask for a new link until they are purged.
+UNACTIVATED_USER_RETENTION_HOURS = int(
+    os.getenv("UNACTIVATED_USER_RETENTION_HOURS", 72)
+)
 PASSWORD_RESET_TOKEN_LIFETIME_HOURS = int(
     os.getenv("PASSWORD_RESET_TOKEN_LIFETIME_HOURS", 1)
 )
@@ -232,3 +286,7 @@ MEDIA_ROOT = ""
 MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", 5))
 
 LESSON_CANCEL_DEADLINE_HOURS = int(os.getenv("LESSON_CANCEL_DEADLINE_HOURS", 3))
+
+TEACHER_SEARCH_CONFIG = os.getenv("TEACHER_SEARCH_CONFIG", "simple")
+TEACHER_FREE_SLOT_DAYS = int(os.getenv("TEACHER_FREE_SLOT_DAYS", 14))
+SLOT_HOLD_SECONDS = int(os.getenv("SLOT_HOLD_SECONDS", 300))
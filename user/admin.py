@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.html import format_html
 
 from .models import (
@@ -12,6 +13,7 @@ from .models import (
     Subject,
     Language,
     CategoriesOfStudents,
+    OutgoingEmail,
 )
 
 
@@ -71,7 +73,10 @@ class UserAdmin(BaseUserAdmin):
                 ),
             },
         ),
-        (_("Important dates"), {"fields": ("last_login", "created_at")}),
+        (
+            _("Important dates"),
+            {"fields": ("last_login", "activated_at", "created_at")},
+        ),
     )
     add_fieldsets = (
         (
@@ -89,7 +94,7 @@ class UserAdmin(BaseUserAdmin):
             },
         ),
     )
-    readonly_fields = ("last_login", "created_at")
+    readonly_fields = ("last_login", "activated_at", "created_at")
 
 
 class TeacherInline(admin.StackedInline):
@@ -125,7 +130,14 @@ class TeacherAdmin(admin.ModelAdmin):
         "languages",
     )
     search_fields = ("first_name", "last_name", "user__email", "phone")
-    readonly_fields = ("created_at", "user", "photo")
+    readonly_fields = (
+        "created_at",
+        "user",
+        "photo",
+        "rating_average",
+        "rating_count",
+        "rating_sum",
+    )
     list_select_related = ("user", "city")
     filter_horizontal = ("languages", "categories", "subjects")
     raw_id_fields = (
@@ -157,6 +169,10 @@ class TeacherAdmin(admin.ModelAdmin):
             {"fields": ("about_me", "hobbies", "education", "lesson_flow")},
         ),
         (_("Status"), {"fields": ("is_verified",)}),
+        (
+            _("Rating"),
+            {"fields": ("rating_average", "rating_count", "rating_sum")},
+        ),
         (_("Photo"), {"fields": ("photo", "photo_format")}),
         (_("Dates"), {"fields": ("created_at",)}),
     )
@@ -184,3 +200,34 @@ class StudentAdmin(admin.ModelAdmin):
             link = reverse("admin:user_baseuser_change", args=[obj.user.id])
             return format_html('<a href="{}">{}</a>', link, obj.user.email)
         return "-"
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ("to", "subject", "status", "attempts", "next_attempt_at")
+    list_filter = ("status",)
+    search_fields = ("to", "subject")
+    # Bodies hold activation and reset links: staff can read them while an
+    # email is pending, but not redirect or rewrite them.
+    readonly_fields = (
+        "to",
+        "subject",
+        "body",
+        "from_email",
+        "created_at",
+        "sent_at",
+        "last_error",
+    )
+    actions = ["retry_now"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description=_("Retry selected emails now"))
+    def retry_now(self, request, queryset):
+        updated_count = queryset.exclude(status=OutgoingEmail.STATUS_SENT).update(
+            status=OutgoingEmail.STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
+        self.message_user(request, f"{updated_count} emails queued for retry.")
@@ -0,0 +1,130 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY_PREFIX = "cache_version"
+CATALOG_SCOPE = "teacher_catalog"
+FREE_SLOTS_SCOPE = "teacher_free_slots"
+REFERENCE_SCOPES = ("city", "subject", "language", "category")
+
+
+def teacher_scope(teacher_id):
+    return f"teacher:{teacher_id}"
+
+
+def availability_scope(teacher_id):
+    return f"availability:{teacher_id}"
+
+
+def lesson_summary_scope(role, profile_id):
+    # role is "teacher" or "student": the side of the lessons summarised.
+    return f"lesson_summary:{role}:{profile_id}"
+
+
+def _version_key(scope):
+    return f"{VERSION_KEY_PREFIX}:{scope}"
+
+
+def get_versions(scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*scopes):
+    # Versions are change timestamps, so they double as Last-Modified.
+    # Bump after commit so readers never re-cache pre-commit data.
+    transaction.on_commit(
+        lambda: cache.set_many(
+            {_version_key(scope): time.time_ns() for scope in scopes},
+            timeout=None,
+        )
+    )
+
+
+class ScopedVersionMixin:
+    cache_scopes = ()
+
+    def get_cache_scopes(self):
+        return self.cache_scopes
+
+    def get_scope_versions(self):
+        if not hasattr(self, "_scope_versions"):
+            self._scope_versions = get_versions(self.get_cache_scopes())
+        return self._scope_versions
+
+
+class ConditionalGetMixin(ScopedVersionMixin):
+    """
+    Answers If-None-Match / If-Modified-Since with 304 from the scope
+    versions alone, before the queryset or serializer is touched.
+    """
+
+    def get_last_modified(self):
+        return max(self.get_scope_versions(), default=0) // 1_000_000_000
+
+    def get_etag(self, request):
+        versions = ".".join(str(v) for v in self.get_scope_versions())
+        audience = "auth" if request.user.is_authenticated else "anon"
+        key = f"{type(self).__name__}:{versions}:{audience}:{request.get_full_path()}"
+        digest = hashlib.sha1(key.encode("utf-8"), usedforsecurity=False)
+        return quote_etag(digest.hexdigest())
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        last_modified = self.get_last_modified()
+        not_modified = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def get(self, request, *args, **kwargs):
+        return self.conditional_response(super().get, request, *args, **kwargs)
+
+
+class VersionedCacheMixin(ScopedVersionMixin):
+    """
+    Caches successful GET responses under a key built from the versions of
+    ``cache_scopes``; signals bump those versions when the data changes.
+    """
+
+    def get_cache_key(self, request):
+        versions = ".".join(str(v) for v in self.get_scope_versions())
+        path = hashlib.md5(
+            request.get_full_path().encode("utf-8"), usedforsecurity=False
+        ).hexdigest()
+        audience = "auth" if request.user.is_authenticated else "anon"
+        return f"response:{type(self).__name__}:{versions}:{audience}:{path}"
+
+    def get(self, request, *args, **kwargs):
+        cache_key = self.get_cache_key(request)
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(
+                cache_key,
+                response.data,
+                getattr(settings, "PUBLIC_CACHE_TIMEOUT", 900),
+            )
+        return response
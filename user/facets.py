@@ -0,0 +1,123 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, F, IntegerField, Value, When
+
+from user.caching import CATALOG_SCOPE, get_versions
+from user.filters import M2M_FACETS, apply_catalog_params
+
+FACET_KEYS = {
+    "subject": "subjects",
+    "category": "categories",
+    "language": "languages",
+    "city": "cities",
+}
+
+
+def get_price_buckets():
+    return getattr(settings, "TEACHER_PRICE_BUCKETS", [200, 400, 600, 800, 1000])
+
+
+def _facet_rows(queryset, name, value, count_field):
+    return (
+        queryset.order_by()
+        .annotate(
+            facet=Value(name, output_field=CharField()),
+            facet_value=value,
+        )
+        .values("facet", "facet_value")
+        .annotate(facet_count=Count(count_field))
+        .values_list("facet", "facet_value", "facet_count")
+    )
+
+
+def _price_bucket(buckets):
+    return Case(
+        *[
+            When(lesson_price__lt=edge, then=Value(index))
+            for index, edge in enumerate(buckets)
+        ],
+        default=Value(len(buckets)),
+        output_field=IntegerField(),
+    )
+
+
+def compute_facets(queryset, params):
+    buckets = get_price_buckets()
+    integer = IntegerField()
+    branches = [
+        _facet_rows(
+            apply_catalog_params(queryset, params),
+            "total",
+            Value(0, output_field=integer),
+            "pk",
+        )
+    ]
+    for param, (through, column) in M2M_FACETS.items():
+        teachers = apply_catalog_params(queryset, params, exclude=param)
+        branches.append(
+            _facet_rows(
+                through.objects.filter(teacher_id__in=teachers.values("pk")),
+                param,
+                F(column),
+                "teacher_id",
+            )
+        )
+    branches.append(
+        _facet_rows(
+            apply_catalog_params(queryset, params, exclude="city").filter(
+                city__isnull=False
+            ),
+            "city",
+            F("city_id"),
+            "pk",
+        )
+    )
+    branches.append(
+        _facet_rows(
+            apply_catalog_params(queryset, params, exclude="price").filter(
+                lesson_price__isnull=False
+            ),
+            "price",
+            _price_bucket(buckets),
+            "pk",
+        )
+    )
+
+    edges = [0] + list(buckets) + [None]
+    price = [
+        {"min": edges[index], "max": edges[index + 1], "count": 0}
+        for index in range(len(buckets) + 1)
+    ]
+    facets = {"total": 0, **{key: [] for key in FACET_KEYS.values()}}
+    for facet, value, count in branches[0].union(*branches[1:], all=True):
+        if facet == "total":
+            facets["total"] = count
+        elif facet == "price":
+            price[value]["count"] = count
+        else:
+            facets[FACET_KEYS[facet]].append({"id": value, "count": count})
+    for key in FACET_KEYS.values():
+        facets[key].sort(key=lambda item: (-item["count"], item["id"]))
+    facets["price"] = price
+    return facets
+
+
+def get_teacher_facets(queryset, params, search=""):
+    normalized = json.dumps(
+        {"params": params, "search": search.lower()}, sort_keys=True, default=str
+    )
+    digest = hashlib.md5(normalized.encode("utf-8"), usedforsecurity=False).hexdigest()
+    (version,) = get_versions([CATALOG_SCOPE])
+    cache_key = f"teacher_facets:{version}:{digest}"
+    facets = cache.get(cache_key)
+    if facets is None:
+        facets = compute_facets(queryset, params)
+        cache.set(
+            cache_key,
+            facets,
+            getattr(settings, "TEACHER_FACETS_CACHE_TIMEOUT", 600),
+        )
+    return facets
@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import filters
+
+from teaching.models import TeacherFreeSlot
+from user.models import Teacher
+
+M2M_FACETS = {
+    "subject": (Teacher.subjects.through, "subject_id"),
+    "category": (Teacher.categories.through, "categoriesofstudents_id"),
+    "language": (Teacher.languages.through, "language_id"),
+}
+FACET_PARAMS = ("subject", "category", "language", "city")
+PRICE_PARAMS = ("price_min", "price_max")
+AVAILABILITY_PARAMS = ("available_from", "available_to")
+
+
+def _parse_ids(value):
+    ids = {int(part) for part in value.split(",") if part.strip().isdigit()}
+    return tuple(sorted(ids))
+
+
+def _parse_price(value):
+    try:
+        price = Decimal(value)
+    except (InvalidOperation, TypeError):
+        return None
+    return price if price.is_finite() and price >= 0 else None
+
+
+def _parse_moment(value, end_of_day=False):
+    """ISO datetime, or a date meaning its start (or end) in local time."""
+    try:
+        day = parse_date(value or "")
+        if day is not None:
+            if end_of_day:
+                day += timedelta(days=1)
+            moment = datetime.combine(day, datetime.min.time())
+        else:
+            moment = parse_datetime(value or "")
+    except ValueError:
+        return None
+    if moment is None:
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def get_availability_params(query_params):
+    params = {}
+    available_from = _parse_moment(query_params.get("available_from"))
+    if available_from is not None:
+        params["available_from"] = available_from
+    available_to = _parse_moment(query_params.get("available_to"), end_of_day=True)
+    if available_to is not None:
+        params["available_to"] = available_to
+    return params
+
+
+def get_catalog_params(query_params):
+    params = {}
+    for param in FACET_PARAMS:
+        ids = _parse_ids(query_params.get(param, ""))
+        if ids:
+            params[param] = ids
+    for param in PRICE_PARAMS:
+        price = _parse_price(query_params.get(param))
+        if price is not None:
+            params[param] = price
+    return params
+
+
+def apply_catalog_params(queryset, params, exclude=None):
+    for param, (through, column) in M2M_FACETS.items():
+        if param != exclude and param in params:
+            queryset = queryset.filter(
+                pk__in=through.objects.filter(
+                    **{f"{column}__in": params[param]}
+                ).values("teacher_id")
+            )
+    if exclude != "city" and "city" in params:
+        queryset = queryset.filter(city_id__in=params["city"])
+    if exclude != "price":
+        if "price_min" in params:
+            queryset = queryset.filter(lesson_price__gte=params["price_min"])
+        if "price_max" in params:
+            queryset = queryset.filter(lesson_price__lte=params["price_max"])
+    return queryset
+
+
+class TeacherCatalogFilter(filters.BaseFilterBackend):
+    """
+    Filters the catalog by ``subject``, ``category``, ``language`` and
+    ``city`` (comma-separated ids, any of) and ``price_min``/``price_max``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return apply_catalog_params(queryset, get_catalog_params(request.query_params))
+
+    def get_schema_operation_parameters(self, view):
+        parameters = [
+            {
+                "name": param,
+                "required": False,
+                "in": "query",
+                "description": f"Comma-separated {param} ids",
+                "schema": {"type": "string"},
+            }
+            for param in FACET_PARAMS
+        ]
+        parameters += [
+            {
+                "name": param,
+                "required": False,
+                "in": "query",
+                "schema": {"type": "number"},
+            }
+            for param in PRICE_PARAMS
+        ]
+        return parameters
+
+
+class TeacherAvailabilityFilter(filters.BaseFilterBackend):
+    """
+    Keeps teachers with a free hour inside ``available_from``–``available_to``
+    (ISO datetimes or dates), read from the precomputed free slots.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = get_availability_params(request.query_params)
+        if not params:
+            return queryset
+        slots = TeacherFreeSlot.objects.filter(
+            start_time__gte=max(
+                params.get("available_from", timezone.now()), timezone.now()
+            )
+        )
+        if "available_to" in params:
+            slots = slots.filter(end_time__lte=params["available_to"])
+        return queryset.filter(pk__in=slots.values("teacher_id"))
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": param,
+                "required": False,
+                "in": "query",
+                "description": "ISO datetime or date",
+                "schema": {"type": "string"},
+            }
+            for param in AVAILABILITY_PARAMS
+        ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1 on 2026-10-16 17:28
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Teacher = apps.get_model("user", "Teacher")
+    Rating = apps.get_model("teaching", "Rating")
+    ratings = Rating.objects.filter(teacher=OuterRef("pk")).order_by().values("teacher")
+    for field, aggregate in (
+        ("rating_count", Count("id")),
+        ("rating_sum", Sum("rating")),
+        ("rating_average", Avg("rating")),
+    ):
+        Teacher.objects.filter(pk__in=Rating.objects.values("teacher")).update(
+            **{field: Subquery(ratings.annotate(v=aggregate).values("v"))}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0001_initial"),
+        ("teaching", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="teacher",
+            name="rating_average",
+            field=models.DecimalField(
+                decimal_places=2, default=0, max_digits=3, verbose_name="Average rating"
+            ),
+        ),
+        migrations.AddField(
+            model_name="teacher",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Rating count"),
+        ),
+        migrations.AddField(
+            model_name="teacher",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0, verbose_name="Rating sum"),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
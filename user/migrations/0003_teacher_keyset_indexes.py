@@ -0,0 +1,38 @@
+# Generated by Django 5.1 on 2026-10-16 17:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0002_teacher_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="teacher",
+            index=models.Index(
+                fields=["lesson_price", "id"], name="user_teache_lesson__01e66a_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="teacher",
+            index=models.Index(
+                fields=["teaching_experience", "id"],
+                name="user_teache_teachin_aa2ebc_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="teacher",
+            index=models.Index(
+                fields=["rating_average", "id"], name="user_teache_rating__d5e158_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="teacher",
+            index=models.Index(
+                fields=["created_at", "id"], name="user_teache_created_3674ac_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.1 on 2026-10-16 17:31
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Concat, Lower
+
+
+def backfill_search_document(apps, schema_editor):
+    Teacher = apps.get_model("user", "Teacher")
+    City = apps.get_model("user", "City")
+
+    def related_names(through_model, name_path):
+        names = (
+            through_model.objects.filter(teacher=OuterRef("pk"))
+            .order_by()
+            .values("teacher")
+            .annotate(names=StringAgg(name_path, " "))
+            .values("names")
+        )
+        return Coalesce(Subquery(names), Value(""), output_field=TextField())
+
+    subjects = related_names(Teacher.subjects.through, "subject__name")
+    categories = related_names(Teacher.categories.through, "categoriesofstudents__name")
+    city = Coalesce(
+        Subquery(City.objects.filter(pk=OuterRef("city_id")).values("name")),
+        Value(""),
+        output_field=TextField(),
+    )
+    config = getattr(settings, "TEACHER_SEARCH_CONFIG", "simple")
+    Teacher.objects.update(
+        search_document=(
+            SearchVector("first_name", "last_name", weight="A", config=config)
+            + SearchVector(subjects, categories, weight="B", config=config)
+            + SearchVector(city, weight="C", config=config)
+            + SearchVector("about_me", weight="D", config=config)
+        ),
+        search_text=Lower(
+            Concat(
+                "first_name",
+                Value(" "),
+                "last_name",
+                Value(" "),
+                subjects,
+                Value(" "),
+                city,
+                output_field=TextField(),
+            )
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0003_teacher_keyset_indexes"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="teacher",
+            name="search_document",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="teacher",
+            name="search_text",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="teacher",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_document"], name="user_teache_search__53a1b3_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="teacher",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    "search_text", name="gin_trgm_ops"
+                ),
+                name="user_teacher_search_trgm_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_search_document, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1 on 2026-10-16 18:13
+
+from django.db import migrations, models
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+
+
+def backfill_activated_at(apps, schema_editor):
+    # The activation time was never stored: any sign of use counts, so a
+    # deactivated account that has a profile is not purged.
+    BaseUser = apps.get_model("user", "BaseUser")
+    BaseUser.objects.filter(
+        Q(is_active=True)
+        | Q(last_login__isnull=False)
+        | Q(teacher_profile__isnull=False)
+        | Q(student_profile__isnull=False)
+    ).update(activated_at=Coalesce("last_login", F("created_at")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("user", "0005_outgoing_email"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="baseuser",
+            name="activated_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Activated at"
+            ),
+        ),
+        migrations.RunPython(backfill_activated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="baseuser",
+            index=models.Index(
+                condition=models.Q(
+                    ("activated_at__isnull", True),
+                    ("is_active", False),
+                    ("last_login__isnull", True),
+                ),
+                fields=["created_at", "id"],
+                name="user_unactivated_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1 on 2026-10-16 21:02
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Concat, Lower
+
+
+def rebuild_search_text(apps, schema_editor):
+    # search_text now also holds the categories and about_me, so typos in
+    # those words are matched too.
+    Teacher = apps.get_model("user", "Teacher")
+    City = apps.get_model("user", "City")
+
+    def related_names(through_model, name_path):
+        names = (
+            through_model.objects.filter(teacher=OuterRef("pk"))
+            .order_by()
+            .values("teacher")
+            .annotate(names=StringAgg(name_path, " "))
+            .values("names")
+        )
+        return Coalesce(Subquery(names), Value(""), output_field=TextField())
+
+    city = Coalesce(
+        Subquery(City.objects.filter(pk=OuterRef("city_id")).values("name")),
+        Value(""),
+        output_field=TextField(),
+    )
+    Teacher.objects.update(
+        search_text=Lower(
+            Concat(
+                "first_name",
+                Value(" "),
+                "last_name",
+                Value(" "),
+                related_names(Teacher.subjects.through, "subject__name"),
+                Value(" "),
+                related_names(Teacher.categories.through, "categoriesofstudents__name"),
+                Value(" "),
+                city,
+                Value(" "),
+                "about_me",
+                output_field=TextField(),
+            )
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0006_unactivated_user_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_text, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,10 @@
 from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import RegexValidator
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -98,6 +101,9 @@ class BaseUser(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(_("Active"), default=False)
     is_staff = models.BooleanField(_("Staff status"), default=False)
     created_at = models.DateTimeField(_("Created at"), auto_now_add=True)
+    # Set the first time the account becomes active, and kept when it is
+    # deactivated later, so only never-activated accounts are purged.
+    activated_at = models.DateTimeField(_("Activated at"), null=True, blank=True)
 
     ROLE_STUDENT = "student"
     ROLE_TEACHER = "teacher"
@@ -117,10 +123,30 @@ class BaseUser(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = _("User")
         verbose_name_plural = _("Users")
+        indexes = [
+            # Drives the hourly purge of accounts that were never activated.
+            models.Index(
+                fields=["created_at", "id"],
+                name="user_unactivated_created_idx",
+                condition=models.Q(
+                    is_active=False,
+                    activated_at__isnull=True,
+                    last_login__isnull=True,
+                ),
+            ),
+        ]
 
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        if self.is_active and self.activated_at is None:
+            self.activated_at = timezone.now()
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "activated_at"}
+        super().save(*args, **kwargs)
+
 
 phone_regex = RegexValidator(
     regex=r"^\+?1?\d{9,20}$",
@@ -163,15 +189,40 @@ class Teacher(models.Model):
     viber = models.CharField(_("Viber"), max_length=100, blank=True, null=True)
     instagram = models.CharField(_("Instagram"), max_length=100, blank=True, null=True)
     is_verified = models.BooleanField(_("Verified"), default=False)
+    rating_count = models.PositiveIntegerField(_("Rating count"), default=0)
+    rating_sum = models.PositiveIntegerField(_("Rating sum"), default=0)
+    rating_average = models.DecimalField(
+        _("Average rating"), max_digits=3, decimal_places=2, default=0
+    )
+    search_document = SearchVectorField(null=True, editable=False)
+    search_text = models.TextField(blank=True, default="", editable=False)
     created_at = models.DateTimeField(_("Created at"), auto_now_add=True)
 
     class Meta:
         verbose_name = _("Teacher")
         verbose_name_plural = _("Teachers")
+        indexes = [
+            models.Index(fields=["lesson_price", "id"]),
+            models.Index(fields=["teaching_experience", "id"]),
+            models.Index(fields=["rating_average", "id"]),
+            models.Index(fields=["created_at", "id"]),
+            GinIndex(fields=["search_document"]),
+            GinIndex(
+                OpClass("search_text", name="gin_trgm_ops"),
+                name="user_teacher_search_trgm_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    @property
+    def rating_summary(self):
+        return {
+            "average": float(self.rating_average or 0),
+            "count": self.rating_count,
+        }
+
 
 class Student(models.Model):
     user = models.OneToOneField(
@@ -192,3 +243,47 @@ class Student(models.Model):
         if self.first_name and self.last_name:
             return f"{self.first_name} {self.last_name}"
         return self.user.email
+
+
+class OutgoingEmail(models.Model):
+    """
+    Transactional email written in the request's transaction and sent later
+    by ``user.tasks.send_queued_emails``.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, _("Pending")),
+        (STATUS_SENT, _("Sent")),
+        (STATUS_FAILED, _("Failed")),
+    ]
+
+    to = models.EmailField(_("To"))
+    subject = models.CharField(_("Subject"), max_length=255)
+    body = models.TextField(_("Body"))
+    from_email = models.CharField(_("From"), max_length=255, blank=True)
+    status = models.CharField(
+        _("Status"), max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(_("Attempts"), default=0)
+    next_attempt_at = models.DateTimeField(_("Next attempt at"), default=timezone.now)
+    last_error = models.TextField(_("Last error"), blank=True)
+    created_at = models.DateTimeField(_("Created at"), auto_now_add=True)
+    sent_at = models.DateTimeField(_("Sent at"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Outgoing email")
+        verbose_name_plural = _("Outgoing emails")
+        indexes = [
+            # The sender only ever scans pending rows that are due.
+            models.Index(
+                fields=["next_attempt_at"],
+                name="outgoing_email_due_idx",
+                condition=models.Q(status="pending"),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {self.to}"
@@ -0,0 +1,172 @@
+"""
+Transactional email outbox. Requests only insert ``OutgoingEmail`` rows, in
+the caller's transaction, so an email exists exactly when the change that
+sends it commits; ``send_queued_emails`` delivers due rows in batches over
+one SMTP connection and retries failures with exponential backoff.
+Bodies carry live activation and reset links, so they are blanked once sent
+and finished rows are purged after ``EMAIL_OUTBOX_RETENTION_DAYS``.
+"""
+
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from user.models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+SEND_BATCH_SIZE = 100
+# Claimed rows become due again if their worker dies before recording them.
+CLAIM_TIMEOUT = timedelta(minutes=5)
+MAX_RETRY_DELAY = timedelta(hours=1)
+# Refusals of one message; the SMTP session itself is still usable.
+MESSAGE_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+
+
+def queue_email(subject, body, to, from_email=None):
+    """
+    Queue an email to the address ``to`` as part of the current transaction:
+    a rollback discards it. The sender task is kicked once it commits.
+    """
+    email = OutgoingEmail.objects.create(
+        to=to,
+        subject=str(subject),
+        body=str(body),
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL or "",
+    )
+    transaction.on_commit(kick_sender)
+    return email
+
+
+def kick_sender():
+    from user.tasks import send_queued_emails
+
+    try:
+        send_queued_emails.delay()
+    except Exception as e:
+        # The beat schedule picks the rows up on its next run.
+        logger.warning(f"Could not enqueue the email sender: {e}")
+
+
+def retry_delay(attempts):
+    base = getattr(settings, "EMAIL_OUTBOX_RETRY_SECONDS", 60)
+    return min(timedelta(seconds=base * 2 ** (attempts - 1)), MAX_RETRY_DELAY)
+
+
+def claim_due_emails(batch_size, now):
+    with transaction.atomic():
+        batch = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutgoingEmail.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        OutgoingEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+            next_attempt_at=now + CLAIM_TIMEOUT
+        )
+    return batch
+
+
+def record_failure(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    max_attempts = getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 6)
+    if email.attempts >= max_attempts:
+        email.status = OutgoingEmail.STATUS_FAILED
+        logger.error(
+            f"Giving up on email {email.pk} to {email.to} after "
+            f"{email.attempts} attempts: {error}"
+        )
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+        logger.warning(f"Email {email.pk} to {email.to} failed, will retry: {error}")
+
+
+def send_email_batch(batch_size=SEND_BATCH_SIZE, now=None):
+    """
+    Send up to ``batch_size`` due emails over one connection. Returns the
+    number of emails attempted and the number sent; when the session breaks,
+    the rest of the batch is left for the next run.
+    """
+    now = now or timezone.now()
+    batch = claim_due_emails(batch_size, now)
+    if not batch:
+        return 0, 0
+
+    sent_ids, failed, released_ids = [], [], []
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        for email in batch:
+            record_failure(email, e, now)
+        failed = batch
+    else:
+        for index, email in enumerate(batch):
+            message = EmailMessage(
+                email.subject,
+                email.body,
+                email.from_email or None,
+                [email.to],
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as e:
+                record_failure(email, e, now)
+                failed.append(email)
+                if not isinstance(e, MESSAGE_ERRORS):
+                    # The session is gone; sending on would open one per
+                    # message.
+                    released_ids = [rest.pk for rest in batch[index + 1 :]]
+                    break
+            else:
+                sent_ids.append(email.pk)
+    finally:
+        connection.close()
+
+    OutgoingEmail.objects.filter(pk__in=sent_ids).update(
+        status=OutgoingEmail.STATUS_SENT,
+        attempts=F("attempts") + 1,
+        sent_at=timezone.now(),
+        last_error="",
+        body="",
+    )
+    OutgoingEmail.objects.bulk_update(
+        failed, ["status", "attempts", "next_attempt_at", "last_error"]
+    )
+    OutgoingEmail.objects.filter(pk__in=released_ids).update(next_attempt_at=now)
+    return len(batch) - len(released_ids), len(sent_ids)
+
+
+def send_queued_emails(batch_size=SEND_BATCH_SIZE):
+    """Send every due email, batch by batch. Returns the number sent."""
+    total = 0
+    while True:
+        attempted, sent = send_email_batch(batch_size)
+        total += sent
+        if attempted < batch_size:
+            return total
+
+
+def purge_finished_emails(now=None):
+    """
+    Delete sent and failed emails older than ``EMAIL_OUTBOX_RETENTION_DAYS``.
+    Returns the number deleted.
+    """
+    now = now or timezone.now()
+    days = getattr(settings, "EMAIL_OUTBOX_RETENTION_DAYS", 7)
+    deleted, _per_model = OutgoingEmail.objects.filter(
+        status__in=[OutgoingEmail.STATUS_SENT, OutgoingEmail.STATUS_FAILED],
+        created_at__lt=now - timedelta(days=days),
+    ).delete()
+    return deleted
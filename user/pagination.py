@@ -0,0 +1,190 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Field, Func, Value
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class Row(Func):
+    function = "ROW"
+    output_field = Field()
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over (ordering field, id): no OFFSET, no COUNT(*).
+    Only applied when the client sends ``cursor`` or ``page_size``.
+    Nullable fields are walked as separate NULL / non-NULL segments. The
+    ordering field may also be an annotation of the queryset.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    ordering_query_param = "ordering"
+    page_size = 20
+    max_page_size = 100
+    ordering_fields = ()
+    default_ordering = "-id"
+    invalid_cursor_message = _("Invalid cursor")
+    invalid_ordering_message = _("Cursor pages can be ordered by: {fields}.")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (
+            self.cursor_query_param not in request.query_params
+            and self.page_size_query_param not in request.query_params
+        ):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset)
+        self.field_name = self.ordering.lstrip("-")
+        self.descending = self.ordering.startswith("-")
+        annotation = queryset.query.annotations.get(self.field_name)
+        if annotation is not None:
+            self.field = annotation.output_field
+        else:
+            self.field = queryset.model._meta.get_field(self.field_name)
+        position = self.decode_cursor(request)
+
+        segments = [False, True] if self.field.null else [False]
+        if self.descending:
+            segments.reverse()
+        start = segments.index(position[0] is None) if position else 0
+
+        limit = self.page_size + 1
+        results = []
+        for index, is_null in enumerate(segments[start:], start=start):
+            segment = queryset
+            if self.field.null:
+                segment = segment.filter(**{f"{self.field_name}__isnull": is_null})
+            if position and index == start:
+                segment = self.filter_after(segment, *position)
+            direction = "-" if self.descending else ""
+            segment = segment.order_by(
+                f"{direction}{self.field_name}", f"{direction}pk"
+            )
+            results.extend(segment[: limit - len(results)])
+            if len(results) >= limit:
+                break
+
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def filter_after(self, queryset, value, pk):
+        lookup = "lt" if self.descending else "gt"
+        if value is None:
+            return queryset.filter(**{f"pk__{lookup}": pk})
+        return queryset.alias(keyset=Row(F(self.field_name), F("pk"))).filter(
+            **{f"keyset__{lookup}": Row(Value(value), Value(pk))}
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, request, queryset):
+        params = request.query_params.get(self.ordering_query_param, "")
+        term = params.split(",")[0].strip()
+        if not term:
+            return self.get_default_ordering(request, queryset)
+        if term.lstrip("-") not in self.ordering_fields:
+            # Falling back silently would hand out pages in another order
+            # than the one asked for.
+            fields = ", ".join(self.ordering_fields)
+            raise ValidationError(
+                {
+                    self.ordering_query_param: [
+                        self.invalid_ordering_message.format(fields=fields)
+                    ]
+                }
+            )
+        return term
+
+    def get_default_ordering(self, request, queryset):
+        return self.default_ordering
+
+    def encode_cursor(self, instance):
+        value = getattr(instance, self.field_name)
+        payload = {
+            "o": self.ordering,
+            "v": None if value is None else str(value),
+            "pk": instance.pk,
+        }
+        encoded = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(encoded).decode("ascii")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            if payload["o"] != self.ordering:
+                raise ValueError("Cursor ordering mismatch")
+            value = payload["v"]
+            if value is not None:
+                value = self.field.to_python(value)
+            return value, int(payload["pk"])
+        except (
+            TypeError,
+            ValueError,
+            KeyError,
+            binascii.Error,
+            DjangoValidationError,
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.ordering.lstrip("-") in self.ordering_fields:
+            url = replace_query_param(url, self.ordering_query_param, self.ordering)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict([("next", self.get_next_link()), ("results", data)])
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class TeacherCursorPagination(KeysetPagination):
+    ordering_fields = (
+        "lesson_price",
+        "teaching_experience",
+        "rating_average",
+        "created_at",
+    )
+    default_ordering = "-created_at"
+
+    def get_default_ordering(self, request, queryset):
+        # Search results keep their relevance order from page to page.
+        if "search_rank" in queryset.query.annotations:
+            return "-search_rank"
+        return super().get_default_ordering(request, queryset)
@@ -0,0 +1,87 @@
+"""
+Purge of accounts that registered but never activated. Ids are read in
+(created_at, id) order from the partial index on such accounts and deleted
+in small batches, each in its own short transaction, so an interrupted run
+loses nothing and the next run simply continues.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.utils import timezone
+
+from user.models import BaseUser
+from user.pagination import Row
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = 500
+# Leave the rest for the next hourly run rather than overlap with it.
+PURGE_TIME_BUDGET = timedelta(minutes=5)
+
+
+def unactivated_users(cutoff):
+    return BaseUser.objects.filter(
+        is_active=False,
+        activated_at__isnull=True,
+        last_login__isnull=True,
+        is_staff=False,
+        created_at__lt=cutoff,
+    )
+
+
+def delete_unactivated_users(
+    batch_size=PURGE_BATCH_SIZE, time_budget=PURGE_TIME_BUDGET, now=None
+):
+    """
+    Delete accounts never activated within
+    ``UNACTIVATED_USER_RETENTION_HOURS`` of registering. Returns the run's
+    metrics: users deleted, batches, rows removed including cascades, and
+    whether the run stopped early on its time budget.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(hours=settings.UNACTIVATED_USER_RETENTION_HOURS)
+    started = time.monotonic()
+    metrics = {"deleted": 0, "batches": 0, "rows": 0, "complete": True}
+    mark = None
+    while True:
+        if time.monotonic() - started > time_budget.total_seconds():
+            metrics["complete"] = False
+            break
+        with transaction.atomic():
+            candidates = unactivated_users(cutoff)
+            if mark is not None:
+                # Step past rows skipped as locked instead of retrying them.
+                candidates = candidates.alias(
+                    purge_key=Row(F("created_at"), F("pk"))
+                ).filter(purge_key__gt=Row(Value(mark[0]), Value(mark[1])))
+            # Locking the rows keeps a concurrent activation from being lost;
+            # accounts being activated right now are skipped.
+            batch = list(
+                candidates.select_for_update(skip_locked=True)
+                .order_by("created_at", "pk")
+                .values_list("created_at", "pk")[:batch_size]
+            )
+            if not batch:
+                break
+            rows, _per_model = BaseUser.objects.filter(
+                pk__in=[pk for _created_at, pk in batch]
+            ).delete()
+        mark = batch[-1]
+        metrics["batches"] += 1
+        metrics["deleted"] += len(batch)
+        metrics["rows"] += rows
+        if len(batch) < batch_size:
+            break
+
+    metrics["seconds"] = round(time.monotonic() - started, 3)
+    logger.info(
+        f"Purged {metrics['deleted']} unactivated users in {metrics['batches']} "
+        f"batches ({metrics['rows']} rows, {metrics['seconds']}s, "
+        f"complete={metrics['complete']})."
+    )
+    return metrics
@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db.models import F, FloatField, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Cast, Coalesce, Concat, Lower
+from rest_framework import filters
+
+from user.models import Teacher, City
+
+
+def _search_config():
+    return getattr(settings, "TEACHER_SEARCH_CONFIG", "simple")
+
+
+def _related_names(through_model, name_path):
+    names = (
+        through_model.objects.filter(teacher=OuterRef("pk"))
+        .order_by()
+        .values("teacher")
+        .annotate(names=StringAgg(name_path, " "))
+        .values("names")
+    )
+    return Coalesce(Subquery(names), Value(""), output_field=TextField())
+
+
+def refresh_search_index(teacher_ids=None):
+    queryset = Teacher.objects.all()
+    if teacher_ids is not None:
+        queryset = queryset.filter(pk__in=list(teacher_ids))
+
+    config = _search_config()
+    subjects = _related_names(Teacher.subjects.through, "subject__name")
+    categories = _related_names(
+        Teacher.categories.through, "categoriesofstudents__name"
+    )
+    city = Coalesce(
+        Subquery(City.objects.filter(pk=OuterRef("city_id")).values("name")),
+        Value(""),
+        output_field=TextField(),
+    )
+    return queryset.update(
+        search_document=(
+            SearchVector("first_name", "last_name", weight="A", config=config)
+            + SearchVector(subjects, categories, weight="B", config=config)
+            + SearchVector(city, weight="C", config=config)
+            + SearchVector("about_me", weight="D", config=config)
+        ),
+        search_text=Lower(
+            Concat(
+                "first_name",
+                Value(" "),
+                "last_name",
+                Value(" "),
+                subjects,
+                Value(" "),
+                categories,
+                Value(" "),
+                city,
+                Value(" "),
+                "about_me",
+                output_field=TextField(),
+            )
+        ),
+    )
+
+
+class TeacherSearchFilter(filters.SearchFilter):
+    """
+    Full-text search over the precomputed teacher document, with trigram
+    word similarity as a typo-tolerant fallback. Results are ranked by
+    relevance unless an explicit ordering is requested.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, "").strip()
+        if not term:
+            return queryset
+
+        query = SearchQuery(term, search_type="websearch", config=_search_config())
+        return (
+            queryset.filter(
+                Q(search_document=query)
+                | Q(search_text__trigram_word_similar=term.lower())
+            )
+            .annotate(
+                # double precision, so a rank read into a cursor compares
+                # equal to itself on the next page.
+                search_rank=Cast(
+                    Coalesce(SearchRank(F("search_document"), query), Value(0.0))
+                    + TrigramWordSimilarity(term.lower(), "search_text"),
+                    FloatField(),
+                )
+            )
+            .order_by("-search_rank", "-id")
+        )
@@ -5,9 +5,8 @@ from datetime import datetime, timedelta
 import jwt
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
 from django.core.validators import validate_email
-from django.db.models import Avg
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
@@ -22,6 +21,7 @@ from user.models import (
     CategoriesOfStudents,
     BaseUser,
 )
+from user.outbox import queue_email
 
 try:
     from teaching.models import Schedule, Rating
@@ -109,33 +109,19 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
-        user = User.objects.create_user(
-            email=validated_data["email"],
-            password=validated_data["password"],
-            role=validated_data["role"],
-            is_active=False,
-        )
-        try:
+        # The user and its activation email commit (or roll back) together.
+        with transaction.atomic():
+            user = User.objects.create_user(
+                email=validated_data["email"],
+                password=validated_data["password"],
+                role=validated_data["role"],
+                is_active=False,
+            )
             activation_token = self.generate_activation_token(user)
             activation_url = (
                 f"{settings.FRONTEND_URL.rstrip('/')}/activate/{activation_token}"
             )
             self.send_activation_email(user.email, activation_url)
-        except Exception as e:
-            logger.error(
-                f"Failed to send activation email for {user.email}. "
-                f"Error: {e}. Deleting partially created user to allow re-registration."
-            )
-            user.delete()
-            raise serializers.ValidationError(
-                _(
-                    "We encountered an issue setting up your "
-                    "account: the activation email could not be sent. "
-                    "Please try registering again. If the problem persists, "
-                    "please contact support."
-                ),
-                code="activation_email_failed",
-            )
         return user
 
     @staticmethod
@@ -150,14 +136,13 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
     @staticmethod
     def send_activation_email(email, activation_url):
+        """Queue the activation email; it is sent after commit."""
         subject = _("Account Activation for Astra +")
         message = _(
             f"Please click the link below to activate your account:\n\n{activation_url}\n\nIf you didn't request "
             f"this, please ignore this email."
         )
-        send_mail(
-            subject, message, settings.DEFAULT_FROM_EMAIL, [email], fail_silently=False
-        )
+        queue_email(subject, message, email)
 
 
 class TeacherRegistrationSerializer(serializers.ModelSerializer):
@@ -242,7 +227,7 @@ class TeacherCabinetSerializer(serializers.ModelSerializer):
     created_at = serializers.DateTimeField(source="user.created_at", read_only=True)
 
     schedule = ScheduleSerializer(source="schedules", many=True, read_only=True)
-    rating_summary = serializers.SerializerMethodField(read_only=True)
+    rating_summary = serializers.ReadOnlyField()
 
     languages_read = LanguageSerializer(source="languages", many=True, read_only=True)
     city_read = CitySerializer(source="city", read_only=True)
@@ -316,18 +301,6 @@ class TeacherCabinetSerializer(serializers.ModelSerializer):
             "subjects_read",
         )
 
-    @staticmethod
-    def get_rating_summary(obj):
-        if Rating and hasattr(obj, "ratings"):
-            ratings = obj.ratings.all()
-            count = ratings.count()
-            average = ratings.aggregate(Avg("rating"))["rating__avg"]
-            return {
-                "average": round(average, 2) if average is not None else 0.0,
-                "count": count,
-            }
-        return {"average": 0.0, "count": 0}
-
     @staticmethod
     def _validate_m2m_count_update(value, field_name_singular):
         if value is not None and not value:
@@ -371,7 +344,7 @@ class TeacherPublicProfileSerializer(serializers.ModelSerializer):
     subjects = SubjectSerializer(many=True, read_only=True)
     photo = serializers.ImageField(read_only=True, use_url=True)
     schedule = ScheduleSerializer(source="schedules", many=True, read_only=True)
-    rating_summary = serializers.SerializerMethodField(read_only=True)
+    rating_summary = serializers.ReadOnlyField()
     is_verified = serializers.BooleanField(read_only=True)
     phone = serializers.SerializerMethodField()
     social_links_presence = serializers.SerializerMethodField()
@@ -404,18 +377,6 @@ class TeacherPublicProfileSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = fields
 
-    @staticmethod
-    def get_rating_summary(obj):
-        if Rating and hasattr(obj, "ratings"):
-            ratings = obj.ratings.all()
-            count = ratings.count()
-            average = ratings.aggregate(Avg("rating"))["rating__avg"]
-            return {
-                "average": round(average, 2) if average is not None else 0.0,
-                "count": count,
-            }
-        return {"average": 0.0, "count": 0}
-
     def get_phone(self, obj):
         request = self.context.get("request")
         if request and request.user and request.user.is_authenticated:
@@ -435,7 +396,7 @@ class TeacherPublicProfileSerializer(serializers.ModelSerializer):
 class TeacherListSerializer(serializers.ModelSerializer):
     city = serializers.StringRelatedField(read_only=True)
     subjects = SubjectSerializer(many=True, read_only=True)
-    rating_summary = serializers.SerializerMethodField(read_only=True)
+    rating_summary = serializers.ReadOnlyField()
     photo = serializers.ImageField(required=False, allow_null=True, use_url=True)
     is_verified = serializers.BooleanField(read_only=True)
     age = serializers.IntegerField(read_only=True)
@@ -462,18 +423,6 @@ class TeacherListSerializer(serializers.ModelSerializer):
             "about_me",
         ]
 
-    @staticmethod
-    def get_rating_summary(obj):
-        if Rating and hasattr(obj, "ratings"):
-            ratings = obj.ratings.all()
-            count = ratings.count()
-            average = ratings.aggregate(Avg("rating"))["rating__avg"]
-            return {
-                "average": round(average, 2) if average is not None else 0.0,
-                "count": count,
-            }
-        return {"average": 0.0, "count": 0}
-
 
 class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(
@@ -555,25 +504,8 @@ class PasswordResetSerializer(serializers.Serializer):
             f"If you did not request this, please ignore this email.\nThis link will expire in "
             f"{getattr(settings, 'PASSWORD_RESET_TOKEN_LIFETIME_HOURS', 1)} hour(s)."
         )
-        try:
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                fail_silently=False,
-            )
-            logger.info(f"Password reset email sent to {user.email}")
-        except Exception as e:
-            logger.error(f"Error sending password reset email to {user.email}: {e}")
-            raise serializers.ValidationError(
-                _(
-                    "We encountered an issue sending the password reset email."
-                    "Please try again. If the problem persists, "
-                    "please contact support."
-                ),
-                code="password_reset_email_failed",
-            )
+        queue_email(subject, message, user.email)
+        logger.info(f"Password reset email queued for {user.email}")
 
 
 class PasswordResetConfirmSerializer(serializers.Serializer):
@@ -0,0 +1,93 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed, pre_save
+from django.dispatch import receiver
+
+from user.models import Teacher, City, Subject, Language, CategoriesOfStudents
+from user.caching import CATALOG_SCOPE, bump_versions, teacher_scope
+from user.search import refresh_search_index
+
+SEARCH_FIELDS = {"first_name", "last_name", "about_me", "city"}
+REFERENCE_MODEL_SCOPES = {
+    City: "city",
+    Subject: "subject",
+    Language: "language",
+    CategoriesOfStudents: "category",
+}
+
+
+@receiver(post_save, sender=Teacher)
+def refresh_teacher_search_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+        return
+    refresh_search_index([instance.pk])
+
+
+@receiver(m2m_changed, sender=Teacher.subjects.through)
+@receiver(m2m_changed, sender=Teacher.categories.through)
+def refresh_teacher_search_on_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._search_teacher_ids = list(
+            instance.teachers.values_list("pk", flat=True)
+        )
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        refresh_search_index([instance.pk])
+    elif action == "post_clear":
+        refresh_search_index(getattr(instance, "_search_teacher_ids", []))
+    elif pk_set:
+        refresh_search_index(pk_set)
+
+
+@receiver(pre_save, sender=City)
+@receiver(pre_save, sender=Subject)
+@receiver(pre_save, sender=CategoriesOfStudents)
+def remember_previous_name(sender, instance, **kwargs):
+    instance._previous_name = None
+    if instance.pk:
+        instance._previous_name = (
+            sender.objects.filter(pk=instance.pk).values_list("name", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=City)
+def refresh_teacher_search_on_city_rename(sender, instance, created, **kwargs):
+    if not created and instance._previous_name != instance.name:
+        refresh_search_index(instance.teacher_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_save, sender=CategoriesOfStudents)
+def refresh_teacher_search_on_rename(sender, instance, created, **kwargs):
+    if not created and instance._previous_name != instance.name:
+        refresh_search_index(instance.teachers.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+def bump_teacher_cache_on_change(sender, instance, **kwargs):
+    bump_versions(CATALOG_SCOPE, teacher_scope(instance.pk))
+
+
+@receiver(m2m_changed, sender=Teacher.subjects.through)
+@receiver(m2m_changed, sender=Teacher.categories.through)
+@receiver(m2m_changed, sender=Teacher.languages.through)
+def bump_teacher_cache_on_m2m_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    teacher_ids = (pk_set or ()) if reverse else (instance.pk,)
+    bump_versions(CATALOG_SCOPE, *[teacher_scope(pk) for pk in teacher_ids])
+
+
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+@receiver(post_save, sender=CategoriesOfStudents)
+@receiver(post_delete, sender=CategoriesOfStudents)
+def bump_reference_cache_on_change(sender, **kwargs):
+    bump_versions(REFERENCE_MODEL_SCOPES[sender])
@@ -0,0 +1,18 @@
+from celery import shared_task
+
+from user import outbox, purge
+
+
+@shared_task
+def send_queued_emails(batch_size=outbox.SEND_BATCH_SIZE):
+    return outbox.send_queued_emails(batch_size=batch_size)
+
+
+@shared_task
+def purge_finished_emails():
+    return outbox.purge_finished_emails()
+
+
+@shared_task
+def delete_inactive_unactivated_users(batch_size=purge.PURGE_BATCH_SIZE):
+    return purge.delete_unactivated_users(batch_size=batch_size)
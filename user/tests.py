@@ -0,0 +1,602 @@
+import socketserver
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from user import outbox, purge, tasks
+from user.models import (
+    BaseUser,
+    CategoriesOfStudents,
+    City,
+    OutgoingEmail,
+    Student,
+    Subject,
+    Teacher,
+)
+from user.serializers import UserRegistrationSerializer
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.subject = Subject.objects.create(name="Mathematics")
+        user = BaseUser.objects.create_user(
+            "teacher@example.com", "password", role=BaseUser.ROLE_TEACHER
+        )
+        self.teacher = Teacher.objects.create(
+            user=user, first_name="Olena", last_name="Koval", age=35
+        )
+        self.teacher.subjects.add(self.subject)
+        self.detail_url = f"/api/user/teachers/{self.teacher.pk}/"
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def get_cached(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get(url)
+        self.assertEqual(len(queries), 0)
+        return data
+
+    def test_teacher_change_refreshes_catalog_and_detail(self):
+        self.get("/api/user/teachers/")
+        self.get(self.detail_url)
+        self.assertEqual(
+            self.get_cached("/api/user/teachers/")[0]["first_name"], "Olena"
+        )
+        self.assertEqual(self.get_cached(self.detail_url)["first_name"], "Olena")
+
+        self.teacher.first_name = "Oksana"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher.save()
+        self.assertEqual(self.get("/api/user/teachers/")[0]["first_name"], "Oksana")
+        self.assertEqual(self.get(self.detail_url)["first_name"], "Oksana")
+
+    def test_reference_rename_refreshes_lists_and_teachers(self):
+        for url in ("/api/user/subjects/", "/api/user/teachers/", self.detail_url):
+            self.get(url)
+            self.get_cached(url)
+
+        self.subject.name = "Algebra"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subject.save()
+        self.assertEqual(
+            [subject["name"] for subject in self.get("/api/user/subjects/")],
+            ["Algebra"],
+        )
+        catalog = self.get("/api/user/teachers/")
+        self.assertEqual(catalog[0]["subjects"][0]["name"], "Algebra")
+        self.get_cached("/api/user/teachers/")
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        user = BaseUser.objects.create_user(
+            "teacher@example.com", "password", role=BaseUser.ROLE_TEACHER
+        )
+        self.teacher = Teacher.objects.create(
+            user=user, first_name="Olena", last_name="Koval", age=35
+        )
+        self.url = f"/api/user/teachers/{self.teacher.pk}/"
+
+    def test_matching_etag_is_answered_without_queries(self):
+        etag = self.client.get(self.url)["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+    def test_write_changes_the_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.teacher.first_name = "Oksana"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["first_name"], "Oksana")
+
+
+class TeacherFacetsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.math = Subject.objects.create(name="Mathematics")
+        self.physics = Subject.objects.create(name="Physics")
+        self.kyiv = City.objects.create(name="Kyiv")
+        self.lviv = City.objects.create(name="Lviv")
+        self.teachers = []
+        for index, (subjects, city, price) in enumerate(
+            [
+                ([self.math], self.kyiv, 300),
+                ([self.math, self.physics], self.lviv, 500),
+                ([self.physics], self.kyiv, 700),
+                ([self.math], self.kyiv, None),
+            ]
+        ):
+            user = BaseUser.objects.create_user(
+                f"teacher{index}@example.com", "password", role=BaseUser.ROLE_TEACHER
+            )
+            teacher = Teacher.objects.create(
+                user=user,
+                first_name=f"Teacher {index}",
+                last_name="Koval",
+                age=30,
+                city=city,
+                lesson_price=price,
+            )
+            teacher.subjects.add(*subjects)
+            self.teachers.append(teacher)
+
+    def facets(self):
+        response = self.client.get(
+            "/api/user/teachers/facets/",
+            {"subject": self.math.pk, "city": self.kyiv.pk},
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_counts_under_combined_filters_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            facets = self.facets()
+        self.assertEqual(len(queries), 1)
+
+        # Each facet is counted with every filter but its own.
+        self.assertEqual(facets["total"], 2)
+        self.assertEqual(
+            facets["subjects"],
+            [{"id": self.math.pk, "count": 2}, {"id": self.physics.pk, "count": 1}],
+        )
+        self.assertEqual(
+            facets["cities"],
+            [{"id": self.kyiv.pk, "count": 2}, {"id": self.lviv.pk, "count": 1}],
+        )
+        self.assertEqual(
+            [bucket["count"] for bucket in facets["price"]], [0, 1, 0, 0, 0, 0]
+        )
+
+    def test_cached_until_a_teacher_is_saved(self):
+        self.facets()
+        with CaptureQueriesContext(connection) as queries:
+            self.facets()
+        self.assertEqual(len(queries), 0)
+
+        moved = self.teachers[1]
+        moved.city = self.kyiv
+        with self.captureOnCommitCallbacks(execute=True):
+            moved.save()
+        facets = self.facets()
+        self.assertEqual(facets["total"], 3)
+        self.assertEqual(facets["cities"], [{"id": self.kyiv.pk, "count": 3}])
+        self.assertEqual(
+            [bucket["count"] for bucket in facets["price"]], [0, 1, 1, 0, 0, 0]
+        )
+
+
+class TeacherCursorPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teachers = [
+            self.create_teacher(index, teaching_experience=experience)
+            for index, experience in enumerate([5, None, 3, None, 5])
+        ]
+
+    def create_teacher(self, index, **fields):
+        user = BaseUser.objects.create_user(
+            f"teacher{index}@example.com", "password", role=BaseUser.ROLE_TEACHER
+        )
+        return Teacher.objects.create(
+            user=user,
+            first_name=f"Teacher {index}",
+            last_name="Koval",
+            age=30,
+            **fields,
+        )
+
+    def walk(self, url, on_page=None):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(teacher["id"] for teacher in response.data["results"])
+            if on_page:
+                on_page(response)
+            url = response.data["next"]
+        return seen
+
+    def test_unsupported_ordering_is_rejected(self):
+        response = self.client.get(
+            "/api/user/teachers/", {"page_size": 2, "ordering": "is_verified"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ordering", response.data)
+        # Unpaginated lists still use the ordering filter as before.
+        response = self.client.get("/api/user/teachers/", {"ordering": "is_verified"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_nullable_field_is_walked_in_segments(self):
+        with_value = sorted(
+            (teacher for teacher in self.teachers if teacher.teaching_experience),
+            key=lambda teacher: (teacher.teaching_experience, teacher.pk),
+        )
+        without_value = [
+            teacher for teacher in self.teachers if not teacher.teaching_experience
+        ]
+        ascending = [teacher.pk for teacher in with_value + without_value]
+
+        url = "/api/user/teachers/?page_size=2&ordering=teaching_experience"
+        self.assertEqual(self.walk(url), ascending)
+        # Descending puts the NULL segment first, as PostgreSQL does.
+        url = "/api/user/teachers/?page_size=1&ordering=-teaching_experience"
+        self.assertEqual(self.walk(url), ascending[::-1])
+
+    def test_next_links_are_stable_under_inserts(self):
+        newest_first = [teacher.pk for teacher in reversed(self.teachers)]
+        added = []
+
+        def on_page(response):
+            # Replaying a link gives the same page; a teacher registering
+            # meanwhile lands before the cursor and shifts nothing.
+            replay = self.client.get(response.wsgi_request.get_full_path())
+            self.assertEqual(replay.data, response.data)
+            if response.data["next"]:
+                self.assertIn("ordering=-created_at", response.data["next"])
+            added.append(self.create_teacher(len(self.teachers) + len(added)))
+
+        self.assertEqual(
+            self.walk("/api/user/teachers/?page_size=2", on_page), newest_first
+        )
+
+
+class TeacherSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.maths = Subject.objects.create(name="Mathematics")
+        self.physics = Subject.objects.create(name="Physics")
+        self.beginners = CategoriesOfStudents.objects.create(name="Beginners")
+        self.koval = self.create_teacher("Olena", "Koval", "Patient and friendly.")
+        self.koval.subjects.add(self.maths)
+        self.other = self.create_teacher("Iryna", "Shevchenko", "Studied with Koval.")
+
+    def create_teacher(self, first_name, last_name, about_me):
+        user = BaseUser.objects.create_user(
+            f"{last_name.lower()}@example.com", "password", role=BaseUser.ROLE_TEACHER
+        )
+        return Teacher.objects.create(
+            user=user,
+            first_name=first_name,
+            last_name=last_name,
+            age=30,
+            about_me=about_me,
+        )
+
+    def search(self, term):
+        response = self.client.get("/api/user/teachers/", {"search": term})
+        self.assertEqual(response.status_code, 200)
+        return [teacher["id"] for teacher in response.data]
+
+    def test_typos_match_by_trigram_similarity(self):
+        self.assertEqual(self.search("Mathematcs"), [self.koval.pk])
+        self.assertEqual(self.search("frendly"), [self.koval.pk])
+        self.other.categories.add(self.beginners)
+        self.assertEqual(self.search("begginers"), [self.other.pk])
+
+    def test_name_match_ranks_above_about_me_match(self):
+        # The newer teacher would come first if the rank were ignored.
+        self.assertEqual(self.search("Koval"), [self.koval.pk, self.other.pk])
+
+    def test_subject_changes_refresh_the_index(self):
+        self.assertEqual(self.search("physics"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.subjects.add(self.physics)
+        self.assertEqual(self.search("physics"), [self.other.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.physics.teachers.clear()
+        self.assertEqual(self.search("physics"), [])
+
+
+class TeacherSearchPaginationTests(TestCase):
+    def setUp(self):
+        # The most relevant teachers are the oldest, so newest-first would
+        # reverse the ranking. The last two tie and fall back to the id.
+        about = [
+            "Algebra, algebra and more algebra.",
+            "Algebra and geometry.",
+            "Geometry, physics, some algebra.",
+            "Calculus, algebra.",
+            "Calculus, algebra.",
+        ]
+        for index, about_me in enumerate(about):
+            user = BaseUser.objects.create_user(
+                f"teacher{index}@example.com", "password", role=BaseUser.ROLE_TEACHER
+            )
+            Teacher.objects.create(
+                user=user,
+                first_name=f"Teacher {index}",
+                last_name="Koval",
+                age=30,
+                about_me=about_me,
+            )
+
+    def test_relevance_order_survives_cursor_pages(self):
+        client = APIClient()
+        response = client.get("/api/user/teachers/", {"search": "algebra"})
+        ranked = [teacher["id"] for teacher in response.data]
+        self.assertEqual(len(ranked), 5)
+        self.assertEqual(
+            ranked[0], Teacher.objects.get(user__email="teacher0@example.com").pk
+        )
+        self.assertNotEqual(ranked, sorted(ranked, reverse=True))
+
+        paged, url = [], "/api/user/teachers/?search=algebra&page_size=2"
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            paged.extend(teacher["id"] for teacher in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(paged, ranked)
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: no auth, no TLS, one session per socket."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 stand-in ready")
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode("utf-8").strip()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250 stand-in")
+            elif command in ("MAIL", "RSET"):
+                recipients = []
+                self.reply("250 OK")
+            elif command == "RCPT":
+                address = line.split(":", 1)[1].strip().strip("<>")
+                if address in server.dropped:
+                    return
+                if address in server.refused:
+                    self.reply("550 No such user")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                server.delivered.extend(recipients)
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPStandInHandler)
+        self.connections = 0
+        self.delivered = []
+        self.refused = set()
+        self.dropped = set()
+
+
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        self.smtp = SMTPStandIn()
+        thread = threading.Thread(target=self.smtp.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.smtp.server_close)
+        self.addCleanup(self.smtp.shutdown)
+        settings = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=self.smtp.server_address[1],
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+            EMAIL_TIMEOUT=5,
+            EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_batch_shares_one_connection_and_retries_refusals(self):
+        self.smtp.refused.add("bounce@example.com")
+        for address in ("a@example.com", "bounce@example.com", "b@example.com"):
+            outbox.queue_email("Hello", "Body", address)
+
+        with self.assertLogs("user.outbox", "WARNING"):
+            self.assertEqual(outbox.send_queued_emails(), 2)
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual(self.smtp.delivered, ["a@example.com", "b@example.com"])
+        bounce = OutgoingEmail.objects.get(to="bounce@example.com")
+        self.assertEqual(bounce.status, OutgoingEmail.STATUS_PENDING)
+        self.assertEqual(bounce.attempts, 1)
+        self.assertEqual(bounce.body, "Body")
+        self.assertEqual(
+            set(
+                OutgoingEmail.objects.filter(
+                    status=OutgoingEmail.STATUS_SENT
+                ).values_list("body", flat=True)
+            ),
+            {""},
+        )
+        self.assertGreater(bounce.next_attempt_at, timezone.now())
+
+        # Not due yet, then due and refused for the last allowed time.
+        self.assertEqual(outbox.send_queued_emails(), 0)
+        OutgoingEmail.objects.filter(pk=bounce.pk).update(
+            next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+        with self.assertLogs("user.outbox", "ERROR"):
+            outbox.send_queued_emails()
+        bounce.refresh_from_db()
+        self.assertEqual(bounce.status, OutgoingEmail.STATUS_FAILED)
+        self.assertEqual(bounce.attempts, 2)
+
+    def test_broken_session_leaves_the_rest_for_the_next_run(self):
+        self.smtp.dropped.add("drop@example.com")
+        for address in ("a@example.com", "drop@example.com", "b@example.com"):
+            outbox.queue_email("Hello", "Body", address)
+
+        with self.assertLogs("user.outbox", "WARNING"):
+            self.assertEqual(outbox.send_queued_emails(), 1)
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual(self.smtp.delivered, ["a@example.com"])
+        rest = OutgoingEmail.objects.get(to="b@example.com")
+        self.assertEqual(rest.status, OutgoingEmail.STATUS_PENDING)
+        self.assertEqual(rest.attempts, 0)
+        self.assertLessEqual(rest.next_attempt_at, timezone.now())
+        self.assertEqual(OutgoingEmail.objects.get(to="drop@example.com").attempts, 1)
+
+        self.assertEqual(outbox.send_queued_emails(), 1)
+        self.assertEqual(self.smtp.delivered, ["a@example.com", "b@example.com"])
+
+    def test_rolled_back_caller_leaves_no_email(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            outbox.queue_email("Hello", "Body", "a@example.com")
+            raise RuntimeError("caller failed")
+        self.assertFalse(OutgoingEmail.objects.exists())
+
+    def test_unreachable_server_backs_off(self):
+        outbox.queue_email("Hello", "Body", "a@example.com")
+        with override_settings(EMAIL_PORT=1), self.assertLogs("user.outbox"):
+            self.assertEqual(outbox.send_queued_emails(), 0)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(outbox.retry_delay(3), timedelta(minutes=4))
+
+    def test_finished_emails_are_purged_after_retention(self):
+        for status in (
+            OutgoingEmail.STATUS_SENT,
+            OutgoingEmail.STATUS_FAILED,
+            OutgoingEmail.STATUS_PENDING,
+        ):
+            outbox.queue_email("Hello", "Body", f"{status}@example.com")
+            OutgoingEmail.objects.filter(to=f"{status}@example.com").update(
+                status=status
+            )
+        outbox.queue_email("Hello", "Body", "recent@example.com")
+        OutgoingEmail.objects.exclude(to="recent@example.com").update(
+            created_at=timezone.now() - timedelta(days=8)
+        )
+        OutgoingEmail.objects.filter(to="recent@example.com").update(
+            status=OutgoingEmail.STATUS_SENT
+        )
+
+        self.assertEqual(tasks.purge_finished_emails(), 2)
+        self.assertEqual(
+            set(OutgoingEmail.objects.values_list("to", flat=True)),
+            {"pending@example.com", "recent@example.com"},
+        )
+
+
+class RegistrationEmailTests(TestCase):
+    def test_registration_queues_activation_email(self):
+        with mock.patch("user.outbox.kick_sender") as kick_sender:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = APIClient().post(
+                    "/api/user/register/",
+                    {
+                        "email": "new@example.com",
+                        "password": "Secret#123",
+                        "role": BaseUser.ROLE_STUDENT,
+                    },
+                    format="json",
+                )
+                kick_sender.assert_not_called()
+        self.assertEqual(response.status_code, 201)
+        kick_sender.assert_called_once()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutgoingEmail.objects.get().to, "new@example.com")
+
+        outbox.send_queued_emails()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("/activate/", mail.outbox[0].body)
+        self.assertEqual(OutgoingEmail.objects.get().status, OutgoingEmail.STATUS_SENT)
+
+
+class UnactivatedUserPurgeTests(TestCase):
+    def test_purges_only_old_unactivated_accounts_in_batches(self):
+        old = timezone.now() - timedelta(days=30)
+        stale = [
+            BaseUser.objects.create_user(f"stale{index}@example.com", "password")
+            for index in range(5)
+        ]
+        activated = BaseUser.objects.create_user(
+            "active@example.com", "password", is_active=True
+        )
+        deactivated = BaseUser.objects.create_user("left@example.com", "password")
+        deactivated.last_login = old
+        deactivated.save(update_fields=["last_login"])
+        BaseUser.objects.filter(
+            pk__in=[user.pk for user in [*stale, activated, deactivated]]
+        ).update(created_at=old)
+        fresh = BaseUser.objects.create_user("fresh@example.com", "password")
+        Student.objects.create(user=stale[0], first_name="Stale")
+
+        with self.assertLogs("user.purge", "INFO"):
+            metrics = tasks.delete_inactive_unactivated_users(batch_size=2)
+        self.assertEqual(metrics["deleted"], 5)
+        self.assertEqual(metrics["batches"], 3)
+        self.assertEqual(metrics["rows"], 6)
+        self.assertTrue(metrics["complete"])
+        self.assertEqual(
+            set(BaseUser.objects.values_list("pk", flat=True)),
+            {activated.pk, deactivated.pk, fresh.pk},
+        )
+
+    def test_deactivated_account_that_never_logged_in_is_kept(self):
+        user = BaseUser.objects.create_user(
+            "student@example.com", "password", role=BaseUser.ROLE_STUDENT
+        )
+        token = UserRegistrationSerializer.generate_activation_token(user)
+        response = APIClient().get(f"/api/user/activate/{token}/")
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertIsNotNone(user.activated_at)
+        self.assertIsNone(user.last_login)
+
+        user.is_active = False
+        user.save(update_fields=["is_active"])
+        BaseUser.objects.update(created_at=timezone.now() - timedelta(days=30))
+        with self.assertLogs("user.purge", "INFO"):
+            self.assertEqual(purge.delete_unactivated_users()["deleted"], 0)
+        self.assertTrue(BaseUser.objects.filter(pk=user.pk).exists())
+
+    def test_stops_on_time_budget_and_resumes(self):
+        BaseUser.objects.create_user("stale@example.com", "password")
+        BaseUser.objects.update(created_at=timezone.now() - timedelta(days=30))
+
+        with self.assertLogs("user.purge", "INFO"):
+            metrics = purge.delete_unactivated_users(time_budget=timedelta(-1))
+        self.assertEqual(metrics["deleted"], 0)
+        self.assertFalse(metrics["complete"])
+        with self.assertLogs("user.purge", "INFO"):
+            self.assertEqual(purge.delete_unactivated_users()["deleted"], 1)
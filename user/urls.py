@@ -6,6 +6,7 @@ from user.views import (
     CityListView,
     SubjectListView,
     TeacherListView,
+    TeacherFacetsView,
     TeacherDetailView,
     ActivateAccountView,
     CompleteTeacherProfileView,
@@ -32,6 +33,7 @@ urlpatterns = [
         name="student-category-list",
     ),
     path("teachers/", TeacherListView.as_view(), name="teacher-list"),
+    path("teachers/facets/", TeacherFacetsView.as_view(), name="teacher-facets"),
     path("teachers/<int:pk>/", TeacherDetailView.as_view(), name="teacher-detail"),
     path("register/", UserRegistrationView.as_view(), name="register"),
     path(
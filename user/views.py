@@ -4,6 +4,7 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework import generics, status, filters
 from rest_framework.exceptions import ValidationError, PermissionDenied
@@ -23,7 +24,24 @@ from user.models import (
     Language,
     CategoriesOfStudents,
 )
+from user.caching import (
+    CATALOG_SCOPE,
+    FREE_SLOTS_SCOPE,
+    REFERENCE_SCOPES,
+    ConditionalGetMixin,
+    VersionedCacheMixin,
+    teacher_scope,
+)
+from user.facets import get_teacher_facets
+from user.filters import (
+    TeacherAvailabilityFilter,
+    TeacherCatalogFilter,
+    get_availability_params,
+    get_catalog_params,
+)
+from user.pagination import TeacherCursorPagination
 from user.permissions import IsTeacher, IsStudent, IsProfileOwner
+from user.search import TeacherSearchFilter
 from user.serializers import (
     UserRegistrationSerializer,
     TeacherCabinetSerializer,
@@ -46,35 +64,42 @@ User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
-class CityListView(generics.ListAPIView):
+class CityListView(ConditionalGetMixin, VersionedCacheMixin, generics.ListAPIView):
+    cache_scopes = ("city",)
     queryset = City.objects.all()
     serializer_class = CitySerializer
     permission_classes = [AllowAny]
     pagination_class = None
 
 
-class SubjectListView(generics.ListAPIView):
+class SubjectListView(ConditionalGetMixin, VersionedCacheMixin, generics.ListAPIView):
+    cache_scopes = ("subject",)
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     permission_classes = [AllowAny]
     pagination_class = None
 
 
-class LanguageListView(generics.ListAPIView):
+class LanguageListView(ConditionalGetMixin, VersionedCacheMixin, generics.ListAPIView):
+    cache_scopes = ("language",)
     queryset = Language.objects.all()
     serializer_class = LanguageSerializer
     permission_classes = [AllowAny]
     pagination_class = None
 
 
-class CategoriesOfStudentsListView(generics.ListAPIView):
+class CategoriesOfStudentsListView(
+    ConditionalGetMixin, VersionedCacheMixin, generics.ListAPIView
+):
+    cache_scopes = ("category",)
     queryset = CategoriesOfStudents.objects.all()
     serializer_class = CategoriesOfStudentsSerializer
     permission_classes = [AllowAny]
     pagination_class = None
 
 
-class TeacherListView(generics.ListAPIView):
+class TeacherListView(VersionedCacheMixin, generics.ListAPIView):
+    cache_scopes = (CATALOG_SCOPE, *REFERENCE_SCOPES)
     queryset = (
         Teacher.objects.all()
         .select_related("user", "city")
@@ -82,29 +107,62 @@ class TeacherListView(generics.ListAPIView):
     )
     serializer_class = TeacherListSerializer
     permission_classes = [AllowAny]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = [
-        "first_name",
-        "last_name",
-        "about_me",
-        "subjects__name",
-        "city__name",
-        "categories__name",
+    filter_backends = [
+        TeacherCatalogFilter,
+        TeacherAvailabilityFilter,
+        TeacherSearchFilter,
+        filters.OrderingFilter,
     ]
     ordering_fields = [
         "lesson_price",
         "teaching_experience",
-        "created_at, is_verified",
+        "rating_average",
+        "created_at",
+        "is_verified",
     ]
-    pagination_class = None
+    pagination_class = TeacherCursorPagination
 
+    def get_cache_scopes(self):
+        scopes = super().get_cache_scopes()
+        if get_availability_params(self.request.query_params):
+            scopes = (*scopes, FREE_SLOTS_SCOPE)
+        return scopes
 
-class TeacherDetailView(generics.RetrieveAPIView):
+    def get_cache_key(self, request):
+        key = super().get_cache_key(request)
+        if get_availability_params(request.query_params):
+            # Slots start on the quarter hour and drop out of the filter once
+            # they have started, so the response changes with the clock.
+            key = f"{key}:{int(timezone.now().timestamp()) // 900}"
+        return key
+
+
+class TeacherFacetsView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        queryset = Teacher.objects.all()
+        search = request.query_params.get(TeacherSearchFilter.search_param, "")
+        if search.strip():
+            matches = TeacherSearchFilter().filter_queryset(request, queryset, self)
+            queryset = queryset.filter(pk__in=matches.values("pk"))
+        facets = get_teacher_facets(
+            queryset, get_catalog_params(request.query_params), search.strip()
+        )
+        return Response(facets)
+
+
+class TeacherDetailView(
+    ConditionalGetMixin, VersionedCacheMixin, generics.RetrieveAPIView
+):
     queryset = Teacher.objects.all()
     serializer_class = TeacherPublicProfileSerializer
     permission_classes = [AllowAny]
     lookup_field = "pk"
 
+    def get_cache_scopes(self):
+        return (teacher_scope(self.kwargs["pk"]), *REFERENCE_SCOPES)
+
 
 class UserRegistrationView(generics.CreateAPIView):
     serializer_class = UserRegistrationSerializer
@@ -153,6 +211,7 @@ class ActivateAccountView(APIView):
                     status=status.HTTP_200_OK,
                 )
 
+            # BaseUser.save records activated_at.
             user.is_active = True
             user.save(update_fields=["is_active"])
             logger.info(
@@ -371,7 +430,7 @@ class ResendActivationEmailView(APIView):
                 )
 
                 logger.info(
-                    f"Successfully resent activation email to {user.email} (ID: {user.id}) via dedicated endpoint."
+                    f"Queued activation email for {user.email} (ID: {user.id}) via dedicated endpoint."
                 )
                 return Response(
                     {